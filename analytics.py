@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+import client_state
+
+# --- CÁLCULOS POR VISTA ---
+# Funciones puras (sin Streamlit) con los cálculos de cada pestaña del dashboard; reciben las
+# tablas ya filtradas y devuelven DataFrames listos para graficar. `estado` son las filas del
+# estado por cliente (client_state) bajo los filtros globales y `resumen` su roll-up por cliente.
+
+# 1. PENETRACIÓN
+def penetration_by_seller(df_a_filt, dff):
+    asig = df_a_filt.groupby('vendedor')['clienteid'].nunique().reset_index(name='Asignados')
+    serv = dff.groupby('vendedor', observed=True)['clienteid'].nunique().reset_index(name='Servidos')
+    pen = pd.merge(asig, serv, on='vendedor', how='left').fillna(0)
+    pen['% Pen'] = (pen['Servidos'] / pen['Asignados'].replace(0, 1)) * 100
+    pen['Gap'] = pen['Asignados'] - pen['Servidos']
+    return pen
+
+def client_visit_status(df_a_filt, dff):
+    clientes_maestro = df_a_filt[['clienteid', 'cliente']].drop_duplicates()
+    clientes_maestro['Estado'] = np.where(bought(clientes_maestro['clienteid'], dff), '✅ Visitado', '❌ Pendiente')
+    return clientes_maestro
+
+def bought(clienteids, dff):
+    return clienteids.isin(dff['clienteid'].unique())
+
+# 2. FRECUENCIA
+def frequency_table(df_a_filt, resumen):
+    cartera_total = df_a_filt[['clienteid', 'cliente', 'vendedor']].drop_duplicates(subset=['clienteid'])
+    freq_sales = resumen[['clienteid', 'frecuencia_real']]
+    df_freq = pd.merge(cartera_total, freq_sales, on='clienteid', how='left').fillna(0)
+    df_freq['Estado'] = classify_frequency(df_freq['frecuencia_real'])
+    return df_freq
+
+def classify_frequency(f):
+    return np.select([f == 0, f < 3, f <= 5], ['Sin Compra (0)', 'Baja (<3)', 'En Modelo (3-5)'], default='Alta (>5)')
+
+def frequency_by_seller(df_freq):
+    freq_vend = df_freq.groupby(['vendedor', 'Estado']).size().reset_index(name='Count')
+    total_vend = freq_vend.groupby('vendedor')['Count'].transform('sum')
+    freq_vend['Pct'] = (freq_vend['Count'] / total_vend) * 100
+    return freq_vend
+
+# 3. MAPA
+def route_status(puntos, resumen):
+    # `puntos`: un punto por cliente (geo_index); el índice es su posición en el índice geográfico
+    df_map = puntos.copy()
+    df_map['Status'] = np.where(bought(df_map['clienteid'], resumen), 'Con Compra', 'Sin Compra')
+    df_map['Link'] = "https://www.google.com/maps/dir/?api=1&destination=" + coords_text(df_map)
+    return df_map
+
+def coords_text(df):
+    return df['latitud'].astype(str) + "," + df['longitud'].astype(str)
+
+def whatsapp_message(pendientes, limit=20):
+    top = pendientes.head(limit)
+    lineas = "❌ *" + top['cliente'].astype(str) + "*\n📍 https://www.google.com/maps/search/?api=1&query=" + coords_text(top) + "\n\n"
+    return f"🚨 *RUTA PENDIENTE*\n📉 Faltan: {len(pendientes)}\n\n" + "".join(lineas)
+
+# 8. CLIENTES
+def churn_clients(estado, resumen, fecha_min, fecha_max):
+    churn = client_state.churn_risk(resumen, fecha_min, fecha_max)
+    churn_df = None
+    if len(churn):
+        churn_df = estado[estado['clienteid'].isin(churn)].groupby(['cliente', 'vendedor'], observed=True)['monto_real'].sum().reset_index().sort_values('monto_real', ascending=False)
+    return len(churn), churn_df
+
+# 9. AUDITORÍA
+def audit_pivot(df_aud, col_hm):
+    return df_aud.groupby(['vendedor', col_hm], observed=True)['monto_real'].sum().reset_index().pivot(index='vendedor', columns=col_hm, values='monto_real').fillna(0)
+
+# 10. INTELIGENCIA
+def top_products(dff, n=50):
+    return dff.groupby('producto', observed=True)['monto_real'].sum().nlargest(n).index
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+import analytics
+
+# --- CANASTA: ÍNDICE DE CO-OCURRENCIA ---
+# Matriz dispersa transacción × producto (1 si la transacción lleva el producto). Su producto
+# X'X da, en una sola operación, cuántas transacciones comparten cada par de productos; la
+# diagonal es el soporte de cada producto. Con eso se arma el top-k de co-compras (soporte,
+# confianza y lift) de todos los productos top de una vez, sin escanear la venta por clic.
+def incidence_matrix(dff):
+    tx, _ = pd.factorize(dff['id_transaccion'])
+    prod, productos = pd.factorize(dff['producto'])
+    ok = (tx >= 0) & (prod >= 0)
+    X = sparse.csr_matrix((np.ones(ok.sum(), dtype=np.int32), (tx[ok], prod[ok])), shape=(tx.max() + 1, len(productos)))
+    X.sum_duplicates()
+    X.data[:] = 1  # líneas repetidas del mismo producto cuentan una vez
+    return X, pd.Index(productos)
+
+def build_basket(dff, top_n=50, k=5):
+    tops = analytics.top_products(dff, top_n)
+    if dff.empty or not len(tops): return tops, {}
+
+    X, productos = incidence_matrix(dff)
+    C = (X.T @ X).tocsr()
+    n_tx = X.shape[0]
+    soporte_prod = C.diagonal()
+
+    reglas = {}
+    for p in tops:
+        i = productos.get_loc(p)
+        fila = C.getrow(i)
+        cols, cuenta = fila.indices, fila.data
+        keep = cols != i
+        cols, cuenta = cols[keep], cuenta[keep]
+        rel = pd.DataFrame({
+            'producto': productos[cols], 'transacciones': cuenta,
+            'soporte': cuenta / n_tx, 'confianza': cuenta / soporte_prod[i],
+            'lift': (cuenta / soporte_prod[i]) / (soporte_prod[cols] / n_tx)
+        })
+        # Mismo desempate que antes: más transacciones primero, luego por nombre de producto
+        reglas[p] = rel.sort_values(['transacciones', 'producto'], ascending=[False, True]).head(k).set_index('producto')
+    return tops, reglas
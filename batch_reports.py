@@ -0,0 +1,158 @@
+# --- REPORTES POR VENDEDOR (SIN STREAMLIT) ---
+# Genera un Excel por vendedor con lo que el supervisor revisa en el dashboard: KPIs,
+# penetración, frecuencia, clientes pendientes (en orden de visita), rebotes y caída. Los
+# datos se cargan una sola vez (snapshots de data_loader) junto con las estructuras
+# compartidas (cubo, estado por cliente, conciliación, índices de filtro); los vendedores
+# se reparten en un pool de procesos que hereda ese conjunto ya cargado (fork, sin copiar
+# ni re-leer). Con spawn (Windows/macOS) cada proceso lo vuelve a armar desde los snapshots.
+# Uso: python batch_reports.py --out reportes/ [--workers 8] [--vendedor "JUAN PEREZ" ...]
+import argparse
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+import analytics
+import client_state
+import data_loader
+import geo_index
+import reconciliation
+import routing
+import sales_cube
+from filter_engine import FilterEngine
+
+META_MENSUAL = 3600000
+
+# Conjunto compartido del proceso (lo arma load_dataset en el padre; los hijos lo heredan)
+_DATOS = None
+
+def load_dataset():
+    df_v, df_p, df_a, df_r = data_loader.load_consolidated_data()
+    if df_v is None: raise SystemExit("🚨 No se encontró 'venta_completa.csv'.")
+    conc = reconciliation.load_reconciliation(df_v, df_p, df_r)
+    conc_pre = conc[conc['lineas_pre'] > 0] if df_p is not None else None
+    return {
+        'df_v': df_v, 'df_a': df_a, 'df_r': df_r, 'conc': conc, 'conc_pre': conc_pre,
+        'cube': sales_cube.build_cube(df_v), 'estado': client_state.build_client_state(df_v),
+        'canales': sorted(df_v['canal'].dropna().unique().tolist()),
+        'engine_v': FilterEngine(df_v, ('vendedor',)),
+        'engine_a': FilterEngine(df_a, ('vendedor',)) if df_a is not None else None,
+        'engine_r': FilterEngine(df_r, ('vendedor',)) if df_r is not None else None,
+        'engine_c': FilterEngine(conc_pre, ('vendedor',)) if conc_pre is not None else None,
+        'geo': geo_index.GeoIndex(df_a) if df_a is not None and 'latitud' in df_a.columns else None,
+    }
+
+def _init_worker():
+    global _DATOS
+    if _DATOS is None: _DATOS = load_dataset()
+
+# --- CÁLCULOS POR VENDEDOR (los mismos de cada vista del dashboard) ---
+def seller_report(datos, vendedor, meta=META_MENSUAL):
+    hojas = {}
+    cells = sales_cube.cube_select(datos['cube'], datos['canales'], vendedor)
+    tot, cob, trx = sales_cube.cube_kpis(cells)
+    estado = client_state.state_select(datos['estado'], datos['canales'], vendedor)
+    resumen = client_state.client_summary(estado)
+    conc_pre = datos['engine_c'].select(vendedor=[vendedor]) if datos['engine_c'] is not None else None
+    kpis = {'Vendedor': vendedor, 'Desde': datos['df_v']['fecha'].min().date(), 'Hasta': datos['df_v']['fecha'].max().date(),
+            'Venta Real': tot, 'Cobertura': cob, 'Transacciones': trx, 'Ticket': tot / trx if trx > 0 else 0,
+            'Meta': meta / 10, '% Meta': tot / (meta / 10) * 100 if meta else None}
+    if conc_pre is not None: kpis.update({'Preventa': conc_pre['monto_pre'].sum(), 'Rechazo Estimado': conc_pre['caida'].sum()})
+
+    if datos['engine_a'] is not None:
+        df_a_filt = datos['engine_a'].select(vendedor=[vendedor])
+        # Penetración
+        clientes = analytics.client_visit_status(df_a_filt, resumen)
+        cartera, visitados = df_a_filt['clienteid'].nunique(), len(resumen)
+        kpis.update({'Cartera Total': cartera, 'Visitados': visitados, 'No Visitados': cartera - visitados,
+                     'Efectividad %': visitados / cartera * 100 if cartera > 0 else 0})
+        hojas['Penetración'] = clientes.sort_values('Estado', ascending=False)
+        # Frecuencia
+        df_freq = analytics.frequency_table(df_a_filt, resumen)
+        en_modelo = int((df_freq['Estado'] == 'En Modelo (3-5)').sum())
+        kpis.update({'En Modelo (3-5)': en_modelo, 'Fuera Modelo': len(df_freq) - en_modelo})
+        hojas['Frecuencia'] = df_freq.sort_values('frecuencia_real')
+        # Pendientes: con coordenadas, en orden de visita sugerido (como en el mapa)
+        if datos['geo'] is not None:
+            df_map = analytics.route_status(datos['geo'].points.iloc[datos['geo'].select(df_a_filt['clienteid'])], resumen)
+            pendientes = df_map[df_map['Status'] == 'Sin Compra']
+            if 0 < len(pendientes) <= routing.MAX_PARADAS: pendientes = routing.sequence_stops(pendientes)
+            hojas['Pendientes'] = pendientes.drop(columns='Status')
+        else: hojas['Pendientes'] = clientes[clientes['Estado'] == '❌ Pendiente'].drop(columns='Estado')
+
+    if datos['engine_r'] is not None:
+        df_r = datos['engine_r'].select(vendedor=[vendedor])
+        kpis.update({'Rebotes': len(df_r), 'Monto Rechazado': df_r['monto_rechazo'].sum()})
+        if 'nro_preventa' in df_r.columns: df_r = df_r.join(reconciliation.lookup(datos['conc'], df_r['nro_preventa'])[['monto_pre', 'monto_real', 'st']], on='nro_preventa')
+        hojas['Rebotes'] = df_r.sort_values('monto_rechazo', ascending=False)
+
+    if conc_pre is not None:
+        por_estado = conc_pre.groupby('st', observed=True).agg(monto_pre=('monto_pre', 'sum'), caida=('caida', 'sum'), preventas=('monto_pre', 'size'))
+        hojas['Caída'] = por_estado.reset_index()
+        hojas['Caída Detalle'] = conc_pre[conc_pre['caida'] > 0].sort_values('caida', ascending=False).reset_index()
+
+    hojas['Venta Diaria'] = sales_cube.cube_daily(cells)
+    return {'KPIs': pd.DataFrame({'Indicador': list(kpis), 'Valor': list(kpis.values())}), **hojas}
+
+# --- EXCEL ---
+def file_name(vendedor):
+    return re.sub(r'[^\w\-]+', '_', str(vendedor)).strip('_') + '.xlsx'
+
+def write_workbook(path, hojas):
+    tmp = f'{path}.{os.getpid()}.tmp.xlsx'
+    with pd.ExcelWriter(tmp, engine='openpyxl') as writer:
+        for nombre, df in hojas.items():
+            df.to_excel(writer, sheet_name=nombre[:31], index=False)
+            ws = writer.sheets[nombre[:31]]
+            ws.freeze_panes = 'A2'
+            # Ancho por columna según el encabezado y las primeras filas
+            for i, col in enumerate(df.columns, 1):
+                largo = max([len(str(col))] + [len(str(v)) for v in df[col].head(200)])
+                ws.column_dimensions[ws.cell(1, i).column_letter].width = min(largo + 2, 60)
+    os.replace(tmp, path)
+
+def export_seller(vendedor, out_dir, meta=META_MENSUAL):
+    t = time.perf_counter()
+    path = os.path.join(out_dir, file_name(vendedor))
+    write_workbook(path, seller_report(_DATOS, vendedor, meta))
+    return vendedor, path, time.perf_counter() - t
+
+def export_all(out_dir, vendedores=None, workers=None, meta=META_MENSUAL):
+    global _DATOS
+    if _DATOS is None: _DATOS = load_dataset()
+    os.makedirs(out_dir, exist_ok=True)
+    todos = _DATOS['engine_v'].values('vendedor')
+    vendedores = [v for v in todos if v in vendedores] if vendedores else todos
+    workers = min(workers or os.cpu_count() or 1, max(len(vendedores), 1))
+    if workers == 1: return [export_seller(v, out_dir, meta) for v in vendedores]
+    # fork: los hijos heredan _DATOS (páginas compartidas); spawn: _init_worker lo vuelve a armar
+    metodo = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    resultados = []
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(metodo), initializer=_init_worker) as pool:
+        for fut in as_completed([pool.submit(export_seller, v, out_dir, meta) for v in vendedores]):
+            resultados.append(fut.result())
+            print(f"  {resultados[-1][0]:<40}{resultados[-1][2]:>8.2f} s")
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description="Reportes Excel por vendedor")
+    parser.add_argument('--out', default='reportes', help="carpeta de salida")
+    parser.add_argument('--data-dir', default='.', help="carpeta con venta_completa.csv y el resto de los archivos")
+    parser.add_argument('--vendedor', nargs='+', help="solo estos vendedores (por defecto, todos)")
+    parser.add_argument('--workers', type=int, help="procesos (por defecto, uno por núcleo)")
+    parser.add_argument('--meta', type=float, default=META_MENSUAL, help="meta mensual total ($); por vendedor se usa la décima parte")
+    args = parser.parse_args()
+
+    out_dir = os.path.abspath(args.out)
+    os.chdir(args.data_dir)
+    t = time.perf_counter()
+    global _DATOS
+    _DATOS = load_dataset()
+    print(f"Datos cargados en {time.perf_counter() - t:.2f} s")
+    resultados = export_all(out_dir, args.vendedor, args.workers, args.meta)
+    print(f"{len(resultados)} reportes en {out_dir} ({time.perf_counter() - t:.2f} s en total)")
+
+if __name__ == '__main__':
+    main()
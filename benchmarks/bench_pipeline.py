@@ -0,0 +1,328 @@
+# --- BENCHMARK DEL PIPELINE COMPLETO ---
+# Genera datos sintéticos (synthetic_data.py) a distintas escalas y mide sin Streamlit la
+# carga (en frío, sin snapshots, y en caliente), las estructuras compartidas, el bloque de
+# filtros globales y el cálculo de cada pestaña, con tiempo de pared y pico de memoria
+# por etapa. El resultado se guarda en JSON y se puede comparar contra una
+# línea base anterior para detectar regresiones.
+# Uso: python benchmarks/bench_pipeline.py --rows 10000 1000000 --save base.json
+#      python benchmarks/bench_pipeline.py --rows 10000 --compare base.json [--tolerance 0.25]
+#      python benchmarks/bench_pipeline.py --rows 1000000 --sql   (motor DuckDB)
+#      python benchmarks/bench_pipeline.py --rows 100000 --check-incremental   (incremental == completo)
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import analytics
+import basket
+import client_state
+import data_loader
+import forecast
+import geo_index
+import reconciliation
+import routing
+import partition_store
+import sales_cube
+import sql_backend
+import synthetic_data
+from filter_engine import FilterEngine
+
+class MuestreoRSS(threading.Thread):
+    # Lee la memoria residente cada pocos ms y guarda el máximo (casi sin costo, a diferencia
+    # de tracemalloc, que multiplica los tiempos de pandas)
+    def __init__(self, intervalo=0.005):
+        super().__init__(daemon=True)
+        self.intervalo, self.maximo, self._fin = intervalo, data_loader.process_rss_mb() or 0, threading.Event()
+
+    def run(self):
+        while not self._fin.wait(self.intervalo):
+            self.maximo = max(self.maximo, data_loader.process_rss_mb() or 0)
+
+    def stop(self):
+        self._fin.set(); self.join()
+        return max(self.maximo, data_loader.process_rss_mb() or 0)
+
+class Medidor:
+    # memoria: 'rss' = pico de memoria residente sobre el inicio de la etapa (muestreado);
+    # 'tracemalloc' = pico de asignaciones de Python/NumPy (exacto, pero mucho más lento)
+    def __init__(self, memoria='rss'):
+        self.memoria = memoria
+        self.etapas = {}
+
+    def __call__(self, nombre, fn):
+        if self.memoria == 'tracemalloc': tracemalloc.start(); tracemalloc.reset_peak()
+        if self.memoria == 'rss': inicio = data_loader.process_rss_mb() or 0; muestreo = MuestreoRSS(); muestreo.start()
+        t = time.perf_counter()
+        result = fn()
+        wall = time.perf_counter() - t
+        peak = None
+        if self.memoria == 'tracemalloc': peak = tracemalloc.get_traced_memory()[1] / 1e6; tracemalloc.stop()
+        if self.memoria == 'rss': peak = muestreo.stop() - inicio
+        self.etapas[nombre] = {'wall_s': round(wall, 4), 'peak_mb': round(peak, 2) if peak is not None else None}
+        print(f"  {nombre:<24}{wall:>10.3f} s" + (f"{peak:>10.1f} MB" if peak is not None else ""))
+        return result
+
+# --- ETAPAS (mismos cálculos que dashboard_ventas.py, sin la capa de Streamlit) ---
+def global_filters(df_v, df_a, cube, estado, conc, engines, vendedor="Todos"):
+    engine_v, engine_a, engine_c = engines
+    sel_canal = engine_v.values('canal')
+    dff_canal = engine_v.select(canal=sel_canal)
+    vendedores = sorted(dff_canal['vendedor'].dropna().unique().tolist())
+    filtro = [vendedor] if vendedor != "Todos" else vendedores
+    dff = engine_v.select(canal=sel_canal, vendedor=[vendedor] if vendedor != "Todos" else None)
+    cells = sales_cube.cube_select(cube, sel_canal, vendedor)
+    conc_filt = engine_c.select(vendedor=filtro)
+    return {'dff': dff, 'df_a_filt': engine_a.select(vendedor=filtro), 'cells': cells, 'kpis': sales_cube.cube_kpis(cells),
+            'estado': client_state.state_select(estado, sel_canal, vendedor), 'conc_pre': conc_filt[conc_filt['lineas_pre'] > 0],
+            'sel_canal': sel_canal, 'vendedor': vendedor}
+
+def tab_computations(ctx, df_v, df_r, engine_r, engine_v, conc, geo):
+    dff, df_a_filt, cells, estado = ctx['dff'], ctx['df_a_filt'], ctx['cells'], ctx['estado']
+    resumen = lambda: client_state.client_summary(estado)
+
+    def rebotes():
+        df_r_local = engine_r.select()
+        return (df_r_local.groupby('vendedor')['monto_rechazo'].sum(), df_r_local.groupby('distribuidor')['monto_rechazo'].sum(),
+                df_r_local.groupby('motivo_rechazo')['monto_rechazo'].sum(), reconciliation.lookup(conc, df_r_local['nro_preventa']))
+
+    def mapa():
+        df_map = analytics.route_status(geo.points.iloc[geo.select(df_a_filt['clienteid'])], resumen())
+        capa = geo.aggregate(df_map.index.to_numpy(), df_map['Status'], geo.fit_zoom(df_map.index.to_numpy()))
+        pendientes = df_map[df_map['Status'] == 'Sin Compra'].head(routing.MAX_PARADAS)
+        return capa, routing.sequence_stops(pendientes), analytics.whatsapp_message(pendientes)
+
+    def clientes():
+        r = resumen()
+        cd = engine_v.select(canal=ctx['sel_canal'], clienteid=[r['clienteid'].iloc[0]])
+        return analytics.churn_clients(estado, r, df_v['fecha'].min(), df_v['fecha'].max()), cd.groupby('producto', observed=True)['monto_real'].sum().nlargest(10)
+
+    def simulador():
+        fc = forecast.build_forecast(cells, df_v['fecha'].min(), df_v['fecha'].max())
+        return [forecast.scenario(fc, t, c, 3600000) for t in range(0, 51, 10) for c in range(0, 51, 10)]
+
+    return {
+        'tab_rebotes': rebotes,
+        'tab_penetracion': lambda: (analytics.penetration_by_seller(df_a_filt, estado), analytics.client_visit_status(df_a_filt, resumen())),
+        'tab_frecuencia': lambda: analytics.frequency_by_seller(analytics.frequency_table(df_a_filt, resumen())),
+        'tab_mapa': mapa,
+        'tab_caida': lambda: ctx['conc_pre'].groupby('vendedor')['caida'].sum().nlargest(10),
+        'tab_simulador': simulador,
+        'tab_estrategia': lambda: (sales_cube.cube_daily(cells), sales_cube.cube_sum(cells, ['canal', 'vendedor'])),
+        'tab_finanzas': lambda: sales_cube.cube_sum(cells, 'tipopago'),
+        'tab_clientes': clientes,
+        'tab_auditoria': lambda: analytics.audit_pivot(dff, 'jerarquia1'),
+        'tab_inteligencia': lambda: basket.build_basket(dff, 50),
+    }
+
+def sql_computations(sb, vendedor=None):
+    # Mismas pestañas con el motor DuckDB (lo que el dashboard consulta por SQL)
+    filtros = {'canal': sb.values('canal'), 'vendedor': [vendedor] if vendedor else None}
+    return {
+        'sql_kpis': lambda: sb.kpis(**filtros),
+        'sql_penetracion': lambda: sb.client_cells(**filtros),
+        'sql_frecuencia': lambda: sb.client_summary(**filtros),
+        'sql_caida': lambda: sb.drops(filtros['vendedor']),
+        'sql_estrategia': lambda: sb.daily(**filtros),
+        'sql_finanzas': lambda: sb.cells(**filtros),
+        'sql_auditoria': lambda: analytics.audit_pivot(sb.audit('jerarquia1', **filtros), 'jerarquia1'),
+    }
+
+def run_sql(medir):
+    # Sin snapshots: la venta y la preventa se pasan a Parquet por tramos
+    shutil.rmtree(data_loader.SNAPSHOT_DIR, ignore_errors=True)
+    df_a = data_loader.load_source('maestro')
+    medir('sql_parquet_tramos', lambda: sql_backend.SQLBackend(df_a).con.close())
+    sb = medir('sql_registro', lambda: sql_backend.SQLBackend(df_a))
+    for nombre, fn in sql_computations(sb).items():
+        medir(nombre, fn)
+    medir('sql_vendedor', lambda: [fn() for fn in sql_computations(sb, sb.values('vendedor')[0]).values()])
+
+def run_size(rows, data_root, medir, sql=False):
+    data_dir = os.path.join(data_root, f"rows_{rows}")
+    if not os.path.exists(os.path.join(data_dir, 'venta_completa.csv')):
+        print(f"  generando datos en {data_dir} ...")
+        synthetic_data.generate(data_dir, rows)
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        if sql: return run_sql(medir)
+        shutil.rmtree(data_loader.SNAPSHOT_DIR, ignore_errors=True)
+        medir('load_cold', data_loader.load_consolidated_data)
+        df_v, df_p, df_a, df_r = medir('load_warm', data_loader.load_consolidated_data)
+        historico = medir('sync_historico', lambda: partition_store.sync_partitions(df_v))
+        hasta = df_v['fecha'].max()
+        medir('periodo_semana', lambda: partition_store.load_period(historico, hasta - pd.Timedelta(days=6), hasta))
+        medir('comparacion_mom_yoy', lambda: [partition_store.period_kpis(historico, d, h) for d, h in partition_store.comparison_periods(hasta.replace(day=1), hasta).values()])
+
+        cube = medir('build_cube', lambda: sales_cube.build_cube(df_v))
+        estado = medir('build_client_state', lambda: client_state.build_client_state(df_v))
+        conc = medir('build_reconciliation', lambda: reconciliation.build_reconciliation(df_v, df_p, df_r))
+        geo = medir('build_geo_index', lambda: geo_index.GeoIndex(df_a))
+        engines = medir('build_filter_engines', lambda: (
+            FilterEngine(df_v, ('canal', 'vendedor', 'jerarquia1', 'categoria', 'producto', 'clienteid')),
+            FilterEngine(df_a, ('vendedor',)), FilterEngine(conc, ('vendedor',))))
+        engine_r = FilterEngine(df_r, ('vendedor', 'distribuidor', 'zona'))
+
+        ctx = medir('filters_todos', lambda: global_filters(df_v, df_a, cube, estado, conc, engines))
+        medir('filters_vendedor', lambda: global_filters(df_v, df_a, cube, estado, conc, engines, engines[0].values('vendedor')[0]))
+        for nombre, fn in tab_computations(ctx, df_v, df_r, engine_r, engines[0], conc, geo).items():
+            medir(nombre, fn)
+    finally:
+        os.chdir(cwd)
+
+# --- VERIFICACIÓN INCREMENTAL ---
+# Carga los archivos sin su último tramo, los completa (filas anexadas al final, como llega la
+# venta durante el mes) y compara lo actualizado por tramos contra una reconstrucción completa.
+def _comparable(df):
+    # Las categorías pueden quedar en otro orden según el camino: se comparan los valores
+    return df.astype({c: 'object' for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+def _same(nombre, a, b):
+    # Sumar por tramos cambia el orden de las sumas: los montos se comparan al centavo, el
+    # resto (claves, atributos, estado de la preventa, bitmaps) exacto
+    try:
+        pd.testing.assert_frame_equal(_comparable(a), _comparable(b), check_exact=False, rtol=0, atol=0.01)
+        print(f"  {nombre:<24}OK")
+        return True
+    except AssertionError as e:
+        print(f"  {nombre:<24}DIFERENCIA\n{e}")
+        return False
+
+def check_incremental(rows, data_root, tail):
+    data_dir = os.path.join(data_root, f"rows_{rows}")
+    if not os.path.exists(os.path.join(data_dir, 'venta_completa.csv')):
+        synthetic_data.generate(data_dir, rows)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        for f in os.listdir(data_dir):
+            if os.path.isfile(os.path.join(data_dir, f)): shutil.copy(os.path.join(data_dir, f), tmp)
+        os.chdir(tmp)
+        try:
+            colas = {}
+            for name in data_loader.APPEND_SOURCES:
+                path = data_loader.find_file_fuzzy(data_loader.SOURCES[name][0])
+                with open(path, 'rb') as f: lineas = f.readlines()
+                corte = len(lineas) - int((len(lineas) - 1) * tail)
+                with open(path, 'wb') as f: f.writelines(lineas[:corte])
+                colas[path] = lineas[corte:]
+
+            # Estado con los archivos recortados (snapshots, venta compacta, estado y conciliación),
+            # como lo arma el dashboard: la venta cruda solo pasa por load_sales
+            df_p, maestro, df_r = (data_loader.load_source(n) for n in ['preventa', 'maestro', 'rebotes'])
+            ventas, _, _, clave = data_loader.load_sales(maestro)
+            estado = client_state.build_client_state(ventas)
+            reconciliation.load_reconciliation(ventas, df_p, df_r)
+            generacion = data_loader.snapshot_generation('venta')
+
+            for path, cola in colas.items():
+                with open(path, 'ab') as f: f.writelines(cola)
+
+            # Por tramos: snapshots anexados (la preventa extendiendo la que ya está en memoria),
+            # venta compacta, estado y conciliación actualizados
+            ventas_inc, _, _, _ = data_loader.load_sales(maestro, prev=ventas, prev_key=clave)
+            inc = {'venta': data_loader.load_source('venta'), 'preventa': data_loader.load_source('preventa', prev=df_p)}
+            ok = data_loader.snapshot_generation('venta') == generacion
+            print(f"  {'ingesta por tramos':<24}{'OK' if ok else 'NO (se re-parseó completo)'}")
+            estado_inc = client_state.update_client_state(estado, ventas_inc.iloc[len(ventas):])
+            conc_inc = reconciliation.load_reconciliation(ventas_inc, inc['preventa'], df_r)
+
+            # Completo, sin snapshots
+            shutil.rmtree(data_loader.SNAPSHOT_DIR)
+            full = {n: data_loader.load_source(n) for n in ['venta', 'preventa', 'maestro']}
+            ventas_full, _, _ = data_loader.build_sales(None, full['venta'], full['maestro'])
+
+            ok &= _same('snapshot_venta', inc['venta'], full['venta'])
+            ok &= _same('snapshot_preventa', inc['preventa'], full['preventa'])
+            ok &= _same('venta_compacta', ventas_inc, ventas_full)
+            if estado_inc is None: print(f"  {'estado_clientes':<24}NO (update_client_state pidió reconstruir)"); ok = False
+            else:
+                keys = [c for c in client_state.STATE_KEYS if c in estado_inc.columns]
+                orden = lambda s: _comparable(s).sort_values(keys).reset_index(drop=True)
+                ok &= _same('estado_clientes', orden(estado_inc), orden(client_state.build_client_state(ventas_full)))
+            ok &= _same('conciliacion', conc_inc, reconciliation.build_reconciliation(ventas_full, full['preventa'], df_r))
+        finally:
+            os.chdir(cwd)
+    return ok
+
+# --- LÍNEA BASE ---
+def peak_rss_mb():
+    # Pico de memoria residente del proceso (ru_maxrss está en KB en Linux)
+    try:
+        import resource
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except: return None
+
+def git_commit():
+    try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except: return None
+
+def compare(actual, base, tolerance):
+    # Regresión = más lento (o más memoria) que la base en más de `tolerance`, ignorando
+    # etapas por debajo de 50 ms / 1 MB donde el ruido domina
+    regresiones = []
+    for rows, etapas in actual['results'].items():
+        for nombre, m in etapas.items():
+            b = base.get('results', {}).get(rows, {}).get(nombre)
+            if not b: continue
+            for key, minimo in [('wall_s', 0.05), ('peak_mb', 1.0)]:
+                if m.get(key) is None or b.get(key) is None or max(m[key], b[key]) < minimo: continue
+                ratio = m[key] / max(b[key], 1e-9)
+                if ratio > 1 + tolerance: regresiones.append((rows, nombre, key, b[key], m[key], ratio))
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline del dashboard")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--data-root', default='synthetic_data')
+    parser.add_argument('--save', help="guardar resultados como JSON")
+    parser.add_argument('--compare', help="JSON de una corrida anterior")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--memory', choices=['rss', 'tracemalloc', 'none'], default='rss')
+    parser.add_argument('--sql', action='store_true', help="medir el motor DuckDB en vez del camino en memoria")
+    parser.add_argument('--check-incremental', action='store_true', help="verificar que la actualización por tramos coincide con reconstruir")
+    parser.add_argument('--tail', type=float, default=0.1, help="fracción final de filas que se anexa en --check-incremental")
+    args = parser.parse_args()
+
+    if args.check_incremental:
+        resultados = []
+        for rows in args.rows:
+            print(f"Filas de venta: {rows:,} (último {args.tail:.0%} anexado)")
+            resultados.append(check_incremental(rows, os.path.abspath(args.data_root), args.tail))
+        sys.exit(0 if all(resultados) else 1)
+
+    actual = {'meta': {'fecha': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                       'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                       'maquina': platform.machine(), 'memoria': args.memory, 'motor': 'duckdb' if args.sql else 'memoria'},
+              'results': {}}
+    for rows in args.rows:
+        print(f"Filas de venta: {rows:,}")
+        medir = Medidor(memoria=None if args.memory == 'none' else args.memory)
+        run_size(rows, os.path.abspath(args.data_root), medir, args.sql)
+        actual['results'][str(rows)] = medir.etapas
+    actual['meta']['rss_pico_mb'] = peak_rss_mb()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f: json.dump(actual, f, indent=2)
+        print(f"Guardado en {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f: base = json.load(f)
+        regresiones = compare(actual, base, args.tolerance)
+        for rows, nombre, key, antes, despues, ratio in regresiones:
+            print(f"REGRESIÓN {rows} filas · {nombre} · {key}: {antes} → {despues} ({ratio:.2f}x)")
+        if regresiones: sys.exit(1)
+        print(f"Sin regresiones respecto de {args.compare} (tolerancia {args.tolerance:.0%})")
+
+if __name__ == '__main__':
+    main()
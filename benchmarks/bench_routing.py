@@ -0,0 +1,40 @@
+# --- MICRO-BENCHMARK: SECUENCIA DE VISITAS ---
+# Mide matriz haversine + vecino más cercano + 2-opt sobre coordenadas sintéticas alrededor de
+# Santa Cruz y compara el largo del recorrido contra el orden original de la lista.
+# Uso: python benchmarks/bench_routing.py [--stops 100 200 300]
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import routing
+
+def synthetic_stops(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'cliente': [f"CLIENTE {i}" for i in range(n)],
+                         'latitud': -17.78 + rng.normal(0, 0.03, n), 'longitud': -63.18 + rng.normal(0, 0.03, n)})
+
+def main():
+    parser = argparse.ArgumentParser(description="Secuencia de visitas")
+    parser.add_argument('--stops', type=int, nargs='+', default=[100, 200, 300])
+    args = parser.parse_args()
+
+    print(f"{'Paradas':>8}{'Matriz (s)':>12}{'NN (s)':>10}{'2-opt (s)':>11}{'Total (s)':>11}{'km lista':>10}{'km NN':>9}{'km 2-opt':>10}")
+    for n in args.stops:
+        df = synthetic_stops(n)
+        t0 = time.perf_counter()
+        D = routing.haversine_matrix(df['latitud'], df['longitud'])
+        t1 = time.perf_counter()
+        nn = routing.nearest_neighbor(D, 0)
+        t2 = time.perf_counter()
+        opt = routing.two_opt(nn, D)
+        t3 = time.perf_counter()
+        assert sorted(opt.tolist()) == list(range(n))
+        lista = routing.route_length(np.arange(n), D)
+        print(f"{n:>8}{t1 - t0:>12.4f}{t2 - t1:>10.4f}{t3 - t2:>11.4f}{t3 - t0:>11.4f}{lista:>10.1f}{routing.route_length(nn, D):>9.1f}{routing.route_length(opt, D):>10.1f}")
+
+if __name__ == '__main__':
+    main()
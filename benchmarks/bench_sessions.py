@@ -0,0 +1,43 @@
+# --- MICRO-BENCHMARK: MEMORIA POR SESIÓN ---
+# Abre N sesiones del dashboard en un mismo proceso (como un servidor Streamlit con varios
+# supervisores conectados) y mide cuánto crece la memoria residente con cada sesión nueva.
+# Las tablas base se comparten (cache_resource): cada sesión debería sumar KB, no una copia
+# de la venta. Uso: python benchmarks/bench_sessions.py --data-dir <carpeta con los CSV> [--sessions 10]
+import argparse
+import gc
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import data_loader
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por sesión")
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--sessions', type=int, default=10)
+    args = parser.parse_args()
+
+    from streamlit.testing.v1 import AppTest
+    os.chdir(args.data_dir)
+    app = os.path.join(ROOT, 'dashboard_ventas.py')
+
+    sesiones = []
+    base = None
+    print(f"{'Sesión':>7}{'Rerun (s)':>11}{'Proceso (MB)':>14}{'Δ (MB)':>9}  Memoria informada")
+    for i in range(1, args.sessions + 1):
+        t = time.perf_counter()
+        at = AppTest.from_file(app, default_timeout=600)
+        at.run()
+        dt = time.perf_counter() - t
+        sesiones.append(at)
+        gc.collect()
+        rss = data_loader.process_rss_mb()
+        delta = rss - base if base is not None else 0.0
+        informada = " · ".join(c.value for c in at.caption if 'sesión' in c.value or 'Compartido' in c.value)
+        print(f"{i:>7}{dt:>11.2f}{rss:>14.1f}{delta:>9.1f}  {informada}")
+        base = rss
+
+if __name__ == '__main__':
+    main()
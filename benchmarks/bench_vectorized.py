@@ -0,0 +1,107 @@
+# --- MICRO-BENCHMARK: FILA A FILA vs VECTORIZADO ---
+# Compara las versiones anteriores (apply / iterrows) con las vectorizadas de data_loader y
+# analytics sobre datos sintéticos, y verifica que ambas den el mismo resultado.
+# Uso: python benchmarks/bench_vectorized.py [--rows 1000000]
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import analytics
+from data_loader import clean_currency_hybrid
+
+# --- VERSIONES ANTERIORES (FILA A FILA) ---
+def currency_rowwise(serie):
+    def clean(x):
+        s = str(x).strip()
+        if ',' in s:
+            return s.replace('.', '').replace(',', '.')
+        return s
+    return serie.apply(clean)
+
+def frequency_rowwise(f):
+    def clasificar(f):
+        if f == 0: return 'Sin Compra (0)'
+        elif f < 3: return 'Baja (<3)'
+        elif f <= 5: return 'En Modelo (3-5)'
+        else: return 'Alta (>5)'
+    return f.apply(clasificar)
+
+def status_rowwise(df_a, dff):
+    clients_buy = set(dff['clienteid'].unique())
+    return df_a['clienteid'].apply(lambda x: 'Con Compra' if x in clients_buy else 'Sin Compra')
+
+def drop_status_rowwise(m):
+    return m.apply(lambda x: 'Entregado' if x['diff']<=5 else 'Rechazo', axis=1)
+
+def links_rowwise(df):
+    return df.apply(lambda row: f"https://www.google.com/maps/dir/?api=1&destination={row['latitud']},{row['longitud']}", axis=1)
+
+def whatsapp_rowwise(pendientes):
+    msg = f"🚨 *RUTA PENDIENTE*\n📉 Faltan: {len(pendientes)}\n\n"
+    for idx, row in pendientes.iterrows():
+        msg += f"❌ *{row['cliente']}*\n📍 https://www.google.com/maps/search/?api=1&query={row['latitud']},{row['longitud']}\n\n"
+    return msg
+
+# --- VERSIONES VECTORIZADAS (ACTUALES) ---
+def status_vectorized(df_a, dff):
+    return np.where(analytics.bought(df_a['clienteid'], dff), 'Con Compra', 'Sin Compra')
+
+def drop_status_vectorized(m):
+    return np.where(m['diff'] <= 5, 'Entregado', 'Rechazo')
+
+def links_vectorized(df):
+    return "https://www.google.com/maps/dir/?api=1&destination=" + analytics.coords_text(df)
+
+# --- DATOS SINTÉTICOS ---
+def synthetic_inputs(n, seed=42):
+    rng = np.random.default_rng(seed)
+    montos = rng.gamma(2, 500, n).round(2)
+    latino = pd.Series(montos).map('{:,.2f}'.format).str.replace(',', 'X').str.replace('.', ',').str.replace('X', '.')
+    estandar = pd.Series(montos).astype(str)
+    ids = rng.integers(0, n // 2, n)
+    return {
+        'montos': latino.where(rng.random(n) < 0.5, estandar),
+        'frecuencia': pd.Series(rng.integers(0, 10, n).astype(float)),
+        'maestro': pd.DataFrame({
+            'clienteid': ids, 'cliente': 'CLIENTE ' + pd.Series(ids).astype(str),
+            'latitud': -17.78 + rng.normal(0, 0.05, n), 'longitud': -63.18 + rng.normal(0, 0.05, n)
+        }),
+        'venta': pd.DataFrame({'clienteid': rng.integers(0, n // 2, n)}),
+        'caida': pd.DataFrame({'diff': rng.normal(0, 20, n)}),
+    }
+
+def timed(fn, *args):
+    t = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t
+
+def main():
+    parser = argparse.ArgumentParser(description="Fila a fila vs vectorizado")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    d = synthetic_inputs(args.rows)
+    casos = [
+        ("clean_currency_hybrid", currency_rowwise, clean_currency_hybrid, (d['montos'],)),
+        ("clasificar frecuencia", frequency_rowwise, analytics.classify_frequency, (d['frecuencia'],)),
+        ("Status/Estado (membresía)", status_rowwise, status_vectorized, (d['maestro'], d['venta'])),
+        ("Caída Entregado/Rechazo", drop_status_rowwise, drop_status_vectorized, (d['caida'],)),
+        ("Link Google Maps", links_rowwise, links_vectorized, (d['maestro'],)),
+        ("Mensaje WhatsApp", whatsapp_rowwise, lambda p: analytics.whatsapp_message(p, limit=len(p)), (d['maestro'],)),
+    ]
+
+    print(f"Filas: {args.rows:,}")
+    print(f"{'Caso':<28}{'Antes (s)':>12}{'Después (s)':>14}{'Mejora':>10}  Iguales")
+    for nombre, antes, despues, entradas in casos:
+        r_antes, t_antes = timed(antes, *entradas)
+        r_despues, t_despues = timed(despues, *entradas)
+        if isinstance(r_antes, str): iguales = r_antes == r_despues
+        else: iguales = bool((np.asarray(r_antes, dtype=object) == np.asarray(r_despues, dtype=object)).all())
+        print(f"{nombre:<28}{t_antes:>12.3f}{t_despues:>14.3f}{t_antes / max(t_despues, 1e-9):>9.1f}x  {'sí' if iguales else 'NO'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# --- GENERADOR DE DATOS SINTÉTICOS ---
+# Escribe venta_completa.csv, preventa.csv, Maestro_de_clientes.csv y rebotes.csv con las
+# mismas columnas y formatos que los archivos reales: `;` en venta/preventa/maestro y `,` en
+# rebotes, fechas dd/mm/YYYY, montos de preventa con coma decimal (mezclados con punto, como
+# los limpia clean_currency_hybrid) y coordenadas alrededor de Santa Cruz. La venta se
+# escribe por tramos, así 10M de filas no necesitan tenerse enteras en memoria.
+# Uso: python benchmarks/synthetic_data.py --rows 1000000 --out <carpeta>
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_loader import CAT_MAP
+
+DIAS = ['Lunes', 'Martes', 'Miercoles', 'Jueves', 'Viernes', 'Sábado']
+PAGOS = ['Contado', 'Crédito']
+MOTIVOS = ['Cliente Sin Dinero', 'Cliente Cerrado', 'Producto Dañado', 'No Pidió', 'Error de Preventa']
+LINEAS_POR_TX = 5
+
+def latin_amount(montos):
+    # 1234.5 -> "1.234,50"
+    return montos.map('{:,.2f}'.format).str.replace(',', 'X').str.replace('.', ',').str.replace('X', '.')
+
+def sellers(n_clientes):
+    extra = max(7, min(60, n_clientes // 4000))
+    return list(CAT_MAP) + [f"VENDEDOR RUTA {i:02d}" for i in range(1, extra + 1)]
+
+def make_clients(n, rng):
+    vend = np.array(sellers(n))
+    return pd.DataFrame({
+        'Cliente ID': np.arange(1, n + 1),
+        'Cliente': pd.Series(np.arange(1, n + 1)).map('CLIENTE {:07d}'.format),
+        'Vendedor': vend[rng.integers(0, len(vend), n)],
+        'Latitud': (-17.78 + rng.normal(0, 0.05, n)).round(8),
+        'Longitud': (-63.18 + rng.normal(0, 0.05, n)).round(8),
+    })
+
+def write_maestro(clientes, path, rng):
+    # Una fila por cliente y día de visita (1 a 3 días), como el maestro real
+    visitas = rng.integers(1, 4, len(clientes))
+    rows = clientes.loc[clientes.index.repeat(visitas)].reset_index(drop=True)
+    vend_code = pd.factorize(rows['Vendedor'])[0]
+    rows['Dia'] = np.array(DIAS)[(rows.groupby('Cliente ID').cumcount().to_numpy() + rows['Cliente ID'].to_numpy()) % len(DIAS)]
+    rows['Ruta'] = pd.Series(vend_code).map('RUTA{:03d}'.format) + rows['Dia'].str[:2].str.upper()
+    rows['Tipo Negocio'] = 'MINORISTA'
+    rows['Estado'] = 'Activo'
+    cols = ['Cliente ID', 'Cliente', 'Vendedor', 'Tipo Negocio', 'Latitud', 'Longitud', 'Estado', 'Ruta', 'Dia']
+    rows[cols].to_csv(path, sep=';', index=False)
+    return len(rows)
+
+def generate(out_dir, rows, seed=42, chunk_tx=200_000):
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    n_tx = max(1, rows // LINEAS_POR_TX)
+    clientes = make_clients(max(200, min(rows // 20, 500_000)), rng)
+    fechas = pd.date_range('2025-10-01', '2025-10-31')
+    fechas = fechas[fechas.dayofweek < 6].strftime('%d/%m/%Y').to_numpy()
+    productos = np.array([f"PROD {i:04d}" for i in range(max(120, min(rows // 2000, 3000)))])
+    categorias = np.array([f"CAT {i % 40:02d}" for i in range(len(productos))])
+    jerarquias = np.array([f"J1 {i % 6}" for i in range(len(productos))])
+    distribuidores = np.array([f"DISTRIBUIDOR {i:02d}" for i in range(1, 13)])
+
+    paths = {k: os.path.join(out_dir, f) for k, f in [('venta', 'venta_completa.csv'), ('preventa', 'preventa.csv'),
+                                                      ('maestro', 'Maestro_de_clientes.csv'), ('rebotes', 'rebotes.csv')]}
+    counts = {'venta': 0, 'preventa': 0, 'rebotes': 0}
+    counts['maestro'] = write_maestro(clientes, paths['maestro'], rng)
+
+    escritas = 0
+    for k, inicio in enumerate(range(0, n_tx, chunk_tx)):
+        tx = np.arange(inicio, min(n_tx, inicio + chunk_tx))
+        cli = rng.integers(0, len(clientes), len(tx))
+        fecha = fechas[rng.integers(0, len(fechas), len(tx))]
+        pago = np.array(PAGOS)[(rng.random(len(tx)) < 0.3).astype(int)]
+        # Líneas por transacción: el último tramo completa exactamente `rows`
+        lineas = rng.integers(1, 2 * LINEAS_POR_TX, len(tx))
+        if tx[-1] == n_tx - 1: lineas[-1] = max(1, rows - escritas - lineas[:-1].sum())
+        escritas += lineas.sum()
+        pos = np.repeat(np.arange(len(tx)), lineas)
+        prod = rng.integers(0, len(productos), len(pos))
+        monto = rng.gamma(2, 50, len(pos)).round(2)
+        venta = pd.DataFrame({
+            'ventaid': 1_000_000 + tx[pos], 'preventaid': 5_000_000 + tx[pos], 'fecha': fecha[pos],
+            'clienteid': clientes['Cliente ID'].to_numpy()[cli][pos], 'cliente': clientes['Cliente'].to_numpy()[cli][pos],
+            'vendedor': clientes['Vendedor'].to_numpy()[cli][pos], 'tipopago': pago[pos],
+            'producto': productos[prod], 'categoria': categorias[prod], 'jerarquia1': jerarquias[prod], 'montofinal': monto})
+        venta.to_csv(paths['venta'], sep=';', index=False, mode='w' if k == 0 else 'a', header=k == 0)
+        counts['venta'] += len(venta)
+
+        # Preventa: lo entregado más lo que se cayó (en ~25% de las preventas)
+        entregado = np.bincount(pos, weights=monto, minlength=len(tx))
+        pedido = entregado * np.where(rng.random(len(tx)) < 0.25, rng.uniform(1.05, 1.6, len(tx)), 1.0)
+        pedido_txt = pd.Series(pedido.round(2))
+        pedido_txt = latin_amount(pedido_txt).where(rng.random(len(tx)) < 0.7, pedido_txt.astype(str))
+        preventa = pd.DataFrame({'nro_preventa': 5_000_000 + tx, 'fecha': fecha,
+                                 'vendedor': clientes['Vendedor'].to_numpy()[cli], 'montofinal': pedido_txt})
+        preventa.to_csv(paths['preventa'], sep=';', index=False, mode='w' if k == 0 else 'a', header=k == 0)
+        counts['preventa'] += len(preventa)
+
+        caidas = np.flatnonzero(pedido - entregado > 5)
+        fecha_dt = pd.to_datetime(fecha[caidas], format='%d/%m/%Y')
+        rebotes = pd.DataFrame({
+            'Nro Preventa': 5_000_000 + tx[caidas], 'Fecha Preventa': fecha[caidas],
+            'Fecha Entrega': (fecha_dt + pd.Timedelta(days=1)).strftime('%d/%m/%Y'),
+            'Vendedor': clientes['Vendedor'].to_numpy()[cli[caidas]], 'Distribuidor': distribuidores[rng.integers(0, len(distribuidores), len(caidas))],
+            'Cliente': clientes['Cliente'].to_numpy()[cli[caidas]], 'Zona': pd.Series(rng.integers(1, 200, len(caidas))).map('UV-{}'.format).to_numpy(),
+            'Monto Preventa': pedido[caidas].round(4), 'Monto Venta': entregado[caidas].round(4),
+            'Monto Rechazo': (pedido[caidas] - entregado[caidas]).round(4),
+            'Porc. Rechazo': ((pedido[caidas] - entregado[caidas]) / pedido[caidas] * 100).round(4),
+            'Motivo Rechazo': np.array(MOTIVOS)[rng.integers(0, len(MOTIVOS), len(caidas))]})
+        rebotes.to_csv(paths['rebotes'], sep=',', index=False, mode='w' if k == 0 else 'a', header=k == 0)
+        counts['rebotes'] += len(rebotes)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera archivos sintéticos del dashboard")
+    parser.add_argument('--rows', type=int, default=10_000, help="filas de venta")
+    parser.add_argument('--out', default='synthetic_data')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    counts = generate(args.out, args.rows, args.seed)
+    print(" · ".join(f"{k}: {v:,}" for k, v in counts.items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import operator
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+from sales_cube import _bitmaps_by_cell
+
+# --- ESTADO POR CLIENTE ---
+# Una fila por cliente × vendedor × canal con primera y última compra, monto acumulado y dos
+# bitmaps (enteros de Python) con los días y las semanas (semana_anio) en que compró. Igual
+# que en el cubo, los bitmaps se combinan con OR: al juntar filas (varios vendedores/canales,
+# o un tramo nuevo de venta) los días y semanas distintos siguen siendo exactos.
+# - Días: bit = días desde `origen` (la primera fecha de la venta), guardado en attrs como
+#   texto ISO (los attrs pasan a las tablas que se muestran y Streamlit los serializa).
+STATE_KEYS = ['clienteid', 'cliente', 'vendedor', 'canal']
+
+def build_client_state(df_v, origen=None):
+    keys = [c for c in STATE_KEYS if c in df_v.columns]
+    if origen is None: origen = df_v['fecha'].min()
+    group = df_v.groupby(keys, observed=True, sort=False)
+    cell = group.ngroup().to_numpy()
+
+    state = group.agg(primera=('fecha', 'min'), ultima=('fecha', 'max'), monto_real=('monto_real', 'sum')).reset_index()
+    state['monto_real'] = state['monto_real'].astype('float64')
+    dias = (df_v['fecha'] - origen).dt.days.fillna(-1).astype('int64').to_numpy()
+    state['dias'] = _bitmaps_by_cell(cell, dias, len(state))
+    if 'semana_anio' in df_v.columns:
+        semanas = df_v['semana_anio'].astype('float64').fillna(-1).astype('int64').to_numpy()
+        state['semanas'] = _bitmaps_by_cell(cell, semanas, len(state))
+    state.attrs['origen'] = pd.Timestamp(origen).isoformat()
+    return state
+
+def _or(bitmaps):
+    return reduce(operator.or_, bitmaps, 0)
+
+def _rollup(rows, keys):
+    # Junta filas repetidas por `keys`; las que ya son únicas pasan sin tocar
+    dup = rows.duplicated(keys, keep=False).to_numpy()
+    if not dup.any(): return rows.reset_index(drop=True)
+    agg = {'primera': ('primera', 'min'), 'ultima': ('ultima', 'max'), 'monto_real': ('monto_real', 'sum'), 'dias': ('dias', _or)}
+    if 'semanas' in rows.columns: agg['semanas'] = ('semanas', _or)
+    extra = [c for c in rows.columns if c not in keys and c not in agg]
+    agg.update({c: (c, 'first') for c in extra})
+    merged = rows[dup].groupby(keys, observed=True, sort=False).agg(**agg).reset_index()
+    return pd.concat([rows[~dup], merged[rows.columns]], ignore_index=True)
+
+def update_client_state(state, delta):
+    # Incorpora solo las filas nuevas de venta; si traen fechas anteriores al origen, se
+    # debe reconstruir (devuelve None)
+    origen = pd.Timestamp(state.attrs.get('origen', 'NaT'))
+    if delta.empty: return state
+    if pd.isna(origen) or delta['fecha'].min() < origen: return None
+    keys = [c for c in STATE_KEYS if c in state.columns]
+    nuevo = build_client_state(delta, origen)
+    if list(nuevo.columns) != list(state.columns): return None
+    rows = pd.concat([state, nuevo], ignore_index=True)
+    for c in keys:
+        if isinstance(state[c].dtype, pd.CategoricalDtype): rows[c] = rows[c].astype('category')
+    merged = _rollup(rows, keys)
+    merged.attrs['origen'] = state.attrs['origen']
+    return merged
+
+# --- CONSULTAS ---
+def state_select(state, canales, vendedor="Todos"):
+    mask = state['canal'].isin(canales)
+    if vendedor != "Todos": mask &= state['vendedor'] == vendedor
+    return state[mask]
+
+def client_summary(cells):
+    # Una fila por cliente: frecuencia_real = días distintos con compra, semanas = semanas
+    # distintas con compra y visitas_semana = días por semana activa
+    res = _rollup(cells.drop(columns=[c for c in ['vendedor', 'canal'] if c in cells.columns]), ['clienteid'])
+    res['frecuencia_real'] = np.fromiter((b.bit_count() for b in res['dias']), dtype='int64', count=len(res))
+    if 'semanas' in res.columns:
+        res['semanas'] = np.fromiter((b.bit_count() for b in res['semanas']), dtype='int64', count=len(res))
+        res['visitas_semana'] = res['frecuencia_real'] / res['semanas'].replace(0, 1)
+    return res.drop(columns='dias')
+
+def churn_risk(summary, fecha_min, fecha_max, dias=7):
+    # Compró en la primera semana del período y no volvió en la última
+    w1 = fecha_min + pd.Timedelta(days=dias)
+    wl = fecha_max - pd.Timedelta(days=dias)
+    return summary[(summary['primera'] <= w1) & (summary['ultima'] < wl)]['clienteid']
@@ -3,7 +3,24 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import datetime
-import os
+import functools
+import json
+import threading
+import weakref
+import data_loader
+import sales_cube
+import analytics
+import basket
+import client_state
+import geo_index
+import routing
+import reconciliation
+import forecast
+import sql_backend
+import partition_store
+import paged_table
+import profiler
+from filter_engine import FilterEngine
 
 # --- CONFIGURACIÓN ---
 st.set_page_config(page_title="Master Sales Command v37.7", page_icon="💎", layout="wide")
@@ -21,506 +38,774 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# --- FUNCIÓN: BUSCADOR DE ARCHIVOS ---
-def find_file_fuzzy(keywords):
-    current_files = os.listdir('.')
-    for f in current_files:
-        if all(k.lower() in f.lower() for k in keywords) and (f.endswith('.csv') or f.endswith('.xlsx')):
-            return f
-    return None
-
 # --- FUNCIÓN DE LECTURA ROBUSTA ---
-@st.cache_data
-def load_consolidated_data():
-    
-    file_venta = find_file_fuzzy(['venta', 'completa'])
-    file_preventa = find_file_fuzzy(['preventa'])
-    file_maestro = find_file_fuzzy(['maestro', 'cliente'])
-    file_rebotes = find_file_fuzzy(['rebotes'])
-    
-    df_v, df_p, df_a, df_r = None, None, None, None
-    
-    def read_smart(file_path):
-        if not file_path: return None
+# La lectura y normalización viven en data_loader.py; cada fuente se sirve desde su
+# snapshot Parquet (.snapshots/) mientras el archivo origen no cambie.
+# Cada fuente tiene su propia caché con la firma del archivo (ruta, tamaño, mtime) como
+# clave: re-subir rebotes.csv solo recarga rebotes, sin tocar la venta.
+# Las tablas base viven una sola vez por proceso (cache_resource, sin copia por sesión) y
+# son de solo lectura: las vistas trabajan sobre selecciones y resultados derivados propios
+# (copy-on-write), nunca modifican estas tablas.
+# Una sola versión viva por recurso (cada fuente, venta compacta, cubo, estado, conciliación,
+# motores de filtro): con otra firma la nueva reemplaza a la anterior en vez de dejar copias
+# viejas de tablas grandes hasta que las saque el LRU. `construir` recibe la versión anterior.
+@st.cache_resource
+def versiones():
+    return {'lock': threading.Lock(), 'locks': {}, 'datos': {}}
+
+def ultima_version(slot, firma, construir):
+    cache = versiones()
+    with cache['lock']: lock = cache['locks'].setdefault(slot, threading.Lock())
+    with lock:
+        actual = cache['datos'].get(slot)
+        if actual is not None and actual[0] == firma: return actual[1]
+        valor = construir(actual[1] if actual is not None else None)
+        cache['datos'][slot] = (firma, valor)
+        return valor
+
+def load_source_cached(name, signature):
+    # La versión anterior de la fuente (si es de la misma generación del snapshot) se pasa a
+    # load_source: si el archivo solo creció se le anexan las filas nuevas sin releer el snapshot
+    def cargar(anterior):
+        prev = anterior[0] if anterior and anterior[1] == data_loader.snapshot_generation(name) else None
+        df = data_loader.load_source(name, signature[0], prev) if signature else None
+        return df, data_loader.snapshot_generation(name)
+    return ultima_version(('fuente', name), signature, cargar)[0]
+
+# Venta compacta: la venta cruda no queda en caché (load_sales la lee del snapshot y la
+# suelta). Si la venta solo creció (misma generación del snapshot) y el maestro no cambió,
+# solo las filas nuevas se leen, se cruzan con el maestro y se compactan.
+def build_sales_cached(df_a, sig_v, sig_a):
+    def construir(anterior):
+        prev, prev_key = (anterior[0], anterior[3]) if anterior else (None, None)
+        return data_loader.load_sales(df_a, sig_v[0] if sig_v else None, prev, prev_key)
+    return ultima_version('venta_compacta', (sig_v, sig_a), construir)[:3]
+
+# Tipo de venta para los recursos derivados: el archivo actual o un período del histórico
+# (cada uno con su propia versión viva)
+def tipo_venta(sig_v):
+    return 'periodo' if sig_v[0] == 'periodo' else 'archivo'
+
+# Cubo fecha × vendedor × canal × tipopago, compartido entre sesiones (solo lectura)
+def build_cube_cached(df_v, sig_v, sig_a):
+    return ultima_version(('cubo', tipo_venta(sig_v)), (sig_v, sig_a), lambda _: sales_cube.build_cube(df_v))
+
+# Estado por cliente: si solo se anexaron filas de venta, se actualiza con el tramo nuevo
+@st.cache_resource
+def ultimo_estado():
+    return {}
+
+def build_client_state_cached(df_v, sig_v, sig_a, incremental=True):
+    def construir(_):
+        prev = ultimo_estado()
+        key = (data_loader.snapshot_generation('venta') if incremental else None, sig_a)
+        state = None
+        if key[0] and prev.get('key') == key and prev['rows'] <= len(df_v):
+            state = client_state.update_client_state(prev['state'], df_v.iloc[prev['rows']:])
+        if state is None: state = client_state.build_client_state(df_v)
+        prev.update(key=key, rows=len(df_v), state=state)
+        return state
+    return ultima_version(('estado', tipo_venta(sig_v)), (sig_v, sig_a, incremental), construir)
+
+# Motores de filtro por tabla; sus índices y resultados se comparten entre sesiones
+def build_filter_engine(df, dims, sig, tabla):
+    return ultima_version(('motor', tabla), (dims, sig), lambda _: FilterEngine(df, dims))
+
+# Índice geográfico del maestro (un punto por cliente), compartido entre sesiones
+def build_geo_index(df_a, sig):
+    return ultima_version('geo', sig, lambda _: geo_index.GeoIndex(df_a))
+
+# Conciliación por número de preventa, persistida en .snapshots y actualizada por tramos
+def build_reconciliation_cached(df_v, df_p, df_r, sig_v, sig_p, sig_r):
+    return ultima_version('conciliacion', (sig_v, sig_p, sig_r), lambda _: reconciliation.load_reconciliation(df_v, df_p, df_r))
+
+# Histórico particionado por año/mes/semana: se sincroniza una vez por versión de la venta
+@st.cache_resource(max_entries=2)
+def sync_history_cached(_df_v, sig_v, sig_a):
+    return partition_store.sync_partitions(_df_v)
+
+# Venta de un período fuera del archivo actual, leída solo de las particiones que toca
+@st.cache_resource(max_entries=4)
+def load_period_cached(_manifiesto, desde, hasta, version):
+    df = partition_store.load_period(_manifiesto, desde, hasta)
+    if df is not None: periodos_vivos()[(desde, hasta, version)] = df
+    return df
+
+# Períodos que siguen en la caché de arriba (salen solos cuando el LRU los desaloja)
+@st.cache_resource
+def periodos_vivos():
+    return weakref.WeakValueDictionary()
+
+# Motor SQL (DuckDB) sobre Parquet, compartido entre sesiones; se rearma si cambia un archivo
+@st.cache_resource(max_entries=2)
+def build_sql_backend(_df_a, sig_v, sig_p, sig_a):
+    return sql_backend.SQLBackend(_df_a)
+
+def load_consolidated_data(firmas):
+    with perfil.probe('preventa') as p: df_p = p.track(load_source_cached('preventa', firmas['preventa']))
+    with perfil.probe('maestro') as p: df_a = p.track(load_source_cached('maestro', firmas['maestro']))
+    with perfil.probe('rebotes') as p: df_r = p.track(load_source_cached('rebotes', firmas['rebotes']))
+    with perfil.probe('cruce_compactacion') as p: df_v, df_a, report = p.track(build_sales_cached(df_a, firmas['venta'], firmas['maestro']))
+    return df_v, df_p, df_a, df_r, report
+
+def load_sql_data(firmas):
+    # La venta y la preventa quedan en Parquet (DuckDB); maestro y rebotes, chicos, en pandas
+    with perfil.probe('maestro') as p: df_a = p.track(load_source_cached('maestro', firmas['maestro']))
+    with perfil.probe('rebotes') as p: df_r = p.track(load_source_cached('rebotes', firmas['rebotes']))
+    with perfil.probe('duckdb'): sql = build_sql_backend(df_a, firmas['venta'], firmas['preventa'], firmas['maestro'])
+    return sql, df_a, df_r
+
+# Memoria de lo compartido (se mide una vez por versión de los datos)
+@st.cache_resource(max_entries=2)
+def shared_memory_mb(_tablas, sig):
+    return sum(data_loader.memory_mb(t) for t in _tablas)
+
+def tablas_compartidas():
+    # Todos los DataFrames vivos en cache_resource: los de versiones() (fuentes, venta compacta,
+    # cubo, estado, conciliación, la tabla de cada motor de filtro y los puntos del índice geo)
+    # y los períodos del histórico, cada uno una vez aunque lo referencien varios recursos.
+    # Devuelve también una firma de ese conjunto (clave de shared_memory_mb)
+    tablas, vistos = [], set()
+    def juntar(obj):
+        if isinstance(obj, pd.DataFrame):
+            if id(obj) not in vistos: vistos.add(id(obj)); tablas.append(obj)
+        elif isinstance(obj, (tuple, list)):
+            for o in obj: juntar(o)
+        elif isinstance(obj, FilterEngine): juntar(obj.df)
+        elif isinstance(obj, geo_index.GeoIndex): juntar(obj.points)
+    datos = list(versiones()['datos'].items())
+    periodos = list(periodos_vivos().items())
+    for _, (_, valor) in datos: juntar(valor)
+    for _, df in periodos: juntar(df)
+    return tablas, tuple(sorted(str((slot, firma)) for slot, (firma, _) in datos)) + tuple(sorted(str(k) for k, _ in periodos))
+
+# --- VIGILANCIA DE ARCHIVOS ---
+# Revisa periódicamente las firmas de los archivos; si alguno cambió se relanza el script
+# y solo la fuente afectada (y el cruce con el maestro) se vuelve a construir.
+@st.fragment(run_every=30)
+def vigilar_archivos(firmas):
+    if data_loader.source_signatures() != firmas:
+        st.rerun()
+    st.caption(f"🔄 Datos verificados: {datetime.datetime.now():%H:%M:%S}")
+
+# --- VISTAS ---
+# Cada pestaña es un fragmento independiente: solo corre la vista visible y un widget dentro
+# de ella relanza únicamente esa vista. Los cálculos pesados se memorizan por vista con la
+# clave de datos + filtros globales (ctx['clave']) más los filtros propios de la vista.
+@st.cache_data(max_entries=64, show_spinner=False)
+def calc_vista(nombre, clave, _calc):
+    return _calc()
+
+# Sonda por vista (también cuando solo se relanza el fragmento) y por gráfico (serialización
+# de la figura Plotly)
+def perfilada(vista):
+    @functools.wraps(vista)
+    def wrapper(ctx):
+        propio = perfil.run(f"fragmento {vista.__name__}")
         try:
-            df = pd.read_csv(file_path, sep=';', on_bad_lines='skip', encoding='utf-8')
-            if df.shape[1] < 2: 
-                df = pd.read_csv(file_path, sep=',', on_bad_lines='skip', encoding='utf-8')
-            df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-            return df
-        except: return None
-
-    # 1. CARGAR VENTA
-    if file_venta:
-        df_v = read_smart(file_venta)
-        if df_v is not None and 'fecha' in df_v.columns:
-            if 'clienteid' in df_v.columns: df_v['clienteid'] = df_v['clienteid'].astype(str)
-            if 'cliente' in df_v.columns: df_v['cliente'] = df_v['cliente'].astype(str).str.strip().str.upper()
-            
-            df_v['fecha'] = pd.to_datetime(df_v['fecha'], format='%d/%m/%Y', dayfirst=True, errors='coerce')
-            df_v['semana_anio'] = df_v['fecha'].dt.isocalendar().week
-            
-            if 'montofinal' in df_v.columns: df_v['monto_real'] = df_v['montofinal']
-            elif 'monto' in df_v.columns: df_v['monto_real'] = df_v['monto']
-            else: df_v['monto_real'] = 0
-            
-            df_v['id_transaccion'] = df_v.get('ventaid', df_v.columns[0])
-            
-            cat_map = {
-                'JOSE CARLOS MENDOZA MENDOZA': '1. MAYORISTAS', 'KEVIN  COLODRO VACA': '1. MAYORISTAS',
-                'MARCIA MARAZ MONTAÑO': '1. MAYORISTAS', 'ABDY JOSE RUUD': '1. MAYORISTAS',
-                'MARIBEL ROLLANO CHOQUE': '2. PERIFERIA', 'RAFAEL SARDAN SALAZAR': '3. FARMACIAS',
-                'LUIS PABLO LOPEZ NEGRETE': '4. INSTITUCIONAL', 'JAVIER JUSTINIANO GOMEZ': '5. PARETOS TDB'
-            }
-            df_v['canal'] = df_v['vendedor'].map(cat_map).fillna('6. RUTA TDB')
-
-    # 2. CARGAR MAESTRO
-    if file_maestro:
-        df_a = read_smart(file_maestro)
-        if df_a is not None:
-            col_id = next((c for c in df_a.columns if 'cliente' in c and 'id' in c), None)
-            col_vend = next((c for c in df_a.columns if 'vendedor' in c), None)
-            col_nom = next((c for c in df_a.columns if 'cliente' in c and 'id' not in c), None)
-            
-            if col_id and col_vend:
-                rename_dict = {col_id: 'clienteid', col_vend: 'vendedor'}
-                if col_nom: rename_dict[col_nom] = 'cliente'
-                
-                df_a = df_a.rename(columns=rename_dict)
-                df_a['clienteid'] = df_a['clienteid'].astype(str)
-                df_a['vendedor'] = df_a['vendedor'].astype(str).str.strip()
-                
-                if 'cliente' not in df_a.columns:
-                    df_a['cliente'] = "Cliente " + df_a['clienteid']
-                
-                if 'latitud' in df_a.columns and 'longitud' in df_a.columns:
-                    df_a['latitud'] = pd.to_numeric(df_a['latitud'].astype(str).str.replace(',', '.'), errors='coerce')
-                    df_a['longitud'] = pd.to_numeric(df_a['longitud'].astype(str).str.replace(',', '.'), errors='coerce')
-                    df_a = df_a.dropna(subset=['latitud', 'longitud'])
-                    df_a = df_a[(df_a['latitud'] != 0) & (df_a['longitud'] != 0)]
-
-   # 3. CARGAR PREVENTA (LECTURA HÍBRIDA INTELIGENTE)
-    if file_preventa:
-        df_p = read_smart(file_preventa)
-        if df_p is not None and 'fecha' in df_p.columns:
-            df_p['fecha'] = pd.to_datetime(df_p['fecha'], format='%d/%m/%Y', dayfirst=True, errors='coerce')
-            
-            # Normalización de columna monto
-            col_monto_pre = next((c for c in df_p.columns if 'monto' in c and ('final' in c or 'pre' in c or 'total' in c)), None)
-            if not col_monto_pre: col_monto_pre = 'monto'
-            
-            if col_monto_pre in df_p.columns:
-                def clean_currency_hybrid(x):
-                    s = str(x).strip()
-                    # Si tiene coma, asumimos formato Latino/Europeo (1.000,00)
-                    if ',' in s:
-                        return s.replace('.', '').replace(',', '.')
-                    # Si no tiene coma, asumimos formato Estándar/Python (1000.00)
-                    return s
-
-                # Aplicar limpieza híbrida antes de convertir
-                df_p[col_monto_pre] = df_p[col_monto_pre].apply(clean_currency_hybrid)
-                
-                # Limpieza final de símbolos extraños (ej: $) y conversión
-                df_p[col_monto_pre] = pd.to_numeric(
-                    df_p[col_monto_pre].astype(str).str.replace(r'[^\d.]', '', regex=True), 
-                    errors='coerce'
-                )
-                
-                df_p['monto_pre'] = df_p[col_monto_pre].fillna(0)
+            with perfil.probe(vista.__name__): vista(ctx)
+        finally:
+            if propio: perfil.finish()
+    return wrapper
+
+def grafico(fig, destino=st):
+    with perfil.probe('plotly'): destino.plotly_chart(fig, use_container_width=True)
+
+# Tabla paginada en el servidor: búsqueda, orden y página se resuelven acá y al navegador viaja
+# solo la página. Es un fragmento propio (cambiar de página no relanza la vista) y la descarga
+# completa (filas buscadas, en el orden elegido) se genera recién al pedirla. `clave` identifica
+# el contenido de `df`: con la misma clave se reutilizan las posiciones ya ordenadas.
+@st.fragment
+def tabla(df, key, clave, orden=None, ascendente=True, column_config=None):
+    columnas = list(df.columns)
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    texto = c1.text_input("Buscar:", key=f'{key}_buscar', placeholder="🔎 Buscar...", label_visibility="collapsed")
+    col = c2.selectbox("Ordenar por:", columnas, index=columnas.index(orden) if orden in columnas else 0, key=f'{key}_orden', label_visibility="collapsed")
+    asc = c3.toggle("Ascendente", value=ascendente, key=f'{key}_asc')
+    tamano = c4.selectbox("Filas por página:", paged_table.TAMANOS, key=f'{key}_tamano', label_visibility="collapsed")
+
+    firma = (clave, texto, col, asc, len(df))
+    memo = st.session_state.get(f'{key}_pos')
+    if memo is None or memo[0] != firma:
+        memo = (firma, paged_table.order(df, texto, col, asc))
+        st.session_state[f'{key}_pos'] = memo
+        st.session_state[f'{key}_pagina'] = 1
+    pos = memo[1]
+    paginas = paged_table.n_pages(len(pos), tamano)
+    if st.session_state.get(f'{key}_pagina', 1) > paginas: st.session_state[f'{key}_pagina'] = paginas
+
+    cuerpo = st.container()
+    p1, p2, p3 = st.columns([1, 3, 1])
+    pagina = p1.number_input("Página:", 1, paginas, key=f'{key}_pagina', label_visibility="collapsed")
+    inicio = (pagina - 1) * tamano
+    p2.caption(f"Filas {min(inicio + 1, len(pos)):,}–{min(inicio + tamano, len(pos)):,} de {len(pos):,} · página {pagina} de {paginas}"
+               + (f" (búsqueda sobre {len(df):,})" if texto else ""))
+    p3.download_button("⬇️ CSV completo", lambda: df.iloc[pos].to_csv(index=False), f"{key}.csv", "text/csv", key=f'{key}_csv', on_click='ignore')
+    cuerpo.dataframe(paged_table.page(df, pos, pagina, tamano), column_config=column_config, use_container_width=True)
+
+def resumen_clientes(ctx):
+    if ctx['sql'] is not None: return calc_vista('resumen_clientes', ctx['clave'], lambda: ctx['sql'].client_summary(**ctx['filtros']))
+    return calc_vista('resumen_clientes', ctx['clave'], lambda: client_state.client_summary(ctx['estado']))
+
+# 0. REBOTES
+@st.fragment
+@perfilada
+def vista_rebotes(ctx):
+    df_r, engine_r, sel_vendedor = ctx['df_r'], ctx['engine_r'], ctx['sel_vendedor']
+    st.header("🚫 Análisis de Rebotes (Devoluciones)")
+    
+    if df_r is not None:
+        c_fr1, c_fr2, c_fr3 = st.columns(3)
+        distribuidores = engine_r.values('distribuidor') if 'distribuidor' in df_r.columns else []
+        zonas = engine_r.values('zona') if 'zona' in df_r.columns else []
+        min_d_r = df_r['fecha_filtro'].min().date() if 'fecha_filtro' in df_r.columns else None
+        max_d_r = df_r['fecha_filtro'].max().date() if 'fecha_filtro' in df_r.columns else None
+        
+        with c_fr1: sel_distribuidor = st.multiselect("Distribuidor:", distribuidores)
+        with c_fr2: sel_zona = st.multiselect("Zona:", zonas)
+        with c_fr3:
+            if min_d_r and max_d_r: sel_fecha = st.date_input("Fecha Entrega:", [min_d_r, max_d_r])
+            else: sel_fecha = None
+
+        df_r_local = engine_r.select(vendedor=ctx['filtro_vendedor'], distribuidor=sel_distribuidor or None, zona=sel_zona or None)
+        clave_r = (ctx['clave'], tuple(sel_distribuidor), tuple(sel_zona), tuple(sel_fecha or ()))
+        if sel_fecha and len(sel_fecha) == 2 and 'fecha_filtro' in df_r_local.columns:
+             df_r_local = df_r_local[(df_r_local['fecha_filtro'].dt.date >= sel_fecha[0]) & (df_r_local['fecha_filtro'].dt.date <= sel_fecha[1])]
+
+        total_rechazo = df_r_local['monto_rechazo'].sum()
+        cant_rebotes = len(df_r_local)
+        # Lo pedido y lo entregado de esas preventas sale de la conciliación (sin re-cruzar)
+        conc_r = reconciliation.lookup(ctx['conc'], df_r_local['nro_preventa']) if ctx['conc'] is not None and 'nro_preventa' in df_r_local.columns else None
+        
+        mr1, mr2, mr3 = st.columns(3)
+        mr1.markdown(f'<div class="alert-box alert-danger">💰 <b>Monto Rechazado:</b> ${total_rechazo:,.0f}</div>', unsafe_allow_html=True)
+        mr2.markdown(f'<div class="alert-box alert-warning">📦 <b>Cantidad Rebotes:</b> {cant_rebotes}</div>', unsafe_allow_html=True)
+        if conc_r is not None:
+            entregado = conc_r['monto_real'].where(conc_r['monto_real'] > 0, conc_r['monto_venta_rebote']).sum()
+            mr3.markdown(f'<div class="alert-box alert-warning">🚚 <b>Entregado de esas Preventas:</b> ${entregado:,.0f}</div>', unsafe_allow_html=True)
+                    
+        # Identificar columna motivo antes de usarla
+        col_motivo = next((c for c in df_r_local.columns if 'motivo' in c), None)
+
+        col_reb1, col_reb2 = st.columns([1, 2])
+        with col_reb1:
+            if col_motivo:
+                # Gráfico de Pastel por Cantidad (Frecuencia)
+                rechazo_motivo = df_r_local[col_motivo].value_counts().reset_index()
+                rechazo_motivo.columns = ['Motivo', 'Cantidad']
+                fig_pie_r = px.pie(rechazo_motivo, values='Cantidad', names='Motivo', title="Frecuencia de Motivos", color_discrete_sequence=px.colors.sequential.RdBu)
+                grafico(fig_pie_r)
+            else: st.info("Sin columna 'Motivo'")
+
+        with col_reb2:
+            if sel_vendedor == "Todos":
+                rebotes_vend = df_r_local.groupby('vendedor')['monto_rechazo'].sum().sort_values(ascending=False).reset_index()
+                fig_bar_r = px.bar(rebotes_vend, x='monto_rechazo', y='vendedor', orientation='h', 
+                                   title="Rechazo por Vendedor", text_auto='.2s', color='monto_rechazo', color_continuous_scale='Reds')
+                grafico(fig_bar_r)
             else:
-                df_p['monto_pre'] = 0
-
-            col_pre = next((c for c in df_p.columns if 'nro' in c and 'preventa' in c), None)
-            if col_pre: df_p['id_cruce'] = df_p[col_pre]
-            
-            df_p = df_p.drop_duplicates()
-
-    # 4. CARGAR REBOTES
-    if file_rebotes:
-        df_r = read_smart(file_rebotes)
-        if df_r is not None:
-            col_fecha_entrega = next((c for c in df_r.columns if 'entrega' in c and 'fecha' in c), None)
-            if not col_fecha_entrega: col_fecha_entrega = next((c for c in df_r.columns if 'fecha' in c), None)
-            if col_fecha_entrega:
-                df_r['fecha_filtro'] = pd.to_datetime(df_r[col_fecha_entrega], format='%d/%m/%Y', dayfirst=True, errors='coerce')
-            if 'vendedor' in df_r.columns:
-                df_r['vendedor'] = df_r['vendedor'].astype(str).str.strip().str.upper()
-            col_monto_r = next((c for c in df_r.columns if 'monto' in c and 'rechazo' in c), None)
-            if col_monto_r:
-                df_r['monto_rechazo'] = pd.to_numeric(df_r[col_monto_r], errors='coerce').fillna(0)
-
-    # ENRIQUECIMIENTO
-    if df_v is not None and df_a is not None:
-        df_v = df_v.rename(columns={'vendedor': 'vendedor_venta'})
-        temp_a = df_a[['clienteid', 'vendedor']].drop_duplicates(subset=['clienteid'])
-        df_v = pd.merge(df_v, temp_a, on='clienteid', how='left')
-        df_v['vendedor'] = df_v['vendedor'].fillna(df_v['vendedor_venta'])
-        df_v['canal'] = df_v['vendedor'].map(cat_map).fillna('6. RUTA TDB')
-
-    return df_v, df_p, df_a, df_r
+                st.subheader("Detalle")
+                cols_view = [c for c in ['fecha_filtro', 'distribuidor', 'zona', 'cliente', 'monto_rechazo', 'motivo_rechazo'] if c in df_r_local.columns]
+                tabla(df_r_local[cols_view], 'rebotes_detalle', clave_r, orden='monto_rechazo', ascendente=False)
+        
+        st.markdown("---")
+        
+        # --- NUEVOS GRÁFICOS: POR DISTRIBUIDOR Y POR MOTIVO (MONTO) ---
+        c_g1, c_g2 = st.columns(2)
+        
+        with c_g1:
+            if 'distribuidor' in df_r_local.columns:
+                rebotes_dist = df_r_local.groupby('distribuidor')['monto_rechazo'].sum().sort_values(ascending=False).reset_index()
+                fig_bar_d = px.bar(rebotes_dist, x='monto_rechazo', y='distribuidor', orientation='h',
+                                   title="🏢 Rechazo por Distribuidor ($)", text_auto='.2s', color='monto_rechazo', color_continuous_scale='OrRd')
+                grafico(fig_bar_d)
+        
+        with c_g2:
+            if col_motivo:
+                rebotes_mot_monto = df_r_local.groupby(col_motivo)['monto_rechazo'].sum().sort_values(ascending=False).reset_index()
+                fig_bar_m = px.bar(rebotes_mot_monto, x='monto_rechazo', y=col_motivo, orientation='h',
+                                   title="📉 Rechazo por Motivo ($)", text_auto='.2s', color='monto_rechazo', color_continuous_scale='Reds')
+                grafico(fig_bar_m)
+        # -----------------------------------------------------------------
+
+        st.subheader("📋 Listado Completo de Rebotes (Filtrado)")
+        if conc_r is not None: df_r_local = df_r_local.join(conc_r[['monto_pre', 'monto_real', 'st']], on='nro_preventa')
+        tabla(df_r_local, 'rebotes_listado', clave_r)
+        
+    else:
+        st.warning("⚠️ Carga el archivo 'rebotes.csv' en tu repositorio para ver este análisis.")
+
+# 1. PENETRACIÓN
+@st.fragment
+@perfilada
+def vista_penetracion(ctx):
+    df_a_filt, sel_vendedor = ctx['df_a_filt'], ctx['sel_vendedor']
+    if ctx['df_a'] is not None:
+        st.header("🎯 Penetración de Cartera")
+        resumen = resumen_clientes(ctx)
+        total_asig = df_a_filt['clienteid'].nunique()
+        total_serv = len(resumen)
+        total_no_serv = total_asig - total_serv
+        efectividad = (total_serv / total_asig * 100) if total_asig > 0 else 0
+        kp1, kp2, kp3, kp4 = st.columns(4)
+        kp1.metric("Cartera Total", total_asig)
+        kp2.metric("Visitados", total_serv)
+        kp3.metric("No Visitados", total_no_serv)
+        kp4.metric("Efectividad", f"{efectividad:.1f}%")
+        if sel_vendedor == "Todos":
+            pen = calc_vista('penetracion', ctx['clave'], lambda: analytics.penetration_by_seller(df_a_filt, ctx['estado']))
+            st.dataframe(pen.sort_values('% Pen', ascending=False).style.format({'% Pen': '{:.1f}%'}), use_container_width=True)
+            fig_p = go.Figure(data=[
+                go.Bar(name='Servidos', y=pen['vendedor'], x=pen['Servidos'], orientation='h', marker_color='#2ECC71', text=pen['Servidos'], textposition='auto'),
+                go.Bar(name='Sin Compra', y=pen['vendedor'], x=pen['Gap'], orientation='h', marker_color='#E74C3C', text=pen['Gap'], textposition='auto')
+            ])
+            fig_p.update_layout(barmode='stack', height=500, title="Cobertura de Cartera (Etiquetas Visibles)")
+            grafico(fig_p)
+        else:
+            st.subheader(f"📋 Detalle de Clientes - {sel_vendedor}")
+            clientes_maestro = calc_vista('penetracion_detalle', ctx['clave'], lambda: analytics.client_visit_status(df_a_filt, resumen))
+            tabla(clientes_maestro, 'penetracion_detalle', ctx['clave'], orden='Estado', ascendente=False)
+    else: st.warning("Carga 'Maestro_de_clientes.csv'.")
+
+# 2. FRECUENCIA
+@st.fragment
+@perfilada
+def vista_frecuencia(ctx):
+    st.header("📅 Frecuencia")
+    if ctx['df_a'] is not None:
+        df_freq = calc_vista('frecuencia', ctx['clave'], lambda: analytics.frequency_table(ctx['df_a_filt'], resumen_clientes(ctx)))
+        total_cartera = len(df_freq)
+        en_modelo = len(df_freq[df_freq['Estado'] == 'En Modelo (3-5)'])
+        fuera_modelo = total_cartera - en_modelo
+        k1, k2, k3 = st.columns(3)
+        k1.metric("Cartera", f"{total_cartera}")
+        k2.metric("En Modelo (3-5)", f"{en_modelo}")
+        k3.metric("Fuera Modelo", f"{fuera_modelo}", delta_color="inverse")
+        c_f1, c_f2 = st.columns([1, 2])
+        with c_f1:
+            resumen = df_freq['Estado'].value_counts().reset_index()
+            resumen.columns = ['Estado', 'Count']
+            fig_pie_freq = px.pie(resumen, values='Count', names='Estado', title="Distribución", color='Estado', 
+                                  color_discrete_map={'Sin Compra (0)': '#95A5A6', 'Baja (<3)': '#E74C3C', 'En Modelo (3-5)': '#2ECC71', 'Alta (>5)': '#3498DB'})
+            grafico(fig_pie_freq)
+        with c_f2:
+            freq_vend = analytics.frequency_by_seller(df_freq)
+            fig_bar_freq = px.bar(freq_vend, x='Pct', y='vendedor', color='Estado', orientation='h', 
+                               title="Cumplimiento por Vendedor (%)", text='Pct',
+                               color_discrete_map={'Sin Compra (0)': '#95A5A6', 'Baja (<3)': '#E74C3C', 'En Modelo (3-5)': '#2ECC71', 'Alta (>5)': '#3498DB'})
+            fig_bar_freq.update_traces(texttemplate='%{text:.1f}%', textposition='inside')
+            grafico(fig_bar_freq)
+        st.subheader("📋 Clientes Fuera de Modelo")
+        tabla_baja = df_freq[df_freq['Estado'].isin(['Baja (<3)', 'Sin Compra (0)'])]
+        tabla(tabla_baja[['vendedor', 'clienteid', 'cliente', 'frecuencia_real', 'Estado']], 'fuera_modelo', ctx['clave'], orden='frecuencia_real')
+    else: st.warning("Carga Maestro.")
+
+# 3. MAPA
+@st.fragment
+@perfilada
+def vista_mapa(ctx):
+    geo = ctx['geo']
+    if geo is not None:
+        st.header("🗺️ Mapa de Ruta")
+        c_map1, c_map2 = st.columns([1, 3])
+        with c_map1:
+            s_dia = st.multiselect("Día Visita:", geo.values('dia'))
+            s_ruta = st.multiselect("Ruta:", geo.values('ruta')) if geo.values('ruta') else []
+            detalle = st.select_slider("Detalle del mapa:", ["Auto"] + list(range(8, 19)), value="Auto")
+            # Un punto por cliente, filtrado por día/ruta desde el índice (posiciones precalculadas)
+            df_map = calc_vista('mapa', (ctx['clave'], tuple(s_dia), tuple(s_ruta)), lambda: analytics.route_status(
+                geo.points.iloc[geo.select(ctx['df_a_filt']['clienteid'], dia=s_dia, ruta=s_ruta)], resumen_clientes(ctx)))
+            pendientes = df_map[df_map['Status'] == 'Sin Compra']
+            if 0 < len(pendientes) <= routing.MAX_PARADAS:
+                # Pendientes en orden de visita sugerido (vecino más cercano + 2-opt)
+                pendientes = calc_vista('mapa_ruta', (ctx['clave'], tuple(s_dia), tuple(s_ruta)), lambda: routing.sequence_stops(pendientes))
+                with st.expander(f"🧭 Recorrido: {len(pendientes)} paradas · {pendientes['km_acum'].iloc[-1]:,.1f} km"):
+                    st.markdown("\n".join(f"- [Tramo {k}]({link})" for k, link in enumerate(routing.directions_links(pendientes), 1)))
+                    st.dataframe(pendientes[['orden', 'cliente', 'km_acum']], hide_index=True, use_container_width=True)
+            elif len(pendientes): st.info("Filtra por vendedor o día para ordenar el recorrido.")
+            if not pendientes.empty:
+                st.text_area("WhatsApp:", value=analytics.whatsapp_message(pendientes), height=300)
+            else: st.success("¡Ruta Completa!")
+        with c_map2:
+            if not df_map.empty:
+                idx = df_map.index.to_numpy()
+                zoom = geo.fit_zoom(idx) if detalle == "Auto" else detalle
+                # Marcadores agregados en el servidor: el navegador recibe a lo sumo MAX_POINTS
+                capa = calc_vista('mapa_capa', (ctx['clave'], tuple(s_dia), tuple(s_ruta), zoom), lambda: geo.aggregate(idx, df_map['Status'], zoom))
+                st.caption(f"{len(capa):,} marcadores · {len(df_map):,} clientes")
+                fig_map = px.scatter_mapbox(capa, lat="latitud", lon="longitud", color="Status", size="n", size_max=8 if capa['n'].max() == 1 else 30,
+                                            hover_name="etiqueta", color_discrete_map={'Con Compra': '#2ECC71', 'Sin Compra': '#E74C3C'},
+                                            zoom=zoom, center={'lat': df_map['latitud'].median(), 'lon': df_map['longitud'].median()})
+                fig_map.update_layout(mapbox_style="open-street-map", height=600)
+                grafico(fig_map)
+                tabla(df_map[['cliente', 'Status', 'Link']], 'mapa_links', (ctx['clave'], tuple(s_dia), tuple(s_ruta)), orden='Status',
+                      column_config={"Link": st.column_config.LinkColumn("Ir", display_text="📍")})
+    else: st.warning("Falta Maestro con Coordenadas.")
+
+# 4. CAÍDA
+@st.fragment
+@perfilada
+def vista_caida(ctx):
+    if ctx['hay_preventa']:
+        st.header("📉 Rechazos")
+        m = ctx['conc_pre']
+        c1, c2 = st.columns(2)
+        fig_pie = px.pie(m, names='st', values='monto_pre', title="Estatus ($)")
+        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        grafico(fig_pie, c1)
+        if ctx['sel_vendedor'] == "Todos":
+            top_drop = m.groupby('vendedor')['caida'].sum().sort_values(ascending=False).head(10).reset_index()
+            fig_bar = px.bar(top_drop, x='caida', y='vendedor', orientation='h', title="Top Rechazos", text='caida', color='caida', color_continuous_scale='Reds')
+            fig_bar.update_traces(texttemplate='$%{text:,.0f}', textposition='outside')
+            grafico(fig_bar, c2)
+        else:
+            c2.metric("Monto Perdido", f"${m['caida'].sum():,.0f}")
+    else: st.warning("Carga Preventas.")
+
+# 5. SIMULADOR
+@st.fragment
+@perfilada
+def vista_simulador(ctx):
+    fecha_max, cells, meta = ctx['fecha_max'], ctx['cells'], ctx['meta']
+    st.header("🎮 Simulador")
+    # Cierre del mes de la última venta: lo vendido en ese mes + ritmo por vendedor y día de la
+    # semana × días que faltan. La grilla de escenarios y las simulaciones se calculan una vez
+    # por filtros; mover los sliders solo elige una celda ya calculada.
+    fc = calc_vista('simulador', ctx['clave'], lambda: forecast.build_forecast(cells, ctx['fecha_min'], fecha_max))
+    meta_sel = meta if ctx['sel_vendedor'] == "Todos" else meta/10
+    c1, c2 = st.columns(2)
+    dt = c1.slider("Subir Ticket %", 0, 50, 0)
+    dc = c2.slider("Subir Cobertura %", 0, 50, 0)
+    proj, (p10, p50, p90), prob = forecast.scenario(fc, dt, dc, meta_sel)
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Cierre Proyectado", f"${proj:,.0f}", f"{proj-meta_sel:,.0f} vs Meta")
+    m2.metric("Rango P10 – P90", f"${p10:,.0f} – ${p90:,.0f}")
+    m3.metric("Probabilidad de Meta", f"{prob:.0%}")
+    st.caption(f"{fc['dias_restantes']} días por vender · ritmo por día de la semana · {forecast.N_SIMULACIONES:,} simulaciones (días históricos sorteados)")
+    if fc['historia_corta'] and fc['dias_restantes']:
+        st.warning(f"⚠️ Solo {fc['dias_historia']} días de historia: el rango y la probabilidad son orientativos (amplía el período para bandas más confiables).")
+    if len(fc['vendedores']) > 1:
+        # Cierre vs meta por vendedor (meta/10 cada uno, como el indicador) para cada suba de cobertura
+        pct = fc['grilla'][:, dt, :] / (meta/10) * 100
+        orden = pct[:, 0].argsort()
+        fig_h = px.imshow(pct[orden], x=forecast.UPLIFTS, y=[fc['vendedores'][i] for i in orden], color_continuous_scale='RdYlGn', zmin=0, zmax=200,
+                          labels={'x': "Suba de Cobertura %", 'y': "", 'color': "% Meta"}, aspect='auto', title=f"Cierre Proyectado vs Meta por Vendedor (Ticket +{dt}%)")
+        fig_h.update_layout(height=max(300, 22 * len(orden)))
+        grafico(fig_h)
+    else:
+        pct = fc['grilla'].sum(axis=0) / meta_sel * 100
+        fig_h = px.imshow(pct, x=forecast.UPLIFTS, y=forecast.UPLIFTS, color_continuous_scale='RdYlGn', zmin=0, zmax=200, origin='lower',
+                          labels={'x': "Suba de Cobertura %", 'y': "Suba de Ticket %", 'color': "% Meta"}, aspect='auto', title="Cierre Proyectado vs Meta por Escenario")
+        grafico(fig_h)
+
+# 6. ESTRATEGIA
+@st.fragment
+@perfilada
+def vista_estrategia(ctx):
+    cells = ctx['cells']
+    st.header("📈 Estrategia")
+    if ctx['sql'] is not None: day = calc_vista('diario', ctx['clave'], lambda: ctx['sql'].daily(**ctx['filtros']))
+    else: day = sales_cube.cube_daily(cells)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=day['fecha'], y=day['monto_real'], name='Venta', marker_color='#95A5A6', text=day['monto_real'], texttemplate='$%{text:.2s}', textposition='auto'))
+    fig.add_trace(go.Scatter(x=day['fecha'], y=day['clienteid'], name='Clientes', yaxis='y2', line=dict(color='#3498DB', width=3), mode='lines+markers+text', text=day['clienteid'], textposition='top center'))
+    fig.update_layout(yaxis2=dict(overlaying='y', side='right'), title="Venta vs Clientes", height=600)
+    grafico(fig)
+    if ctx['sel_vendedor'] == "Todos":
+        sun = sales_cube.cube_sum(cells, ['canal', 'vendedor']).reset_index()
+        grafico(px.sunburst(sun, path=['canal', 'vendedor'], values='monto_real'))
+
+    # Mismo tramo del mes y del año anterior, leídos del histórico particionado. Con DuckDB no
+    # hay histórico: solo se comparan los tramos que caen dentro de los archivos cargados
+    st.subheader("📆 Comparación de Períodos")
+    periodos = partition_store.comparison_periods(ctx['fecha_min'], ctx['fecha_max'])
+    if ctx['sql'] is not None:
+        archivo_min, archivo_max = ctx['rango_archivo']
+        periodos = {p: (d, h) for p, (d, h) in periodos.items() if d >= archivo_min.normalize() and h <= archivo_max}
+        if len(periodos) < 3: st.info("Con el motor DuckDB la comparación usa solo la venta cargada (sin histórico particionado): "
+                                      + ("no incluye " + " ni ".join(p for p in ['Mes anterior', 'Año anterior'] if p not in periodos) + "."))
+        if len(periodos) == 1: return
+    kpis, diario = calc_vista('comparacion', ctx['clave'], lambda: comparar_periodos(ctx, periodos))
+    comp = partition_store.comparison_table(kpis, periodos)
+    st.dataframe(comp.style.format({'Venta': '${:,.0f}', 'Ticket': '${:,.0f}', 'Δ Venta %': '{:+.1f}%', 'Δ Cobertura %': '{:+.1f}%', 'Δ Ticket %': '{:+.1f}%'}, na_rep='—'), use_container_width=True)
+    if len(diario):
+        fig_c = px.line(diario, x='dia', y='monto_real', color='periodo', markers=True, title="Venta diaria por día del período", labels={'dia': 'Día', 'monto_real': 'Venta'})
+        grafico(fig_c)
+
+def comparar_periodos(ctx, periodos):
+    kpis, diarios = {}, []
+    for nombre, (d, h) in periodos.items():
+        if ctx['sql'] is not None:
+            filtros = {**ctx['filtros'], 'desde': d, 'hasta': h}
+            kpis[nombre], dia = ctx['sql'].kpis(**filtros), ctx['sql'].daily(**filtros)[['fecha', 'monto_real']]
+        else:
+            kpis[nombre] = partition_store.period_kpis(ctx['historico'], d, h, ctx['sel_canal'], ctx['filtro_vendedor'])
+            dia = partition_store.period_daily(ctx['historico'], d, h, ctx['sel_canal'], ctx['filtro_vendedor'])
+        diarios.append(dia.assign(periodo=nombre, dia=(dia['fecha'] - d).dt.days + 1))
+    return kpis, pd.concat(diarios, ignore_index=True)
+
+# 7. FINANZAS
+@st.fragment
+@perfilada
+def vista_finanzas(ctx):
+    cells = ctx['cells']
+    st.header("💳 Finanzas")
+    pay = sales_cube.cube_sum(cells, 'tipopago').reset_index()
+    fig_pay = px.pie(pay, values='monto_real', names='tipopago', title="Mix Pago")
+    fig_pay.update_traces(textposition='inside', textinfo='percent+label')
+    grafico(fig_pay)
+    if 'Crédito' in pay['tipopago'].values:
+        cred = cells[cells['tipopago'].astype(str).str.contains('Crédito', case=False, na=False)]
+        st.dataframe(sales_cube.cube_sum(cred, 'vendedor').sort_values(ascending=False).head(10))
+
+# 8. CLIENTES
+@st.fragment
+@perfilada
+def vista_clientes(ctx):
+    st.header("👥 Clientes")
+    resumen = resumen_clientes(ctx)
+    c1, c2 = st.columns([1, 2])
+    if 'cliente' in resumen.columns:
+        cli_map = calc_vista('clientes_buscador', ctx['clave'], lambda: resumen.set_index('cliente')['clienteid'].to_dict())
+        cl_sel = c1.selectbox("Buscar:", sorted(cli_map.keys()))
+        if cl_sel:
+            cid = cli_map[cl_sel]
+            fila = resumen[resumen['clienteid'] == cid].iloc[0]
+            if ctx['sql'] is not None: top_p = ctx['sql'].top_products(10, clienteid=[cid], **ctx['filtros'])
+            else:
+                cd = ctx['engine_v'].select(canal=ctx['sel_canal'], vendedor=ctx['filtro_vendedor'], clienteid=[cid])
+                top_p = cd.groupby('producto', observed=True)['monto_real'].sum().nlargest(10).reset_index()
+            c1.metric("Total", f"${fila['monto_real']:,.0f}")
+            c1.metric("Días con Compra", f"{fila['frecuencia_real']}")
+            c1.caption(f"Primera compra: {fila['primera']:%d/%m/%Y} · Última: {fila['ultima']:%d/%m/%Y}")
+            fig_cp = px.bar(top_p, x='monto_real', y='producto', orientation='h', title="Top Productos", text='monto_real')
+            fig_cp.update_traces(texttemplate='$%{text:,.0f}', textposition='inside')
+            grafico(fig_cp, c2)
+    n_churn, churn_df = calc_vista('churn', ctx['clave'], lambda: analytics.churn_clients(ctx['estado'], resumen, ctx['fecha_min'], ctx['fecha_max']))
+    st.error(f"⚠️ {n_churn} Clientes en Riesgo")
+    if churn_df is not None:
+        st.dataframe(churn_df.head(10), use_container_width=True)
+
+# 9. AUDITORIA
+@st.fragment
+@perfilada
+def vista_auditoria(ctx):
+    dff, sql = ctx['dff'], ctx['sql']
+    st.header("🔍 Auditoría")
+    cf1, cf2, cf3 = st.columns(3)
+    if sql is not None:
+        # Opciones y matriz desde DuckDB: vuelve una fila por vendedor × valor
+        j1_o, cat_o, prod_o = (calc_vista(f'auditoria_{c}', ctx['clave'], lambda c=c: sql.values(c, **ctx['filtros'])) for c in ['jerarquia1', 'categoria', 'producto'])
+    else:
+        j1_o = sorted(dff['jerarquia1'].dropna().unique()) if 'jerarquia1' in dff.columns else []
+        cat_o = sorted(dff['categoria'].dropna().unique()) if 'categoria' in dff.columns else []
+        prod_o = sorted(dff['producto'].dropna().unique()) if 'producto' in dff.columns else []
+    s_j1 = cf1.multiselect("Jerarquía 1", j1_o)
+    s_cat = cf2.multiselect("Categoría", cat_o)
+    s_prod = cf3.multiselect("Producto", prod_o)
+    col_hm = 'producto' if s_prod else ('categoria' if s_cat else 'jerarquia1')
+    if sql is not None: df_aud = calc_vista('auditoria_sql', (ctx['clave'], tuple(s_j1), tuple(s_cat), tuple(s_prod)),
+                                            lambda: sql.audit(col_hm, jerarquia1=s_j1 or None, categoria=s_cat or None, producto=s_prod or None, **ctx['filtros']))
+    else: df_aud = ctx['engine_v'].select(canal=ctx['sel_canal'], vendedor=ctx['filtro_vendedor'], jerarquia1=s_j1 or None, categoria=s_cat or None, producto=s_prod or None)
+    if df_aud is not None and col_hm in df_aud.columns:
+        piv = calc_vista('auditoria', (ctx['clave'], tuple(s_j1), tuple(s_cat), tuple(s_prod)), lambda: analytics.audit_pivot(df_aud, col_hm))
+        grafico(px.imshow(piv, aspect="auto", text_auto='.2s'))
+
+# 10. INTELIGENCIA
+@st.fragment
+@perfilada
+def vista_inteligencia(ctx):
+    dff = ctx['dff']
+    st.header("🧠 Inteligencia")
+    if dff is None: st.info("La canasta necesita las transacciones en memoria: elige el motor 'Memoria'.")
+    elif 'producto' in dff.columns:
+        top_n = st.select_slider("Productos analizados:", [50, 100, 200, 500], value=50)
+        # Índice de co-ocurrencia: se arma una vez por filtro y cada producto es solo una consulta
+        tops, reglas = calc_vista('canasta', (ctx['clave'], top_n), lambda: basket.build_basket(dff, top_n))
+        p_sel = st.selectbox("Si lleva...", tops)
+        if p_sel in reglas:
+            st.table(reglas[p_sel].style.format({'soporte': '{:.2%}', 'confianza': '{:.1%}', 'lift': '{:.2f}'}))
+
+VISTAS = {
+    "🚫 Rebotes": vista_rebotes, "🎯 Penetración": vista_penetracion, "📅 Frecuencia": vista_frecuencia,
+    "🗺️ Mapa Ruta": vista_mapa, "📉 Caída": vista_caida, "🎮 Simulador": vista_simulador,
+    "📈 Estrategia": vista_estrategia, "💳 Finanzas": vista_finanzas, "👥 Clientes": vista_clientes,
+    "🔍 Auditoría": vista_auditoria, "🧠 Inteligencia": vista_inteligencia
+}
 
 # --- INTERFAZ ---
+firmas = data_loader.source_signatures()
+
 with st.sidebar:
     st.title("💎 Master Dashboard v37.7")
     st.success("Corrección Monto Preventa")
+    if st.toggle("Recarga automática de archivos", value=True): vigilar_archivos(firmas)
     st.markdown("---")
     meta = st.number_input("Meta Mensual ($)", value=3600000, step=100000)
+    # Memoria: todo en pandas (más rápido); DuckDB: la venta queda en disco y se consulta por SQL
+    motores = ["Memoria", "DuckDB"] if sql_backend.available() else ["Memoria"]
+    motor = st.radio("Motor de consultas:", motores, index=len(motores) - 1 if sql_backend.recommended(firmas) else 0, horizontal=True)
+    perfilar = st.toggle("⏱️ Perfilador", key='perfilar')
+    asignaciones = st.checkbox("Medir asignaciones (más lento)", key='perfilar_asign') if perfilar else False
+
+# Perfil de este rerun; el historial de los últimos reruns vive en la sesión
+perfil = profiler.Profiler(st.session_state.setdefault('perfil_historial', []), enabled=perfilar,
+                           allocations=asignaciones, max_reruns=st.session_state.get('perfil_n', 10))
+perfil.start('completo')
+
+usar_sql = motor == "DuckDB"
+sql = df_v = df_p = cube = estado = conc = None
+with perfil.probe('load_consolidated_data'):
+    if usar_sql: sql, df_a, df_r = load_sql_data(firmas)
+    else: df_v, df_p, df_a, df_r, mem_report = load_consolidated_data(firmas)
+
+mem_box = st.sidebar.expander("💾 Memoria de datos")
+if usar_sql:
+    mem_box.caption(f"DuckDB: venta en {len(sql.fuentes['venta'][0]) if sql.has('venta') else 0} archivo(s) Parquet · límite {sql_backend.LIMITE_MEMORIA} · {sql_backend.HILOS} hilos")
+else:
+    mem_box.caption(f"Venta: {mem_report['venta_mb_antes']:,.1f} MB normalizada → {mem_report['venta_mb']:,.1f} MB compacta (la única en memoria)")
+    mem_box.caption(f"Maestro: {mem_report['maestro_mb_antes']:,.1f} MB → {mem_report['maestro_mb']:,.1f} MB")
 
-df_v, df_p, df_a, df_r = load_consolidated_data()
+if sql.has('venta') if usar_sql else df_v is not None:
 
-if df_v is not None:
+    with perfil.probe('periodo'):
+        # Período global: por defecto el del archivo actual; un rango distinto se lee del
+        # histórico particionado (solo las semanas que toca) y las estructuras se arman para él
+        historico = None
+        if usar_sql: archivo_min, archivo_max = sql.date_range()
+        else:
+            archivo_min, archivo_max = df_v['fecha'].min(), df_v['fecha'].max()
+            historico = sync_history_cached(df_v, firmas['venta'], firmas['maestro'])
+        hist_min, hist_max = partition_store.bounds(historico, archivo_min, archivo_max)
+        periodo = st.sidebar.date_input("Período:", (archivo_min.date(), archivo_max.date()), min_value=hist_min.date(), max_value=hist_max.date())
+        desde, hasta = (pd.Timestamp(periodo[0]), pd.Timestamp(periodo[1])) if len(periodo) == 2 else (archivo_min, archivo_max)
+        en_archivo = (desde, hasta) == (archivo_min, archivo_max)
+        df_v_archivo, sig_v = df_v, firmas['venta']
+        if not usar_sql and not en_archivo:
+            df_periodo = load_period_cached(historico, desde, hasta, historico['version'])
+            if df_periodo is not None and len(df_periodo): df_v, sig_v = df_periodo, ('periodo', desde, hasta, historico['version'])
+            else:
+                st.sidebar.warning("Sin ventas en ese período: se muestra el archivo actual.")
+                desde, hasta, en_archivo = archivo_min, archivo_max, True
+        fecha_min, fecha_max = (max(desde, archivo_min), min(hasta, archivo_max)) if usar_sql else (df_v['fecha'].min(), df_v['fecha'].max())
     
-    # Filtros Globales
-    col_filt1, col_filt2 = st.sidebar.columns(2)
-    canales_list = sorted(df_v['canal'].dropna().unique().tolist())
-    sel_canal = st.sidebar.multiselect("Filtrar por Canal:", canales_list, default=canales_list)
+    with perfil.probe('estructuras'):
+        if not usar_sql:
+            with perfil.probe('cubo') as p: cube = p.track(build_cube_cached(df_v, sig_v, firmas['maestro']))
+            with perfil.probe('estado_clientes') as p: estado = p.track(build_client_state_cached(df_v, sig_v, firmas['maestro'], en_archivo))
+            with perfil.probe('conciliacion') as p: conc = p.track(build_reconciliation_cached(df_v_archivo, df_p, df_r, firmas['venta'], firmas['preventa'], firmas['rebotes']))
+            engine_v = build_filter_engine(df_v, ('canal', 'vendedor', 'jerarquia1', 'categoria', 'producto', 'clienteid'), (sig_v, firmas['maestro']), ('venta', tipo_venta(sig_v)))
+            engine_c = build_filter_engine(conc, ('vendedor',), (firmas['venta'], firmas['preventa'], firmas['rebotes']), 'conciliacion')
+        # El maestro es compacto en memoria y crudo con DuckDB: índices separados por motor
+        if df_r is not None: engine_r = build_filter_engine(df_r, ('vendedor', 'distribuidor', 'zona'), firmas['rebotes'], 'rebotes')
+        if df_a is not None: engine_a = build_filter_engine(df_a, ('vendedor',), (motor, firmas['maestro']), 'maestro')
+        with perfil.probe('indice_geo'): geo = build_geo_index(df_a, (motor, firmas['maestro'])) if df_a is not None and 'latitud' in df_a.columns else None
+
+    with perfil.probe('filtros') as p:
+        # Filtros Globales
+        col_filt1, col_filt2 = st.sidebar.columns(2)
+        canales_list = sql.values('canal') if usar_sql else sorted(df_v['canal'].dropna().unique().tolist())
+        sel_canal = st.sidebar.multiselect("Filtrar por Canal:", canales_list, default=canales_list)
     
-    dff_canal = df_v[df_v['canal'].isin(sel_canal)].copy()
-    vendedores_list = sorted(dff_canal['vendedor'].dropna().unique().tolist())
-    sel_vendedor = st.sidebar.selectbox("Filtrar por Vendedor:", ["Todos"] + vendedores_list)
+        # Selecciones memorizadas por combinación de filtros (sin copias: solo lectura)
+        if usar_sql: vendedores_list = sql.values('vendedor', canal=sel_canal)
+        else:
+            dff_canal = engine_v.select(canal=sel_canal)
+            vendedores_list = sorted(dff_canal['vendedor'].dropna().unique().tolist())
+        sel_vendedor = st.sidebar.selectbox("Filtrar por Vendedor:", ["Todos"] + vendedores_list)
+        filtro_vendedor = [sel_vendedor] if sel_vendedor != "Todos" else None
+        clave = (motor, tuple(sorted(firmas.items())), desde, hasta, tuple(sel_canal), sel_vendedor)
+        if df_a is not None: df_a_filt = engine_a.select(vendedor=filtro_vendedor or vendedores_list)
     
-    if sel_vendedor != "Todos":
-        dff = dff_canal[dff_canal['vendedor'] == sel_vendedor].copy()
-        if df_a is not None: df_a_filt = df_a[df_a['vendedor'] == sel_vendedor]
-        if df_p is not None: df_p_filt = df_p[df_p['vendedor'] == sel_vendedor]
-        if df_r is not None: df_r_filt = df_r[df_r['vendedor'] == sel_vendedor]
-    else:
-        dff = dff_canal.copy()
-        if df_a is not None: df_a_filt = df_a[df_a['vendedor'].isin(vendedores_list)]
-        if df_p is not None: df_p_filt = df_p[df_p['vendedor'].isin(vendedores_list)]
-        if df_r is not None: df_r_filt = df_r.copy()
+        if usar_sql:
+            # Cada agregado es una consulta SQL memorizada por filtros; a pandas vuelve lo agregado
+            # (celdas del cubo sin bitmaps, una fila por cliente, conciliación por vendedor × estado)
+            filtros = {'canal': sel_canal, 'vendedor': filtro_vendedor}
+            if not en_archivo: filtros.update(desde=desde, hasta=hasta)
+            dff = None
+            conc_pre = calc_vista('sql_conciliacion', clave, lambda: sql.drops(filtro_vendedor or vendedores_list, filtros.get('desde'), filtros.get('hasta')))
+            cells = calc_vista('sql_celdas', clave, lambda: sql.cells(**filtros))
+            tot, cob, trx = calc_vista('sql_kpis', clave, lambda: sql.kpis(**filtros))
+            estado_sel = calc_vista('sql_estado', clave, lambda: sql.client_cells(**filtros))
+        else:
+            filtros = None
+            dff = engine_v.select(canal=sel_canal, vendedor=filtro_vendedor) if sel_vendedor != "Todos" else dff_canal
+            conc_filt = engine_c.select(vendedor=filtro_vendedor or vendedores_list)
+            conc_pre = conc_filt[conc_filt['lineas_pre'] > 0]
+            # La preventa no tiene histórico: fuera del archivo se recorta por su fecha
+            if not en_archivo: conc_pre = conc_pre[conc_pre['fecha'].between(desde, hasta + pd.Timedelta(days=1), inclusive='left')]
     
-    tot = dff['monto_real'].sum()
-    cob = dff['clienteid'].nunique()
-    trx = dff['id_transaccion'].nunique()
+            # KPIs, Estrategia y Finanzas salen del cubo pre-agregado (roll-up por canal/vendedor)
+            cells = sales_cube.cube_select(cube, sel_canal, sel_vendedor)
+            tot, cob, trx = sales_cube.cube_kpis(cells)
+            estado_sel = client_state.state_select(estado, sel_canal, sel_vendedor)
+        hay_preventa = sql.has('preventa') if usar_sql else df_p is not None
+        p.track(dff)
     ticket = tot/trx if trx>0 else 0
     
-    c1, c2 = st.columns([1, 2])
-    with c1:
-        fig_g = go.Figure(go.Indicator(mode="gauge+number+delta", value=tot, delta={'reference': meta if sel_vendedor == "Todos" else meta/10}, gauge={'axis':{'range':[None, meta*1.2 if sel_vendedor=="Todos" else (meta/10)*1.2]}, 'bar':{'color':"#2C3E50"}}))
-        fig_g.update_layout(height=200, margin=dict(t=20,b=20,l=30,r=30))
-        st.plotly_chart(fig_g, use_container_width=True)
-    with c2:
-        st.markdown("<br>", unsafe_allow_html=True)
+    with perfil.probe('encabezado'):
+        c1, c2 = st.columns([1, 2])
+        with c1:
+            fig_g = go.Figure(go.Indicator(mode="gauge+number+delta", value=tot, delta={'reference': meta if sel_vendedor == "Todos" else meta/10}, gauge={'axis':{'range':[None, meta*1.2 if sel_vendedor=="Todos" else (meta/10)*1.2]}, 'bar':{'color':"#2C3E50"}}))
+            fig_g.update_layout(height=200, margin=dict(t=20,b=20,l=30,r=30))
+            grafico(fig_g)
+        with c2:
+            st.markdown("<br>", unsafe_allow_html=True)
         
-        # Cálculo del Monto Preventa
-        monto_preventa = df_p_filt['monto_pre'].sum() if df_p is not None and 'monto_pre' in df_p_filt.columns else 0
+            # Cálculo del Monto Preventa
+            monto_preventa = conc_pre['monto_pre'].sum()
         
-        # Se amplía a 4 columnas para incluir la nueva métrica
-        k1, k2, k3, k4 = st.columns(4)
+            # Se amplía a 4 columnas para incluir la nueva métrica
+            k1, k2, k3, k4 = st.columns(4)
         
-        k1.metric("Preventa", f"${monto_preventa:,.0f}")
-        k2.metric("Venta Real", f"${tot:,.0f}")
-        k3.metric("Cobertura", f"{cob}")
-        k4.metric("Ticket", f"${ticket:,.0f}")
+            k1.metric("Preventa", f"${monto_preventa:,.0f}")
+            k2.metric("Venta Real", f"${tot:,.0f}")
+            k3.metric("Cobertura", f"{cob}")
+            k4.metric("Ticket", f"${ticket:,.0f}")
         
-        if df_p is not None and 'monto_pre' in df_p_filt.columns:
-            caida = monto_preventa - tot
-            st.markdown(f'<div class="alert-box alert-warning">📉 Rechazo Estimado: ${caida:,.0f}</div>', unsafe_allow_html=True)
+            if hay_preventa:
+                # Pedido menos entregado por preventa, desde la conciliación
+                caida = conc_pre['caida'].sum()
+                st.markdown(f'<div class="alert-box alert-warning">📉 Rechazo Estimado: ${caida:,.0f}</div>', unsafe_allow_html=True)
 
     st.markdown("---")
-    
-    tabs = st.tabs(["🚫 Rebotes", "🎯 Penetración", "📅 Frecuencia", "🗺️ Mapa Ruta", "📉 Caída", "🎮 Simulador", "📈 Estrategia", "💳 Finanzas", "👥 Clientes", "🔍 Auditoría", "🧠 Inteligencia"])
-    
-   # 0. REBOTES
-    with tabs[0]:
-        st.header("🚫 Análisis de Rebotes (Devoluciones)")
-        
-        if df_r is not None:
-            c_fr1, c_fr2, c_fr3 = st.columns(3)
-            distribuidores = sorted(df_r['distribuidor'].dropna().unique()) if 'distribuidor' in df_r.columns else []
-            zonas = sorted(df_r['zona'].dropna().unique()) if 'zona' in df_r.columns else []
-            min_d_r = df_r['fecha_filtro'].min().date() if 'fecha_filtro' in df_r.columns else None
-            max_d_r = df_r['fecha_filtro'].max().date() if 'fecha_filtro' in df_r.columns else None
-            
-            with c_fr1: sel_distribuidor = st.multiselect("Distribuidor:", distribuidores)
-            with c_fr2: sel_zona = st.multiselect("Zona:", zonas)
-            with c_fr3:
-                if min_d_r and max_d_r: sel_fecha = st.date_input("Fecha Entrega:", [min_d_r, max_d_r])
-                else: sel_fecha = None
-
-            df_r_local = df_r.copy()
-            if sel_vendedor != "Todos": df_r_local = df_r_local[df_r_local['vendedor'] == sel_vendedor]
-            if sel_distribuidor: df_r_local = df_r_local[df_r_local['distribuidor'].isin(sel_distribuidor)]
-            if sel_zona: df_r_local = df_r_local[df_r_local['zona'].isin(sel_zona)]
-            if sel_fecha and len(sel_fecha) == 2 and 'fecha_filtro' in df_r_local.columns:
-                 df_r_local = df_r_local[(df_r_local['fecha_filtro'].dt.date >= sel_fecha[0]) & (df_r_local['fecha_filtro'].dt.date <= sel_fecha[1])]
-
-            total_rechazo = df_r_local['monto_rechazo'].sum()
-            cant_rebotes = len(df_r_local)
-            
-            mr1, mr2 = st.columns(2)
-            mr1.markdown(f'<div class="alert-box alert-danger">💰 <b>Monto Rechazado:</b> ${total_rechazo:,.0f}</div>', unsafe_allow_html=True)
-            mr2.markdown(f'<div class="alert-box alert-warning">📦 <b>Cantidad Rebotes:</b> {cant_rebotes}</div>', unsafe_allow_html=True)
-                        
-            # Identificar columna motivo antes de usarla
-            col_motivo = next((c for c in df_r_local.columns if 'motivo' in c), None)
-
-            col_reb1, col_reb2 = st.columns([1, 2])
-            with col_reb1:
-                if col_motivo:
-                    # Gráfico de Pastel por Cantidad (Frecuencia)
-                    rechazo_motivo = df_r_local[col_motivo].value_counts().reset_index()
-                    rechazo_motivo.columns = ['Motivo', 'Cantidad']
-                    fig_pie_r = px.pie(rechazo_motivo, values='Cantidad', names='Motivo', title="Frecuencia de Motivos", color_discrete_sequence=px.colors.sequential.RdBu)
-                    st.plotly_chart(fig_pie_r, use_container_width=True)
-                else: st.info("Sin columna 'Motivo'")
-
-            with col_reb2:
-                if sel_vendedor == "Todos":
-                    rebotes_vend = df_r_local.groupby('vendedor')['monto_rechazo'].sum().sort_values(ascending=False).reset_index()
-                    fig_bar_r = px.bar(rebotes_vend, x='monto_rechazo', y='vendedor', orientation='h', 
-                                       title="Rechazo por Vendedor", text_auto='.2s', color='monto_rechazo', color_continuous_scale='Reds')
-                    st.plotly_chart(fig_bar_r, use_container_width=True)
-                else:
-                    st.subheader("Detalle")
-                    cols_view = [c for c in ['fecha_filtro', 'distribuidor', 'zona', 'cliente', 'monto_rechazo', 'motivo_rechazo'] if c in df_r_local.columns]
-                    st.dataframe(df_r_local[cols_view].sort_values('monto_rechazo', ascending=False), use_container_width=True)
-            
-            st.markdown("---")
-            
-            # --- NUEVOS GRÁFICOS: POR DISTRIBUIDOR Y POR MOTIVO (MONTO) ---
-            c_g1, c_g2 = st.columns(2)
-            
-            with c_g1:
-                if 'distribuidor' in df_r_local.columns:
-                    rebotes_dist = df_r_local.groupby('distribuidor')['monto_rechazo'].sum().sort_values(ascending=False).reset_index()
-                    fig_bar_d = px.bar(rebotes_dist, x='monto_rechazo', y='distribuidor', orientation='h',
-                                       title="🏢 Rechazo por Distribuidor ($)", text_auto='.2s', color='monto_rechazo', color_continuous_scale='OrRd')
-                    st.plotly_chart(fig_bar_d, use_container_width=True)
-            
-            with c_g2:
-                if col_motivo:
-                    rebotes_mot_monto = df_r_local.groupby(col_motivo)['monto_rechazo'].sum().sort_values(ascending=False).reset_index()
-                    fig_bar_m = px.bar(rebotes_mot_monto, x='monto_rechazo', y=col_motivo, orientation='h',
-                                       title="📉 Rechazo por Motivo ($)", text_auto='.2s', color='monto_rechazo', color_continuous_scale='Reds')
-                    st.plotly_chart(fig_bar_m, use_container_width=True)
-            # -----------------------------------------------------------------
-
-            st.subheader("📋 Listado Completo de Rebotes (Filtrado)")
-            st.dataframe(df_r_local, use_container_width=True)
-            
-        else:
-            st.warning("⚠️ Carga el archivo 'rebotes.csv' en tu repositorio para ver este análisis.")
-
-    # 1. PENETRACIÓN
-    with tabs[1]:
-        if df_a is not None:
-            st.header("🎯 Penetración de Cartera")
-            total_asig = df_a_filt['clienteid'].nunique()
-            total_serv = dff['clienteid'].nunique()
-            total_no_serv = total_asig - total_serv
-            efectividad = (total_serv / total_asig * 100) if total_asig > 0 else 0
-            kp1, kp2, kp3, kp4 = st.columns(4)
-            kp1.metric("Cartera Total", total_asig)
-            kp2.metric("Visitados", total_serv)
-            kp3.metric("No Visitados", total_no_serv)
-            kp4.metric("Efectividad", f"{efectividad:.1f}%")
-            if sel_vendedor == "Todos":
-                asig = df_a_filt.groupby('vendedor')['clienteid'].nunique().reset_index(name='Asignados')
-                serv = dff.groupby('vendedor')['clienteid'].nunique().reset_index(name='Servidos')
-                pen = pd.merge(asig, serv, on='vendedor', how='left').fillna(0)
-                pen['% Pen'] = (pen['Servidos'] / pen['Asignados'].replace(0, 1)) * 100
-                pen['Gap'] = pen['Asignados'] - pen['Servidos']
-                st.dataframe(pen.sort_values('% Pen', ascending=False).style.format({'% Pen': '{:.1f}%'}), use_container_width=True)
-                fig_p = go.Figure(data=[
-                    go.Bar(name='Servidos', y=pen['vendedor'], x=pen['Servidos'], orientation='h', marker_color='#2ECC71', text=pen['Servidos'], textposition='auto'),
-                    go.Bar(name='Sin Compra', y=pen['vendedor'], x=pen['Gap'], orientation='h', marker_color='#E74C3C', text=pen['Gap'], textposition='auto')
-                ])
-                fig_p.update_layout(barmode='stack', height=500, title="Cobertura de Cartera (Etiquetas Visibles)")
-                st.plotly_chart(fig_p, use_container_width=True)
-            else:
-                st.subheader(f"📋 Detalle de Clientes - {sel_vendedor}")
-                clientes_maestro = df_a_filt[['clienteid', 'cliente']].drop_duplicates()
-                clientes_con_compra = set(dff['clienteid'].unique())
-                clientes_maestro['Estado'] = clientes_maestro['clienteid'].apply(lambda x: '✅ Visitado' if x in clientes_con_compra else '❌ Pendiente')
-                st.dataframe(clientes_maestro.sort_values('Estado', ascending=False), use_container_width=True)
-        else: st.warning("Carga 'Maestro_de_clientes.csv'.")
-
-    # 2. FRECUENCIA
-    with tabs[2]:
-        st.header("📅 Frecuencia")
-        if df_a is not None:
-            cartera_total = df_a_filt[['clienteid', 'cliente', 'vendedor']].drop_duplicates(subset=['clienteid'])
-            freq_sales = dff.groupby(['clienteid'])['fecha'].nunique().reset_index(name='frecuencia_real')
-            df_freq = pd.merge(cartera_total, freq_sales, on='clienteid', how='left').fillna(0)
-            def clasificar(f):
-                if f == 0: return 'Sin Compra (0)'
-                elif f < 3: return 'Baja (<3)'
-                elif f <= 5: return 'En Modelo (3-5)'
-                else: return 'Alta (>5)'
-            df_freq['Estado'] = df_freq['frecuencia_real'].apply(clasificar)
-            total_cartera = len(df_freq)
-            en_modelo = len(df_freq[df_freq['Estado'] == 'En Modelo (3-5)'])
-            fuera_modelo = total_cartera - en_modelo
-            k1, k2, k3 = st.columns(3)
-            k1.metric("Cartera", f"{total_cartera}")
-            k2.metric("En Modelo (3-5)", f"{en_modelo}")
-            k3.metric("Fuera Modelo", f"{fuera_modelo}", delta_color="inverse")
-            c_f1, c_f2 = st.columns([1, 2])
-            with c_f1:
-                resumen = df_freq['Estado'].value_counts().reset_index()
-                resumen.columns = ['Estado', 'Count']
-                fig_pie_freq = px.pie(resumen, values='Count', names='Estado', title="Distribución", color='Estado', 
-                                      color_discrete_map={'Sin Compra (0)': '#95A5A6', 'Baja (<3)': '#E74C3C', 'En Modelo (3-5)': '#2ECC71', 'Alta (>5)': '#3498DB'})
-                st.plotly_chart(fig_pie_freq, use_container_width=True)
-            with c_f2:
-                freq_vend = df_freq.groupby(['vendedor', 'Estado']).size().reset_index(name='Count')
-                total_vend = freq_vend.groupby('vendedor')['Count'].transform('sum')
-                freq_vend['Pct'] = (freq_vend['Count'] / total_vend) * 100
-                fig_bar_freq = px.bar(freq_vend, x='Pct', y='vendedor', color='Estado', orientation='h', 
-                                   title="Cumplimiento por Vendedor (%)", text='Pct',
-                                   color_discrete_map={'Sin Compra (0)': '#95A5A6', 'Baja (<3)': '#E74C3C', 'En Modelo (3-5)': '#2ECC71', 'Alta (>5)': '#3498DB'})
-                fig_bar_freq.update_traces(texttemplate='%{text:.1f}%', textposition='inside')
-                st.plotly_chart(fig_bar_freq, use_container_width=True)
-            st.subheader("📋 Clientes Fuera de Modelo")
-            tabla_baja = df_freq[df_freq['Estado'].isin(['Baja (<3)', 'Sin Compra (0)'])]
-            st.dataframe(tabla_baja[['vendedor', 'clienteid', 'cliente', 'frecuencia_real', 'Estado']].sort_values('frecuencia_real'), use_container_width=True)
-        else: st.warning("Carga Maestro.")
-
-    # 3. MAPA
-    with tabs[3]:
-        if df_a is not None and 'latitud' in df_a.columns:
-            st.header("🗺️ Mapa de Ruta")
-            c_map1, c_map2 = st.columns([1, 3])
-            with c_map1:
-                dias_map = sorted(df_a['dia'].dropna().unique()) if 'dia' in df_a.columns else []
-                s_dia = st.multiselect("Día Visita:", dias_map)
-                df_map = df_a_filt.copy()
-                if s_dia and 'dia' in df_map.columns: df_map = df_map[df_map['dia'].isin(s_dia)]
-                clients_buy = set(dff['clienteid'].unique())
-                df_map['Status'] = df_map['clienteid'].apply(lambda x: 'Con Compra' if x in clients_buy else 'Sin Compra')
-                pendientes = df_map[df_map['Status'] == 'Sin Compra']
-                if not pendientes.empty:
-                    msg = f"🚨 *RUTA PENDIENTE*\n📉 Faltan: {len(pendientes)}\n\n"
-                    for idx, row in pendientes.head(20).iterrows():
-                        msg += f"❌ *{row['cliente']}*\n📍 https://www.google.com/maps/search/?api=1&query={row['latitud']},{row['longitud']}\n\n"
-                    st.text_area("WhatsApp:", value=msg, height=300)
-                else: st.success("¡Ruta Completa!")
-            with c_map2:
-                if not df_map.empty:
-                    fig_map = px.scatter_mapbox(df_map, lat="latitud", lon="longitud", color="Status", 
-                                                color_discrete_map={'Con Compra': '#2ECC71', 'Sin Compra': '#E74C3C'}, zoom=12)
-                    fig_map.update_layout(mapbox_style="open-street-map", height=600)
-                    st.plotly_chart(fig_map, use_container_width=True)
-                    df_map['Link'] = df_map.apply(lambda row: f"https://www.google.com/maps/dir/?api=1&destination={row['latitud']},{row['longitud']}", axis=1)
-                    st.dataframe(df_map[['cliente', 'Status', 'Link']].sort_values('Status'), column_config={"Link": st.column_config.LinkColumn("Ir", display_text="📍")}, use_container_width=True)
-        else: st.warning("Falta Maestro con Coordenadas.")
-
-    # 4. CAÍDA
-    with tabs[4]:
-        if df_p is not None:
-            st.header("📉 Rechazos")
-            ven_g = dff.groupby('preventaid')['monto_real'].sum().reset_index()
-            pre_g = df_p_filt.groupby('id_cruce')['monto_pre'].sum().reset_index()
-            m = pd.merge(pre_g, ven_g, left_on='id_cruce', right_on='preventaid', how='left').fillna(0)
-            m['diff'] = m['monto_pre'] - m['monto_real']
-            m['st'] = m.apply(lambda x: 'Entregado' if x['diff']<=5 else 'Rechazo', axis=1)
-            c1, c2 = st.columns(2)
-            fig_pie = px.pie(m, names='st', values='monto_pre', title="Estatus ($)")
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-            c1.plotly_chart(fig_pie, use_container_width=True)
-            m_det = pd.merge(df_p_filt, ven_g, left_on='id_cruce', right_on='preventaid', how='left').fillna(0)
-            m_det['caida'] = m_det['monto_pre'] - m_det['monto_real']
-            if sel_vendedor == "Todos":
-                top_drop = m_det.groupby('vendedor')['caida'].sum().sort_values(ascending=False).head(10).reset_index()
-                fig_bar = px.bar(top_drop, x='caida', y='vendedor', orientation='h', title="Top Rechazos", text='caida', color='caida', color_continuous_scale='Reds')
-                fig_bar.update_traces(texttemplate='$%{text:,.0f}', textposition='outside')
-                c2.plotly_chart(fig_bar, use_container_width=True)
-            else:
-                c2.metric("Monto Perdido", f"${m_det['caida'].sum():,.0f}")
-        else: st.warning("Carga Preventas.")
 
-    # 5. SIMULADOR
-    with tabs[5]:
-        st.header("🎮 Simulador")
-        dl = max(0, 30 - df_v['fecha'].max().day)
-        c1, c2 = st.columns(2)
-        dt = c1.slider("Subir Ticket %", 0, 50, 0)
-        dc = c2.slider("Subir Cobertura %", 0, 50, 0)
-        d_avg = tot / df_v['fecha'].max().day
-        proj = tot + (d_avg * (1+dt/100) * (1+dc/100) * dl)
-        st.metric("Cierre Proyectado", f"${proj:,.0f}", f"{proj-meta:,.0f} vs Meta")
-
-    # 6. ESTRATEGIA
-    with tabs[6]:
-        st.header("📈 Estrategia")
-        day = dff.groupby('fecha').agg({'monto_real':'sum', 'clienteid':'nunique'}).reset_index()
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=day['fecha'], y=day['monto_real'], name='Venta', marker_color='#95A5A6', text=day['monto_real'], texttemplate='$%{text:.2s}', textposition='auto'))
-        fig.add_trace(go.Scatter(x=day['fecha'], y=day['clienteid'], name='Clientes', yaxis='y2', line=dict(color='#3498DB', width=3), mode='lines+markers+text', text=day['clienteid'], textposition='top center'))
-        fig.update_layout(yaxis2=dict(overlaying='y', side='right'), title="Venta vs Clientes", height=600)
-        st.plotly_chart(fig, use_container_width=True)
-        if sel_vendedor == "Todos":
-            sun = dff.groupby(['canal', 'vendedor'])['monto_real'].sum().reset_index()
-            st.plotly_chart(px.sunburst(sun, path=['canal', 'vendedor'], values='monto_real'), use_container_width=True)
-
-    # 7. FINANZAS
-    with tabs[7]:
-        st.header("💳 Finanzas")
-        pay = dff.groupby('tipopago')['monto_real'].sum().reset_index()
-        fig_pay = px.pie(pay, values='monto_real', names='tipopago', title="Mix Pago")
-        fig_pay.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig_pay, use_container_width=True)
-        if 'Crédito' in pay['tipopago'].values:
-            cred = dff[dff['tipopago'].str.contains('Crédito', case=False, na=False)]
-            st.dataframe(cred.groupby('vendedor')['monto_real'].sum().sort_values(ascending=False).head(10))
-
-    # 8. CLIENTES
-    with tabs[8]:
-        st.header("👥 Clientes")
-        c1, c2 = st.columns([1, 2])
-        if 'cliente' in dff.columns:
-            cli_map = dff[['cliente', 'clienteid']].drop_duplicates().set_index('cliente')['clienteid'].to_dict()
-            cl_sel = c1.selectbox("Buscar:", sorted(cli_map.keys()))
-            if cl_sel:
-                cid = cli_map[cl_sel]
-                cd = dff[dff['clienteid'] == cid]
-                ctot = cd['monto_real'].sum()
-                top_p = cd.groupby('producto')['monto_real'].sum().nlargest(10).reset_index()
-                c1.metric("Total", f"${ctot:,.0f}")
-                fig_cp = px.bar(top_p, x='monto_real', y='producto', orientation='h', title="Top Productos", text='monto_real')
-                fig_cp.update_traces(texttemplate='$%{text:,.0f}', textposition='inside')
-                c2.plotly_chart(fig_cp, use_container_width=True)
-        w1 = df_v['fecha'].min() + datetime.timedelta(days=7)
-        wl = df_v['fecha'].max() - datetime.timedelta(days=7)
-        churn = list(set(dff[dff['fecha']<=w1]['clienteid']) - set(dff[dff['fecha']>=wl]['clienteid']))
-        st.error(f"⚠️ {len(churn)} Clientes en Riesgo")
-        if churn:
-            churn_df = dff[dff['clienteid'].isin(churn)].groupby(['cliente', 'vendedor'])['monto_real'].sum().reset_index().sort_values('monto_real', ascending=False)
-            st.dataframe(churn_df.head(10), use_container_width=True)
-
-    # 9. AUDITORIA
-    with tabs[9]:
-        st.header("🔍 Auditoría")
-        cf1, cf2, cf3 = st.columns(3)
-        j1_o = sorted(dff['jerarquia1'].dropna().unique()) if 'jerarquia1' in dff.columns else []
-        cat_o = sorted(dff['categoria'].dropna().unique()) if 'categoria' in dff.columns else []
-        prod_o = sorted(dff['producto'].dropna().unique()) if 'producto' in dff.columns else []
-        s_j1 = cf1.multiselect("Jerarquía 1", j1_o)
-        s_cat = cf2.multiselect("Categoría", cat_o)
-        s_prod = cf3.multiselect("Producto", prod_o)
-        df_aud = dff.copy()
-        if s_j1: df_aud = df_aud[df_aud['jerarquia1'].isin(s_j1)]
-        if s_cat: df_aud = df_aud[df_aud['categoria'].isin(s_cat)]
-        if s_prod: df_aud = df_aud[df_aud['producto'].isin(s_prod)]
-        col_hm = 'producto' if s_prod else ('categoria' if s_cat else 'jerarquia1')
-        if col_hm in df_aud.columns:
-            piv = df_aud.groupby(['vendedor', col_hm])['monto_real'].sum().reset_index().pivot(index='vendedor', columns=col_hm, values='monto_real').fillna(0)
-            st.plotly_chart(px.imshow(piv, aspect="auto", text_auto='.2s'), use_container_width=True)
-
-    # 10. INTELIGENCIA
-    with tabs[10]:
-        st.header("🧠 Inteligencia")
-        if 'producto' in dff.columns:
-            tops = dff.groupby('producto')['monto_real'].sum().nlargest(50).index
-            p_sel = st.selectbox("Si lleva...", tops)
-            if p_sel:
-                txs = dff[dff['producto']==p_sel]['id_transaccion'].unique()
-                rel = dff[dff['id_transaccion'].isin(txs)]
-                rel = rel[rel['producto']!=p_sel].groupby('producto')['id_transaccion'].nunique().nlargest(5)
-                st.table(rel)
+    # Solo se calcula la vista elegida; los widgets de cada vista relanzan solo esa vista
+    ctx = {
+        'df_a': df_a, 'df_r': df_r, 'dff': dff, 'cells': cells, 'estado': estado_sel,
+        'df_a_filt': df_a_filt if df_a is not None else None, 'conc': conc, 'conc_pre': conc_pre, 'hay_preventa': hay_preventa,
+        'engine_v': engine_v if not usar_sql else None, 'engine_r': engine_r if df_r is not None else None, 'geo': geo,
+        'sql': sql, 'filtros': filtros, 'fecha_min': fecha_min, 'fecha_max': fecha_max, 'historico': historico, 'rango_archivo': (archivo_min, archivo_max),
+        'sel_canal': sel_canal, 'sel_vendedor': sel_vendedor, 'filtro_vendedor': filtro_vendedor,
+        'tot': tot, 'meta': meta, 'clave': clave
+    }
+    vista = st.radio("Vista:", list(VISTAS), horizontal=True, label_visibility="collapsed", key="vista")
+    VISTAS[vista](ctx)
+
+    # Compartido = todo lo que vive en cache_resource (una vez por proceso: fuentes, estructuras
+    # derivadas y períodos del histórico); sesión = las selecciones propias de este rerun, sin
+    # contar los textos que comparten con las tablas base (lo que agrega cada usuario
+    # conectado). Las selecciones de los motores de filtro también se comparten (LRU).
+    tablas, firma_tablas = tablas_compartidas()
+    compartido = shared_memory_mb(tablas, firma_tablas)
+    sesion = sum(data_loader.memory_mb(t, deep=False) for t in (conc_pre, estado_sel, cells))
+    rss = data_loader.process_rss_mb()
+    mem_box.caption(f"Compartido entre sesiones: {compartido:,.1f} MB")
+    mem_box.caption(f"Esta sesión: {sesion * 1000:,.0f} KB")
+    if rss: mem_box.caption(f"Proceso: {rss:,.0f} MB")
 
 else:
     st.error("🚨 ERROR: No se encontró 'venta_completa.csv' en GitHub.")
+
+perfil.finish()
+if perfil.enabled:
+    with st.sidebar.expander("⏱️ Perfil de reruns", expanded=True):
+        st.number_input("Reruns a conservar", 1, 50, 10, key='perfil_n')
+        hist = profiler.history_frame(perfil.historial)
+        if not hist.empty:
+            ultimo = hist[hist['rerun'] == hist['rerun'].max()].dropna(axis=1, how='all')
+            st.caption(f"Último rerun ({ultimo['tipo'].iloc[0]}): {ultimo['total_ms'].iloc[0]:,.0f} ms")
+            st.dataframe(ultimo.drop(columns=['rerun', 'tipo', 'inicio', 'total_ms']).round(1), hide_index=True, use_container_width=True)
+            st.bar_chart(hist.groupby('rerun')['total_ms'].first())
+            st.download_button("⬇️ CSV", hist.to_csv(index=False), "perfil_reruns.csv", "text/csv")
+            st.download_button("⬇️ JSON", json.dumps(perfil.historial, indent=1), "perfil_reruns.json", "application/json")
@@ -0,0 +1,559 @@
+import io
+import os
+import json
+import hashlib
+import inspect
+import shutil
+import uuid
+import pandas as pd
+
+# Copy-on-write: una selección o columna derivada nunca escribe sobre las tablas compartidas
+# entre sesiones (por defecto desde pandas 3)
+if int(pd.__version__.split('.')[0]) < 3: pd.set_option('mode.copy_on_write', True)
+
+# --- CONFIGURACIÓN ---
+# Carpeta de snapshots columnares (relativa al directorio de trabajo, igual que los CSV)
+SNAPSHOT_DIR = '.snapshots'
+
+CAT_MAP = {
+    'JOSE CARLOS MENDOZA MENDOZA': '1. MAYORISTAS', 'KEVIN  COLODRO VACA': '1. MAYORISTAS',
+    'MARCIA MARAZ MONTAÑO': '1. MAYORISTAS', 'ABDY JOSE RUUD': '1. MAYORISTAS',
+    'MARIBEL ROLLANO CHOQUE': '2. PERIFERIA', 'RAFAEL SARDAN SALAZAR': '3. FARMACIAS',
+    'LUIS PABLO LOPEZ NEGRETE': '4. INSTITUCIONAL', 'JAVIER JUSTINIANO GOMEZ': '5. PARETOS TDB'
+}
+
+# --- FUNCIÓN: BUSCADOR DE ARCHIVOS ---
+def find_file_fuzzy(keywords):
+    current_files = os.listdir('.')
+    for f in current_files:
+        if all(k.lower() in f.lower() for k in keywords) and (f.endswith('.csv') or f.endswith('.xlsx')):
+            return f
+    return None
+
+# --- FUNCIÓN DE LECTURA ROBUSTA ---
+def read_smart(file_path):
+    # Acepta una ruta o los bytes del archivo (ingesta incremental)
+    if not file_path: return None
+    source = lambda: io.BytesIO(file_path) if isinstance(file_path, bytes) else file_path
+    try:
+        df = pd.read_csv(source(), sep=';', on_bad_lines='skip', encoding='utf-8')
+        if df.shape[1] < 2:
+            df = pd.read_csv(source(), sep=',', on_bad_lines='skip', encoding='utf-8')
+        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+        return df
+    except: return None
+
+def read_smart_chunks(file_path, chunk_rows):
+    # Misma lectura que read_smart pero por tramos, para archivos más grandes que la memoria
+    sep = ';' if pd.read_csv(file_path, sep=';', nrows=0, encoding='utf-8').shape[1] >= 2 else ','
+    for df in pd.read_csv(file_path, sep=sep, on_bad_lines='skip', encoding='utf-8', chunksize=chunk_rows):
+        df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+        yield df
+
+# --- NORMALIZACIÓN POR FUENTE ---
+def clean_currency_hybrid(serie):
+    s = serie.astype(str).str.strip()
+    # Si tiene coma, asumimos formato Latino/Europeo (1.000,00)
+    latino = s.str.contains(',', regex=False)
+    # Si no tiene coma, asumimos formato Estándar/Python (1000.00)
+    return s.where(~latino, s.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+
+def normalize_venta(df_v):
+    if df_v is None or 'fecha' not in df_v.columns: return df_v
+    if 'clienteid' in df_v.columns: df_v['clienteid'] = df_v['clienteid'].astype(str)
+    if 'cliente' in df_v.columns: df_v['cliente'] = df_v['cliente'].astype(str).str.strip().str.upper()
+
+    df_v['fecha'] = pd.to_datetime(df_v['fecha'], format='%d/%m/%Y', dayfirst=True, errors='coerce')
+    df_v['semana_anio'] = df_v['fecha'].dt.isocalendar().week
+
+    if 'montofinal' in df_v.columns: df_v['monto_real'] = df_v['montofinal']
+    elif 'monto' in df_v.columns: df_v['monto_real'] = df_v['monto']
+    else: df_v['monto_real'] = 0
+
+    df_v['id_transaccion'] = df_v.get('ventaid', df_v.columns[0])
+    df_v['canal'] = df_v['vendedor'].map(CAT_MAP).fillna('6. RUTA TDB')
+    return df_v
+
+def normalize_maestro(df_a):
+    if df_a is None: return df_a
+    col_id = next((c for c in df_a.columns if 'cliente' in c and 'id' in c), None)
+    col_vend = next((c for c in df_a.columns if 'vendedor' in c), None)
+    col_nom = next((c for c in df_a.columns if 'cliente' in c and 'id' not in c), None)
+
+    if col_id and col_vend:
+        rename_dict = {col_id: 'clienteid', col_vend: 'vendedor'}
+        if col_nom: rename_dict[col_nom] = 'cliente'
+
+        df_a = df_a.rename(columns=rename_dict)
+        df_a['clienteid'] = df_a['clienteid'].astype(str)
+        df_a['vendedor'] = df_a['vendedor'].astype(str).str.strip()
+
+        if 'cliente' not in df_a.columns:
+            df_a['cliente'] = "Cliente " + df_a['clienteid']
+
+        if 'latitud' in df_a.columns and 'longitud' in df_a.columns:
+            df_a['latitud'] = pd.to_numeric(df_a['latitud'].astype(str).str.replace(',', '.'), errors='coerce')
+            df_a['longitud'] = pd.to_numeric(df_a['longitud'].astype(str).str.replace(',', '.'), errors='coerce')
+            df_a = df_a.dropna(subset=['latitud', 'longitud'])
+            df_a = df_a[(df_a['latitud'] != 0) & (df_a['longitud'] != 0)]
+    return df_a
+
+def normalize_preventa(df_p):
+    if df_p is None or 'fecha' not in df_p.columns: return df_p
+    df_p['fecha'] = pd.to_datetime(df_p['fecha'], format='%d/%m/%Y', dayfirst=True, errors='coerce')
+
+    # Normalización de columna monto
+    col_monto_pre = next((c for c in df_p.columns if 'monto' in c and ('final' in c or 'pre' in c or 'total' in c)), None)
+    if not col_monto_pre: col_monto_pre = 'monto'
+
+    if col_monto_pre in df_p.columns:
+        # Aplicar limpieza híbrida antes de convertir
+        df_p[col_monto_pre] = clean_currency_hybrid(df_p[col_monto_pre])
+
+        # Limpieza final de símbolos extraños (ej: $) y conversión
+        df_p[col_monto_pre] = pd.to_numeric(
+            df_p[col_monto_pre].astype(str).str.replace(r'[^\d.]', '', regex=True),
+            errors='coerce'
+        )
+
+        df_p['monto_pre'] = df_p[col_monto_pre].fillna(0)
+    else:
+        df_p['monto_pre'] = 0
+
+    col_pre = next((c for c in df_p.columns if 'nro' in c and 'preventa' in c), None)
+    if col_pre: df_p['id_cruce'] = df_p[col_pre]
+
+    return df_p.drop_duplicates()
+
+def normalize_rebotes(df_r):
+    if df_r is None: return df_r
+    col_fecha_entrega = next((c for c in df_r.columns if 'entrega' in c and 'fecha' in c), None)
+    if not col_fecha_entrega: col_fecha_entrega = next((c for c in df_r.columns if 'fecha' in c), None)
+    if col_fecha_entrega:
+        df_r['fecha_filtro'] = pd.to_datetime(df_r[col_fecha_entrega], format='%d/%m/%Y', dayfirst=True, errors='coerce')
+    if 'vendedor' in df_r.columns:
+        df_r['vendedor'] = df_r['vendedor'].astype(str).str.strip().str.upper()
+    col_monto_r = next((c for c in df_r.columns if 'monto' in c and 'rechazo' in c), None)
+    if col_monto_r:
+        df_r['monto_rechazo'] = pd.to_numeric(df_r[col_monto_r], errors='coerce').fillna(0)
+    return df_r
+
+# Fuente -> (palabras clave del archivo, normalizador)
+SOURCES = {
+    'venta': (['venta', 'completa'], normalize_venta),
+    'preventa': (['preventa'], normalize_preventa),
+    'maestro': (['maestro', 'cliente'], normalize_maestro),
+    'rebotes': (['rebotes'], normalize_rebotes),
+}
+
+# Código del que dependen todos los snapshots normalizados (ver normalizer_version)
+NORMALIZACION = (read_smart, read_smart_chunks, clean_currency_hybrid, normalize_venta, normalize_maestro, normalize_preventa, normalize_rebotes)
+
+# Fuentes que solo crecen durante el mes (se agregan días al final): admiten ingesta incremental.
+# El valor indica si tras anexar hay que volver a quitar duplicados (como hace la preventa).
+APPEND_SOURCES = {'venta': False, 'preventa': True}
+
+# --- SNAPSHOTS COLUMNARES (PARQUET) ---
+# Cada fuente normalizada se guarda en Parquet junto a un JSON con la identidad del archivo
+# origen (tamaño, mtime y sha1). Si el archivo no cambió se lee el snapshot en vez de re-parsear.
+# Las filas anexadas al archivo van a un Parquet aparte (<fuente>.partes/), listado en el JSON
+# con sus filas (`archivos`), y el sha1 se guarda por tramo de bytes (`tramos`: el archivo
+# original y cada anexo): anexar cuesta lo que la cola, sin reescribir ni re-hashear lo anterior.
+# Pasados MAX_PARTES anexos el snapshot se reescribe en un solo archivo (costo amortizado).
+FP_BLOCK = 1 << 16
+MAX_PARTES = 20
+
+def file_digest(file_path, start=0, end=None):
+    # sha1 de los bytes [start, end) del archivo (por defecto, todo)
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        restante = float('inf') if end is None else end - start
+        while restante > 0:
+            chunk = f.read(int(min(1 << 20, restante)))
+            if not chunk: break
+            h.update(chunk)
+            restante -= len(chunk)
+    return h.hexdigest()
+
+def content_matches(file_path, tramos):
+    # El archivo tiene el contenido registrado, tramo por tramo ([fin, sha1] de cada uno)
+    inicio = 0
+    for fin, sha1 in tramos:
+        if file_digest(file_path, inicio, fin) != sha1: return False
+        inicio = fin
+    return True
+
+def append_fingerprint(file_path, offset):
+    # Huella del encabezado y del último bloque ya procesado: si siguen iguales, los bytes
+    # después de `offset` son filas nuevas anexadas al final del archivo
+    with open(file_path, 'rb') as f:
+        head = f.read(min(FP_BLOCK, offset))
+        start = max(0, offset - FP_BLOCK)
+        f.seek(start)
+        tail = f.read(offset - start)
+    if len(tail) != offset - start or not tail.endswith(b'\n'): return None
+    return hashlib.sha1(head + tail).hexdigest()
+
+def normalizer_version(normalizer):
+    # Cambiar el código del normalizador invalida sus snapshots (igual que st.cache_data). Se
+    # incluye todo lo que arma la tabla normalizada: la lectura, la sección de normalización
+    # (los normalizadores usan helpers como clean_currency_hybrid) y CAT_MAP
+    try:
+        fuente = ''.join(inspect.getsource(f) for f in (normalizer, *NORMALIZACION)) + json.dumps(CAT_MAP, sort_keys=True)
+        return hashlib.sha1(fuente.encode('utf-8')).hexdigest()[:12]
+    except: return 'sin-version'
+
+# Escrituras atómicas (temporal + os.replace): un lector, de esta sesión o de otro proceso,
+# nunca ve un archivo a medio escribir. Las usan todos los módulos que persisten en .snapshots
+def snapshot_path(name, ext='parquet'):
+    return os.path.join(SNAPSHOT_DIR, f'{name}.{ext}')
+
+def write_json_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f: json.dump(data, f)
+    os.replace(tmp, path)
+
+def write_parquet_atomic(df, path, **kwargs):
+    # Si falla se borra el temporal y se propaga el error
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        df.to_parquet(tmp, **kwargs)
+        os.replace(tmp, path)
+    except:
+        try: os.remove(tmp)
+        except: pass
+        raise
+
+def write_snapshot(name, df, meta):
+    # Parquet + JSON de un snapshot; ante un fallo (columnas con tipos mixtos, disco) se borra
+    # el JSON para que el snapshot no se use y se sigue sin él
+    try:
+        write_parquet_atomic(df, snapshot_path(name))
+        write_json_atomic(snapshot_path(name, 'json'), meta)
+        return True
+    except:
+        try: os.remove(snapshot_path(name, 'json'))
+        except: pass
+        return False
+
+def read_snapshot_meta(name):
+    try:
+        with open(snapshot_path(name, 'json'), encoding='utf-8') as f: return json.load(f)
+    except: return None
+
+def snapshot_current(name, file_path, normalizer, meta):
+    # El snapshot corresponde al archivo actual (sin leerlo)
+    if not meta or meta.get('file') != file_path or meta.get('version') != normalizer_version(normalizer): return False
+    if not meta.get('archivos'): return False
+
+    stat = os.stat(file_path)
+    if meta.get('size') != stat.st_size: return False
+    if meta.get('mtime_ns') != stat.st_mtime_ns:
+        # Mismo tamaño pero otro mtime (copia, touch, re-subida): se confirma por contenido
+        # (todos los tramos: append_fp solo cubre los extremos y no detectaría una
+        # re-exportación del mismo tamaño que corrige una fila del medio)
+        if not meta.get('tramos') or not content_matches(file_path, meta['tramos']): return False
+        meta['mtime_ns'] = stat.st_mtime_ns
+        try: write_json_atomic(snapshot_path(name, 'json'), meta)
+        except: pass
+    return all(os.path.exists(p) for p in snapshot_files(name, meta))
+
+def snapshot_files(name, meta):
+    # Parquet del snapshot en orden: el base y los anexos
+    return [os.path.join(SNAPSHOT_DIR, rel) for rel, _ in meta['archivos']]
+
+def read_snapshot(name, meta, desde=0):
+    # Filas del snapshot a partir de la posición `desde`: solo se abren los archivos que las tienen
+    partes, inicio = [], 0
+    for path, (_, filas) in zip(snapshot_files(name, meta), meta['archivos']):
+        if inicio + filas > desde: partes.append(pd.read_parquet(path).iloc[max(0, desde - inicio):])
+        inicio += filas
+    return pd.concat(partes) if len(partes) > 1 else partes[0]
+
+def save_snapshot(name, file_path, normalizer, df, raw_rows, generation):
+    # Snapshot completo en un solo archivo; devuelve su JSON (None si no se pudo guardar)
+    stat = os.stat(file_path)
+    meta = {
+        'file': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+        'tramos': [[stat.st_size, file_digest(file_path)]],
+        'append_fp': append_fingerprint(file_path, stat.st_size),
+        'version': normalizer_version(normalizer), 'rows': len(df), 'raw_rows': raw_rows,
+        'archivos': [[f'{name}.parquet', len(df)]], 'columnas': list(df.columns), 'mb': memory_mb(df),
+        # La generación se conserva mientras el archivo solo crece: indica que las
+        # primeras filas del snapshot no cambiaron (ver build_sales)
+        'generation': generation
+    }
+    if not write_snapshot(name, df, meta): return None
+    shutil.rmtree(os.path.join(SNAPSHOT_DIR, f'{name}.partes'), ignore_errors=True)
+    return meta
+
+# --- INGESTA INCREMENTAL (SOLO FILAS NUEVAS) ---
+def read_tail(file_path, offset, end):
+    # Encabezado + bytes nuevos: se parsea solo la cola con la misma lectura robusta
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        f.seek(offset)
+        return read_smart(header + f.read(end - offset))
+
+def append_snapshot(name, file_path, normalizer, meta, prev=None):
+    # Guarda solo las filas anexadas al archivo (sin leer el snapshot, salvo para quitar
+    # duplicados si `prev` no lo trae ya en memoria). Devuelve (JSON nuevo, filas nuevas)
+    if name not in APPEND_SOURCES or not meta or meta.get('file') != file_path: return None
+    if meta.get('version') != normalizer_version(normalizer) or meta.get('raw_rows') is None: return None
+    if not meta.get('tramos') or not meta.get('archivos'): return None
+
+    offset, stat = meta.get('size', 0), os.stat(file_path)
+    if stat.st_size <= offset: return None
+    if not meta.get('append_fp') or append_fingerprint(file_path, offset) != meta['append_fp']: return None
+
+    delta = read_tail(file_path, offset, stat.st_size)
+    if delta is None: return None
+    # Índice continuo con las filas crudas ya procesadas, igual que en un parseo completo
+    delta.index = pd.RangeIndex(meta['raw_rows'], meta['raw_rows'] + len(delta))
+    raw_rows = meta['raw_rows'] + len(delta)
+    delta = normalizer(delta)
+    if delta is None or list(delta.columns) != meta.get('columnas'): return None
+
+    try:
+        old = None
+        if APPEND_SOURCES[name] or len(meta['archivos']) >= MAX_PARTES:
+            old = prev if prev is not None and len(prev) == meta['rows'] else read_snapshot(name, meta)
+        # Sin duplicar filas ya guardadas (el snapshot viejo ya no tiene duplicados)
+        if APPEND_SOURCES[name]: delta = pd.concat([old, delta]).drop_duplicates().iloc[len(old):]
+        # Cada escritura va a un archivo nuevo: quien leyó el JSON anterior sigue viendo los suyos
+        archivos, rel = meta['archivos'], f'{name}.partes/{uuid.uuid4().hex[:12]}.parquet'
+        reescrito = len(archivos) >= MAX_PARTES
+        if reescrito:
+            write_parquet_atomic(pd.concat([old, delta]), os.path.join(SNAPSHOT_DIR, rel))
+            archivos = [[rel, meta['rows'] + len(delta)]]
+        elif len(delta):
+            write_parquet_atomic(delta, os.path.join(SNAPSHOT_DIR, rel))
+            archivos = archivos + [[rel, len(delta)]]
+        meta = {**meta, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                'tramos': meta['tramos'] + [[stat.st_size, file_digest(file_path, offset, stat.st_size)]],
+                'append_fp': append_fingerprint(file_path, stat.st_size),
+                'rows': meta['rows'] + len(delta), 'raw_rows': raw_rows, 'archivos': archivos,
+                'mb': meta.get('mb', 0) + memory_mb(delta)}
+        write_json_atomic(snapshot_path(name, 'json'), meta)
+    except: return None
+    if reescrito:
+        # Se borran el base y los anexos anteriores
+        carpeta = os.path.join(SNAPSHOT_DIR, f'{name}.partes')
+        for path in [snapshot_path(name)] + [os.path.join(carpeta, f) for f in os.listdir(carpeta)]:
+            if os.path.basename(path) != os.path.basename(rel):
+                try: os.remove(path)
+                except: pass
+    return meta, delta
+
+# --- IDENTIDAD DE ARCHIVOS (VIGILANCIA) ---
+# Firma barata (solo os.stat) usada como clave de caché por fuente y para detectar cambios
+def source_signature(name):
+    file_path = find_file_fuzzy(SOURCES[name][0])
+    if not file_path: return None
+    stat = os.stat(file_path)
+    return (file_path, stat.st_size, stat.st_mtime_ns)
+
+def source_signatures():
+    return {name: source_signature(name) for name in SOURCES}
+
+def snapshot_generation(name):
+    meta = read_snapshot_meta(name)
+    return meta.get('generation') if meta else None
+
+def update_snapshot(name, file_path, prev=None):
+    # Lleva el snapshot al archivo actual: nada si está al día, solo la cola si el archivo
+    # creció o un parseo completo. Devuelve (JSON, df): df es la fuente completa cuando ya quedó
+    # en memoria (parseo completo, o `prev`, la fuente que el llamador ya tiene, más la cola) y
+    # None si hay que leerla del snapshot
+    normalizer = SOURCES[name][1]
+    meta = read_snapshot_meta(name)
+    if prev is not None and (not meta or len(prev) != meta.get('rows')): prev = None
+    if snapshot_current(name, file_path, normalizer, meta): return meta, prev
+
+    anexo = append_snapshot(name, file_path, normalizer, meta, prev)
+    if anexo is not None: return anexo[0], pd.concat([prev, anexo[1]]) if prev is not None else None
+
+    raw = read_smart(file_path)
+    if raw is None: return None, None
+    raw_rows = len(raw)
+    df = normalizer(raw)
+    if df is None: return None, None
+    return save_snapshot(name, file_path, normalizer, df, raw_rows, uuid.uuid4().hex), df
+
+def load_source(name, file_path=None, prev=None):
+    keywords, normalizer = SOURCES[name]
+    if not file_path: file_path = find_file_fuzzy(keywords)
+    if not file_path: return None
+
+    meta, df = update_snapshot(name, file_path, prev)
+    if df is None and meta is not None:
+        try: df = read_snapshot(name, meta)
+        except:
+            # Snapshot ilegible: se descarta y se vuelve a parsear el archivo
+            try: os.remove(snapshot_path(name, 'json'))
+            except: pass
+            meta, df = update_snapshot(name, file_path)
+    return df
+
+# --- ENRIQUECIMIENTO ---
+def enrich_venta(df_v, df_a):
+    if df_v is None or df_a is None: return df_v
+    df_v = df_v.rename(columns={'vendedor': 'vendedor_venta'})
+    temp_a = df_a[['clienteid', 'vendedor']].drop_duplicates(subset=['clienteid'])
+    df_v = pd.merge(df_v, temp_a, on='clienteid', how='left')
+    df_v['vendedor'] = df_v['vendedor'].fillna(df_v['vendedor_venta'])
+    df_v['canal'] = df_v['vendedor'].map(CAT_MAP).fillna('6. RUTA TDB')
+    return df_v
+
+# --- ESQUEMA COMPACTO ---
+# Etiquetas repetidas como categóricas, IDs como enteros, montos en float32 y semana en int8.
+# Los isin/groupby/nunique de las pestañas trabajan así sobre códigos en vez de strings.
+CATEGORY_COLS = ['vendedor', 'vendedor_venta', 'canal', 'cliente', 'producto', 'tipopago', 'categoria', 'jerarquia1']
+AMOUNT_COLS = ['monto_real', 'montofinal', 'monto']
+
+def memory_mb(df, deep=True):
+    return df.memory_usage(deep=deep).sum() / 1e6 if df is not None else 0
+
+def process_rss_mb():
+    # Memoria residente actual del proceso (Linux); None si no se puede leer
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except: return None
+
+def as_int_ids(s):
+    # Devuelve la serie como enteros solo si todos los valores son números enteros
+    n = pd.to_numeric(s, errors='coerce')
+    if n.isna().any() or (n % 1 != 0).any(): return None
+    return pd.to_numeric(n.astype('int64'), downcast='integer')
+
+def numeric_client_ids(df_v, df_a):
+    # Venta y maestro se cruzan por clienteid: ambos enteros o ambos texto
+    if df_v is None or 'clienteid' not in df_v.columns: return False
+    if df_a is not None and 'clienteid' in df_a.columns and as_int_ids(df_a['clienteid']) is None: return False
+    return as_int_ids(df_v['clienteid']) is not None
+
+def compact_sales(df_v, numeric_ids):
+    if df_v is None or 'fecha' not in df_v.columns: return df_v
+    df_v = df_v.copy()
+    if 'clienteid' in df_v.columns:
+        ids = as_int_ids(df_v['clienteid']) if numeric_ids else None
+        if numeric_ids and ids is None: return None
+        df_v['clienteid'] = ids if ids is not None else df_v['clienteid'].astype('category')
+    if 'id_transaccion' in df_v.columns:
+        ids = as_int_ids(df_v['id_transaccion'])
+        if ids is not None: df_v['id_transaccion'] = ids
+    for c in CATEGORY_COLS:
+        if c in df_v.columns: df_v[c] = df_v[c].astype('category')
+    for c in AMOUNT_COLS:
+        if c in df_v.columns: df_v[c] = pd.to_numeric(df_v[c], errors='coerce').astype('float32')
+    if 'semana_anio' in df_v.columns:
+        df_v['semana_anio'] = df_v['semana_anio'].astype('int8' if df_v['semana_anio'].notna().all() else 'Int8')
+    return df_v
+
+def compact_maestro(df_a, numeric_ids):
+    if df_a is None or not numeric_ids or 'clienteid' not in df_a.columns: return df_a
+    df_a = df_a.copy()
+    df_a['clienteid'] = as_int_ids(df_a['clienteid'])
+    return df_a
+
+def concat_compact(prev, delta):
+    # Une dos tramos compactos: las categorías nuevas del tramo se agregan al final del
+    # diccionario para que los códigos ya asignados no cambien
+    if list(prev.columns) != list(delta.columns): return None
+    prev_cols, delta_cols = {}, {}
+    for c in prev.columns:
+        if isinstance(prev[c].dtype, pd.CategoricalDtype) and isinstance(delta[c].dtype, pd.CategoricalDtype):
+            extra = delta[c].cat.categories.difference(prev[c].cat.categories)
+            cats = prev[c].cat.categories.append(extra)
+            if len(extra): prev_cols[c] = prev[c].cat.add_categories(extra)
+            delta_cols[c] = delta[c].cat.set_categories(cats)
+        elif isinstance(prev[c].dtype, pd.CategoricalDtype) != isinstance(delta[c].dtype, pd.CategoricalDtype):
+            return None
+    return pd.concat([prev.assign(**prev_cols), delta.assign(**delta_cols)], ignore_index=True)
+
+# --- SNAPSHOT DE LA VENTA COMPACTA ---
+# La venta ya cruzada con el maestro y compactada también se guarda en Parquet, con la
+# generación del snapshot de venta, sus filas y la identidad del maestro: al reiniciar el
+# proceso se lee en vez de repetir cruce y compactación, y si la venta solo creció se
+# procesan únicamente las filas nuevas (concat_compact).
+def _compact_key(rows):
+    meta_v, meta_a = read_snapshot_meta('venta'), read_snapshot_meta('maestro')
+    # Solo si la venta es el snapshot de venta vigente (`rows` filas) y el maestro viene de su snapshot
+    if not meta_v or not meta_a or not meta_a.get('tramos') or meta_v.get('rows') != rows: return None
+    codigo = ''.join(inspect.getsource(f) for f in (enrich_venta, compact_sales, as_int_ids, numeric_client_ids, concat_compact, _extend_sales))
+    return {'generation': meta_v.get('generation'), 'maestro': [meta_a['tramos'], meta_a.get('version')],
+            'version': hashlib.sha1((codigo + normalizer_version(normalize_venta)).encode('utf-8')).hexdigest()[:12]}
+
+def load_compact_sales(rows, key=None):
+    key = key or _compact_key(rows)
+    meta = read_snapshot_meta('venta_compacta')
+    if key is None or not meta or meta.get('key') != key or meta.get('rows', rows + 1) > rows: return None
+    try: return pd.read_parquet(snapshot_path('venta_compacta'))
+    except: return None
+
+def save_compact_sales(rows, sales, key=None):
+    key = key or _compact_key(rows)
+    if key is not None: write_snapshot('venta_compacta', sales, {'key': key, 'rows': len(sales)})
+
+def _extend_sales(prev, leer, total, df_a):
+    # Venta compacta de `total` filas; `leer(desde)` da la venta cruda desde esa posición. Con
+    # `prev` (las primeras filas ya cruzadas y compactadas) solo la cola pasa por cruce y compactación
+    if prev is not None and df_a is not None and len(prev) <= total:
+        if len(prev) == total: return prev
+        numeric_ids = 'clienteid' in prev.columns and pd.api.types.is_integer_dtype(prev['clienteid'])
+        delta = compact_sales(enrich_venta(leer(len(prev)), df_a), numeric_ids)
+        sales = concat_compact(prev, delta) if delta is not None else None
+        if sales is not None: return sales
+    df_v = leer(0)
+    return compact_sales(enrich_venta(df_v, df_a), numeric_client_ids(df_v, df_a))
+
+def _with_maestro(sales, df_a, venta_mb_antes):
+    numeric_ids = sales is not None and 'clienteid' in sales.columns and pd.api.types.is_integer_dtype(sales['clienteid'])
+    df_a_comp = compact_maestro(df_a, numeric_ids)
+    report = {'venta_mb_antes': venta_mb_antes, 'venta_mb': memory_mb(sales),
+              'maestro_mb_antes': memory_mb(df_a), 'maestro_mb': memory_mb(df_a_comp)}
+    return sales, df_a_comp, report
+
+def build_sales(prev, df_v, df_a):
+    # `prev` es la venta compacta anterior de la misma generación de snapshot y el mismo
+    # maestro: solo las filas anexadas desde entonces pasan por el cruce y la compactación.
+    # Sin `prev` en memoria se usa el snapshot compacto de disco
+    if df_v is None: return _with_maestro(None, df_a, 0)
+    if prev is None and df_a is not None: prev = load_compact_sales(len(df_v))
+    sales = _extend_sales(prev, lambda desde: df_v.iloc[desde:], len(df_v), df_a)
+    if sales is not None and df_a is not None and sales is not prev: save_compact_sales(len(df_v), sales)
+    return _with_maestro(sales, df_a, memory_mb(df_v))
+
+def load_sales(df_a, file_path=None, prev=None, prev_key=None):
+    # Como build_sales pero sin tener la venta cruda completa en memoria: pone al día el
+    # snapshot de venta y, si `prev` (con su clave `prev_key`) o la venta compacta de disco
+    # siguen valiendo, lee del snapshot solo las filas anexadas. Devuelve además la clave de
+    # la venta compacta, para pasarla como `prev_key` la próxima vez
+    if not file_path: file_path = find_file_fuzzy(SOURCES['venta'][0])
+    meta, df_v = update_snapshot('venta', file_path) if file_path else (None, None)
+    key = _compact_key(meta['rows']) if meta is not None and df_a is not None else None
+    if key is None:
+        # Sin snapshot o sin maestro: con la venta completa en memoria
+        if df_v is None and meta is not None: df_v = load_source('venta', file_path)
+        return (*build_sales(None, df_v, df_a), None)
+
+    def leer(desde):
+        if df_v is not None: return df_v.iloc[desde:]
+        try: return read_snapshot('venta', meta, desde)
+        except: return load_source('venta', file_path).iloc[desde:]
+
+    if prev is None or prev_key != key: prev = load_compact_sales(meta['rows'], key)
+    sales = _extend_sales(prev, leer, meta['rows'], df_a)
+    if sales is not None and sales is not prev: save_compact_sales(meta['rows'], sales, key)
+    return (*_with_maestro(sales, df_a, memory_mb(df_v) if df_v is not None else meta.get('mb', 0)), key)
+
+# --- CARGA CONSOLIDADA ---
+def load_consolidated_data():
+    # La venta cruda no queda en memoria: solo la compacta (ver load_sales)
+    df_p = load_source('preventa')
+    df_a = load_source('maestro')
+    df_r = load_source('rebotes')
+    df_v, df_a, _, _ = load_sales(df_a)
+    return df_v, df_p, df_a, df_r
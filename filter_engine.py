@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# --- MOTOR DE FILTROS ---
+# Guarda por cada dimensión (canal, vendedor, zona, ...) las filas de cada valor como arreglos
+# de índices. Una selección combina esos índices con operaciones de bits y el resultado se
+# memoriza por combinación de filtros (LRU), así volver a un vendedor ya visto no re-filtra.
+# Un criterio None no filtra esa dimensión; una lista vacía no deja pasar ninguna fila (como
+# `isin([])`). Sin filtros se devuelve el DataFrame base y, si las filas elegidas son contiguas, un slice
+# (vista); los resultados se comparten entre reruns y no deben modificarse.
+class FilterEngine:
+    def __init__(self, df, dims, max_entries=16):
+        self.df = df
+        self.dims = [d for d in dims if d in df.columns]
+        self.max_entries = max_entries
+        self._index = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def values(self, dim):
+        return sorted(self._rows_by_value(dim).keys())
+
+    def _rows_by_value(self, dim):
+        if dim not in self._index:
+            self._index[dim] = self.df.groupby(dim, observed=True, sort=False).indices
+        return self._index[dim]
+
+    def rows(self, dim, values):
+        index = self._rows_by_value(dim)
+        parts = [index[v] for v in values if v in index]
+        if not parts: return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def mask(self, **criteria):
+        mask = np.ones(len(self.df), dtype=bool)
+        for dim, values in criteria.items():
+            if values is None: continue
+            dim_mask = np.zeros(len(self.df), dtype=bool)
+            dim_mask[self.rows(dim, values)] = True
+            mask &= dim_mask
+        return mask
+
+    def select(self, **criteria):
+        # criterio = lista de valores; None = sin filtrar esa dimensión, lista vacía = ninguna fila
+        criteria = {d: tuple(v) for d, v in criteria.items() if v is not None and d in self.dims}
+        key = tuple(sorted(criteria.items()))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if not criteria: result = self.df
+        else:
+            idx = np.flatnonzero(self.mask(**criteria))
+            if len(idx) and idx[-1] - idx[0] + 1 == len(idx): result = self.df.iloc[idx[0]:idx[-1] + 1]
+            else: result = self.df.iloc[idx]
+
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries: self._cache.popitem(last=False)
+        return result
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# --- PROYECCIÓN DEL CIERRE DE MES (SIMULADOR) ---
+# Ritmo por vendedor y día de la semana ajustado sobre la serie diaria del período, aplicado a
+# los días que faltan del mes. Como subir ticket o cobertura escala solo lo que falta vender,
+# la grilla completa de escenarios es un producto exterior (vendedor × ticket × cobertura) y
+# las bandas de Monte Carlo se calculan una vez: cierre = mes + factor × restante, así los
+# cuantiles de cualquier escenario son los del restante multiplicados por su factor.
+UPLIFTS = np.arange(0, 51)   # % de suba de ticket / cobertura (los valores de los sliders)
+N_SIMULACIONES = 2000
+CUANTILES = (0.1, 0.5, 0.9)
+MIN_MUESTRAS = 3             # días históricos mínimos de un día de la semana para sortear solo entre ellos
+DIAS_MINIMOS = 14            # con menos historia las bandas se marcan como poco confiables
+
+def daily_matrix(cells, desde, hasta):
+    # Venta vendedor × día (días sin venta = 0) entre `desde` y `hasta`
+    dias = pd.date_range(pd.Timestamp(desde).normalize(), pd.Timestamp(hasta).normalize(), freq='D')
+    codes, vendedores = pd.factorize(cells['vendedor'], sort=True)
+    d = ((cells['fecha'].to_numpy(dtype='datetime64[ns]') - dias[0].to_datetime64()) // np.timedelta64(1, 'D')).astype(np.int64)
+    ok = (codes >= 0) & (d >= 0) & (d < len(dias))
+    flat = np.bincount(codes[ok] * len(dias) + d[ok], weights=cells['monto_real'].to_numpy(dtype='float64')[ok], minlength=len(vendedores) * len(dias))
+    return list(vendedores), dias, flat.reshape(len(vendedores), len(dias))
+
+def weekday_rates(V, dias):
+    # Venta media por vendedor y día de la semana; un día de la semana sin historia usa la media general
+    wd = dias.weekday.to_numpy()
+    n = np.bincount(wd, minlength=7)
+    sumas = V @ (wd[:, None] == np.arange(7)).astype('float64')
+    media = V.mean(axis=1, keepdims=True) if V.shape[1] else np.zeros((len(V), 1))
+    return np.where(n > 0, sumas / np.maximum(n, 1), media)
+
+def remaining_days(hasta):
+    hasta = pd.Timestamp(hasta).normalize()
+    return pd.date_range(hasta + pd.Timedelta(days=1), hasta + pd.offsets.MonthEnd(0), freq='D')
+
+def bootstrap_counts(dias, futuros, n_sim, rng):
+    # Cada día futuro se simula con un día histórico del mismo día de la semana; si ese día de la
+    # semana tiene menos de MIN_MUESTRAS días (un solo lunes daría siempre el mismo valor) se
+    # sortea entre todos los días. C[k, d] = veces que la simulación k usó el día histórico d
+    wd = dias.weekday.to_numpy()
+    orden = np.argsort(wd, kind='stable')
+    n = np.bincount(wd, minlength=7)
+    inicio = np.concatenate([[0], np.cumsum(n)[:-1]])
+    pool = np.concatenate([orden, np.arange(len(dias))])
+    propio = n >= MIN_MUESTRAS
+    inicio, n = np.where(propio, inicio, len(dias)), np.where(propio, n, len(dias))
+    wf = futuros.weekday.to_numpy()
+    idx = pool[inicio[wf] + (rng.random((n_sim, len(futuros))) * n[wf]).astype(np.int64)]
+    filas = np.repeat(np.arange(n_sim), len(futuros))
+    return np.bincount(filas * len(dias) + idx.ravel(), minlength=n_sim * len(dias)).reshape(n_sim, len(dias)).astype('float64')
+
+def build_forecast(cells, fecha_min, fecha_max, n_sim=N_SIMULACIONES, seed=0):
+    # Todo en arreglos: s = vendedores, t/c = subas de ticket/cobertura, k = simulaciones
+    fecha_max = pd.Timestamp(fecha_max)
+    vendedores, dias, V = daily_matrix(cells, fecha_min, fecha_max)
+    futuros = remaining_days(fecha_max)
+    en_mes = dias >= max(fecha_max.replace(day=1), pd.Timestamp(fecha_min).normalize())
+    mes = V[:, en_mes].sum(axis=1)
+    ritmo = weekday_rates(V, dias)
+    base = ritmo @ np.bincount(futuros.weekday, minlength=7).astype('float64')
+    factor = np.outer(1 + UPLIFTS / 100, 1 + UPLIFTS / 100)
+    # Mismos días sorteados para todos los vendedores: el total simulado es la suma de la serie total
+    sim_total = bootstrap_counts(dias, futuros, n_sim, np.random.default_rng(seed)) @ V.sum(axis=0) if len(dias) else np.zeros(n_sim)
+    return {
+        'vendedores': vendedores, 'mes': mes, 'base': base, 'ritmo': ritmo, 'factor': factor,
+        'grilla': mes[:, None, None] + base[:, None, None] * factor,
+        'sim_total': sim_total, 'dias_restantes': len(futuros), 'dias_historia': len(dias),
+        # Bandas poco confiables: poca historia o días de la semana sorteados entre todos los días
+        'historia_corta': len(dias) < DIAS_MINIMOS or bool((np.bincount(dias.weekday, minlength=7)[futuros.weekday] < MIN_MUESTRAS).any()),
+    }
+
+def scenario(fc, ticket, cobertura, meta):
+    # Cierre esperado, bandas y probabilidad de llegar a la meta del total para un escenario
+    # (`ticket` y `cobertura` en %, que coinciden con la posición en UPLIFTS)
+    f = fc['factor'][ticket, cobertura]
+    mes = fc['mes'].sum()
+    total = mes + f * fc['sim_total']
+    return mes + f * fc['base'].sum(), mes + f * np.quantile(fc['sim_total'], CUANTILES), float((total >= meta).mean())
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# --- ÍNDICE GEOGRÁFICO DEL MAESTRO ---
+# El maestro repite cada cliente una vez por día de visita; aquí queda un punto por cliente
+# con sus coordenadas proyectadas (Web Mercator) a píxeles enteros del zoom máximo. Con eso
+# la grilla de cualquier zoom sale con un corrimiento de bits (una celda de zoom z agrupa
+# 2^(MAX_ZOOM - z) píxeles), y los filtros de día/ruta se responden con arreglos de
+# posiciones precalculados en lugar de filtrar el maestro.
+MAX_ZOOM = 20
+CLUSTER_BITS = 6      # celdas de 64 px en pantalla
+MAX_POINTS = 1500     # tope de marcadores que se envían al navegador
+ROUTE_DIMS = ['dia', 'ruta']
+
+def mercator_px(lat, lon, zoom=MAX_ZOOM):
+    escala = 256 * 2 ** zoom
+    lat = np.clip(np.radians(lat), -1.4844, 1.4844)
+    x = (np.asarray(lon) + 180) / 360 * escala
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * escala
+    return x.astype('int64'), y.astype('int64')
+
+class GeoIndex:
+    def __init__(self, df_a):
+        cols = [c for c in ['clienteid', 'cliente', 'vendedor', 'latitud', 'longitud'] if c in df_a.columns]
+        self.points = df_a[cols].drop_duplicates(subset=['clienteid']).reset_index(drop=True)
+        self.px, self.py = mercator_px(self.points['latitud'].to_numpy(), self.points['longitud'].to_numpy())
+        self._pos = pd.Index(self.points['clienteid'])
+        # Por dimensión de ruta: valor -> posiciones (en self.points) de los clientes con ese valor
+        self._index = {}
+        for dim in ROUTE_DIMS:
+            if dim not in df_a.columns: continue
+            pares = df_a[['clienteid', dim]].dropna().drop_duplicates()
+            pos = self._pos.get_indexer(pares['clienteid'])
+            self._index[dim] = {v: np.unique(pos[i]) for v, i in pares.groupby(dim, sort=False).indices.items()}
+
+    def values(self, dim):
+        return sorted(self._index.get(dim, {}).keys())
+
+    def select(self, clienteids, **criteria):
+        mask = np.zeros(len(self.points), dtype=bool)
+        pos = self._pos.get_indexer(pd.unique(clienteids))
+        mask[pos[pos >= 0]] = True
+        for dim, values in criteria.items():
+            if not values or dim not in self._index: continue
+            dim_mask = np.zeros(len(self.points), dtype=bool)
+            for v in values:
+                if v in self._index[dim]: dim_mask[self._index[dim][v]] = True
+            mask &= dim_mask
+        return np.flatnonzero(mask)
+
+    def fit_zoom(self, idx, width=900, height=600):
+        # Mayor zoom en el que entran los puntos; se mide entre los percentiles 1 y 99 para que
+        # una coordenada mal cargada (p. ej. longitud sin signo) no aleje todo el mapa
+        if len(idx) < 2: return 14
+        x0, x1 = np.percentile(self.px[idx], [1, 99])
+        y0, y1 = np.percentile(self.py[idx], [1, 99])
+        ancho, alto = x1 - x0 + 1, y1 - y0 + 1
+        z = MAX_ZOOM - np.ceil(np.log2(max(ancho / width, alto / height, 1)))
+        return int(np.clip(z, 3, 18))
+
+    def aggregate(self, idx, status, zoom, max_points=MAX_POINTS):
+        # Puntos sueltos si entran en el tope; si no, un marcador por celda y Status (con la
+        # cantidad de clientes y el centro de la celda), bajando el zoom hasta respetar el tope
+        pts = self.points.iloc[idx]
+        if len(idx) <= max_points:
+            return pd.DataFrame({'latitud': pts['latitud'].to_numpy(), 'longitud': pts['longitud'].to_numpy(),
+                                 'Status': np.asarray(status), 'n': 1, 'etiqueta': pts['cliente'].astype(str).to_numpy()})
+        for z in range(int(zoom), -1, -1):
+            shift = MAX_ZOOM - z + CLUSTER_BITS
+            celdas = pd.DataFrame({'cx': self.px[idx] >> shift, 'cy': self.py[idx] >> shift, 'Status': np.asarray(status),
+                                   'latitud': pts['latitud'].to_numpy(), 'longitud': pts['longitud'].to_numpy(), 'cliente': pts['cliente'].astype(str).to_numpy()})
+            capa = celdas.groupby(['cx', 'cy', 'Status'], sort=False).agg(
+                latitud=('latitud', 'mean'), longitud=('longitud', 'mean'), n=('latitud', 'size'), cliente=('cliente', 'first')).reset_index()
+            if len(capa) <= max_points: break
+        capa['etiqueta'] = np.where(capa['n'] > 1, capa['n'].astype(str) + " clientes", capa['cliente'])
+        return capa.drop(columns=['cx', 'cy', 'cliente'])
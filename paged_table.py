@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+# --- TABLAS PAGINADAS EN EL SERVIDOR ---
+# Búsqueda, orden y paginación sobre el DataFrame ya calculado: al navegador viaja solo la
+# página visible. Las posiciones de las filas buscadas y ordenadas se calculan una vez por
+# combinación (búsqueda, columna, sentido) y cada página es un iloc sobre esas posiciones.
+TAMANOS = [25, 50, 100, 250]
+
+def search_mask(df, texto):
+    # Filas con `texto` (sin distinguir mayúsculas) en alguna columna; en las categóricas se
+    # busca en el diccionario y se compara por código
+    mask = np.zeros(len(df), dtype=bool)
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            hit = np.flatnonzero(s.cat.categories.astype(str).str.contains(texto, case=False, regex=False))
+            mask |= np.isin(s.cat.codes.to_numpy(), hit)
+        else:
+            mask |= s.astype(str).str.contains(texto, case=False, regex=False).to_numpy()
+    return mask
+
+def order(df, texto=None, columna=None, ascendente=True):
+    pos = np.flatnonzero(search_mask(df, texto)) if texto else np.arange(len(df))
+    if columna in df.columns and len(pos):
+        col = df[columna].iloc[pos].reset_index(drop=True)
+        pos = pos[col.sort_values(ascending=ascendente, kind='stable', na_position='last').index.to_numpy()]
+    return pos.astype(np.int32 if len(df) < 2**31 else np.int64)
+
+def n_pages(filas, tamano):
+    return max(1, -(-filas // tamano))
+
+def page(df, pos, pagina, tamano):
+    return df.iloc[pos[(pagina - 1) * tamano: pagina * tamano]]
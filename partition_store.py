@@ -0,0 +1,133 @@
+import os
+import json
+import uuid
+import pandas as pd
+
+import data_loader
+
+# --- HISTÓRICO PARTICIONADO POR FECHA ---
+# La venta compacta se guarda en .snapshots/historico/anio=AAAA/mes=MM/semana=SS.parquet: una
+# partición por año/mes y, dentro del mes, un archivo por semana (semana_anio). El manifiesto
+# guarda por archivo su rango de fechas, filas, monto y una huella del contenido; una consulta
+# por período abre solo los archivos que tocan ese rango, así el costo depende del período y no
+# del tamaño del histórico. Al sincronizar se reescriben solo las semanas cuya huella cambió
+# (también si cambió una columna derivada: vendedor o canal reasignados por el maestro o por
+# CAT_MAP, con las mismas filas y el mismo monto), y los meses que ya no vienen en
+# venta_completa.csv (meses cerrados) se conservan: el histórico crece mes a mes.
+KPI_COLS = ['fecha', 'monto_real', 'clienteid', 'id_transaccion', 'canal', 'vendedor']
+
+def _dir():
+    return os.path.join(data_loader.SNAPSHOT_DIR, 'historico')
+
+def read_manifest():
+    try:
+        with open(os.path.join(_dir(), 'manifiesto.json'), encoding='utf-8') as f: return json.load(f)
+    except: return {'version': None, 'particiones': {}}
+
+def sync_partitions(df_v):
+    manifiesto = read_manifest()
+    df = df_v[df_v['fecha'].notna()]
+    semana = df['semana_anio'] if 'semana_anio' in df.columns else df['fecha'].dt.isocalendar().week
+    keys = [df['fecha'].dt.year.rename('anio'), df['fecha'].dt.month.rename('mes'), semana.astype('int64').rename('semana')]
+    grupos = df.groupby(keys, sort=True)
+    stats = grupos.agg(desde=('fecha', 'min'), hasta=('fecha', 'max'), filas=('fecha', 'size'), monto=('monto_real', 'sum'))
+    posiciones = grupos.indices
+    # Hash por fila (valores, no códigos de categoría) sumado por semana
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    nuevas = {}
+    for (a, m, s), fila in stats.iterrows():
+        nuevas[f'anio={a}/mes={m:02d}/semana={s:02d}.parquet'] = {
+            'anio': int(a), 'mes': int(m), 'semana': int(s), 'desde': f"{fila['desde']:%Y-%m-%d}", 'hasta': f"{fila['hasta']:%Y-%m-%d}",
+            'filas': int(fila['filas']), 'monto': round(float(fila['monto']), 2),
+            'huella': f"{int(hashes[posiciones[(a, m, s)]].sum()):016x}"}
+    # Los meses del archivo actual se reemplazan completos (una semana corregida o quitada no queda)
+    meses = {(p['anio'], p['mes']) for p in nuevas.values()}
+    viejas = [rel for rel, p in manifiesto['particiones'].items() if (p['anio'], p['mes']) in meses and rel not in nuevas]
+
+    cambios = 0
+    try:
+        for rel, info in nuevas.items():
+            path = os.path.join(_dir(), rel)
+            if manifiesto['particiones'].get(rel) == info and os.path.exists(path): continue
+            parte = df.iloc[posiciones[(info['anio'], info['mes'], info['semana'])]]
+            parte = parte.assign(**{c: parte[c].cat.remove_unused_categories() for c in parte.columns if isinstance(parte[c].dtype, pd.CategoricalDtype)})
+            data_loader.write_parquet_atomic(parte, path, index=False)
+            manifiesto['particiones'][rel] = info
+            cambios += 1
+        for rel in viejas:
+            try: os.remove(os.path.join(_dir(), rel))
+            except: pass
+            del manifiesto['particiones'][rel]
+            cambios += 1
+        if cambios or manifiesto['version'] is None:
+            manifiesto['version'] = uuid.uuid4().hex
+            data_loader.write_json_atomic(os.path.join(_dir(), 'manifiesto.json'), manifiesto)
+    except:
+        # Sin histórico (disco de solo lectura, tipos no serializables): se sigue con el archivo
+        return {'version': None, 'particiones': {}}
+    return manifiesto
+
+# --- CONSULTAS POR PERÍODO ---
+def bounds(manifiesto, desde, hasta):
+    # Rango de fechas disponible: el histórico más el archivo actual
+    parts = manifiesto['particiones'].values() if manifiesto else []
+    if parts:
+        desde = min(desde, pd.Timestamp(min(p['desde'] for p in parts)))
+        hasta = max(hasta, pd.Timestamp(max(p['hasta'] for p in parts)))
+    return desde, hasta
+
+def partitions_for(manifiesto, desde, hasta):
+    # Poda: solo los archivos cuyo rango de fechas se cruza con [desde, hasta]
+    d, h = f"{pd.Timestamp(desde):%Y-%m-%d}", f"{pd.Timestamp(hasta):%Y-%m-%d}"
+    return [rel for rel, p in sorted(manifiesto['particiones'].items()) if p['desde'] <= h and p['hasta'] >= d]
+
+def load_period(manifiesto, desde, hasta, columns=None):
+    partes = []
+    for rel in partitions_for(manifiesto, desde, hasta):
+        try: partes.append(pd.read_parquet(os.path.join(_dir(), rel), columns=columns))
+        except: pass
+    if not partes: return None
+    # Cada archivo trae sus propias categorías: se unen y se vuelven a compactar
+    df = pd.concat(partes, ignore_index=True)
+    for c in data_loader.CATEGORY_COLS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype): df[c] = df[c].astype('category')
+    df = df[(df['fecha'] >= pd.Timestamp(desde)) & (df['fecha'] < pd.Timestamp(hasta) + pd.Timedelta(days=1))]
+    return df.reset_index(drop=True)
+
+def _select(df, canales=None, vendedores=None):
+    if df is None: return None
+    if canales is not None and len(canales): df = df[df['canal'].isin(canales)]
+    if vendedores is not None and len(vendedores): df = df[df['vendedor'].isin(vendedores)]
+    return df
+
+def period_kpis(manifiesto, desde, hasta, canales=None, vendedores=None):
+    # Venta, clientes distintos y transacciones distintas por día (como el cubo)
+    df = _select(load_period(manifiesto, desde, hasta, KPI_COLS), canales, vendedores)
+    if df is None or df.empty: return 0.0, 0, 0
+    return float(df['monto_real'].sum()), df['clienteid'].nunique(), len(df[['fecha', 'id_transaccion']].drop_duplicates())
+
+def period_daily(manifiesto, desde, hasta, canales=None, vendedores=None):
+    df = _select(load_period(manifiesto, desde, hasta, ['fecha', 'monto_real', 'canal', 'vendedor']), canales, vendedores)
+    if df is None: return pd.DataFrame({'fecha': pd.Series(dtype='datetime64[ns]'), 'monto_real': pd.Series(dtype='float64')})
+    return df.groupby('fecha')['monto_real'].sum().astype('float64').reset_index()
+
+# --- COMPARACIÓN ENTRE PERÍODOS ---
+def comparison_periods(desde, hasta):
+    # Mismo tramo del mes anterior y del año anterior (mismos días transcurridos)
+    desde, hasta = pd.Timestamp(desde), pd.Timestamp(hasta)
+    return {'Actual': (desde, hasta),
+            'Mes anterior': (desde - pd.DateOffset(months=1), hasta - pd.DateOffset(months=1)),
+            'Año anterior': (desde - pd.DateOffset(years=1), hasta - pd.DateOffset(years=1))}
+
+def comparison_table(kpis, periodos):
+    # kpis: {período: (venta, cobertura, transacciones)}; variación del actual contra cada uno
+    tabla = pd.DataFrame.from_dict(kpis, orient='index', columns=['Venta', 'Cobertura', 'Transacciones'])
+    tabla.insert(0, 'Hasta', [periodos[p][1].date() for p in tabla.index])
+    tabla.insert(0, 'Desde', [periodos[p][0].date() for p in tabla.index])
+    tabla['Ticket'] = tabla['Venta'] / tabla['Transacciones'].where(tabla['Transacciones'] > 0)
+    for col in ['Venta', 'Cobertura', 'Ticket']:
+        base = tabla[col].where(tabla[col] > 0)
+        tabla[f'Δ {col} %'] = (tabla.loc['Actual', col] / base - 1) * 100
+    tabla.loc['Actual', [c for c in tabla.columns if c.startswith('Δ')]] = None
+    return tabla
@@ -0,0 +1,123 @@
+import time
+import threading
+import tracemalloc
+import datetime
+from contextlib import contextmanager
+import pandas as pd
+
+import data_loader
+
+# --- PERFILADOR (OPCIONAL) ---
+# Sondas de tiempo alrededor de cada etapa del rerun (carga, estructuras, filtros, vistas y
+# gráficos), con filas y memoria del DataFrame resultante y, si se pide, las asignaciones de
+# Python/NumPy (tracemalloc, más lento). Apagado, `probe` no mide nada. Cada rerun (o rerun
+# de un fragmento) queda como un registro en `historial`, una lista que vive en la sesión.
+# tracemalloc es global al proceso y las sesiones son hilos del mismo proceso: se enciende con
+# la primera sesión que lo pide y se apaga con la última (contador bajo lock). `epoca` cambia
+# con cada alta o baja; una etapa solo informa asignaciones si el trazado siguió igual durante
+# toda la etapa, y el pico solo si ninguna otra sesión estaba trazando (reset_peak es común).
+_lock = threading.Lock()
+_traza = {'sesiones': 0, 'propio': False, 'epoca': 0}
+
+def _tracing_acquire():
+    with _lock:
+        if _traza['sesiones'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _traza['propio'] = True
+        _traza['sesiones'] += 1
+        _traza['epoca'] += 1
+
+def _tracing_release():
+    with _lock:
+        _traza['sesiones'] -= 1
+        _traza['epoca'] += 1
+        if _traza['sesiones'] == 0 and _traza['propio']:
+            tracemalloc.stop()
+            _traza['propio'] = False
+
+class Stage:
+    def __init__(self, nombre, activo=True):
+        self.nombre = nombre
+        self.activo = activo
+        self.filas = None
+        self.mb = None
+
+    def track(self, obj):
+        # Filas y memoria de lo que produjo la etapa (DataFrame o tupla de DataFrames)
+        if not self.activo: return obj
+        frames = [o for o in (obj if isinstance(obj, tuple) else (obj,)) if isinstance(o, pd.DataFrame)]
+        if frames:
+            self.filas = sum(len(f) for f in frames)
+            self.mb = sum(data_loader.memory_mb(f) for f in frames)
+        return obj
+
+class Profiler:
+    def __init__(self, historial, enabled=False, allocations=False, max_reruns=10):
+        self.historial = historial
+        self.enabled = enabled
+        self.allocations = allocations
+        self.max_reruns = max_reruns
+        self._stack = []
+        self._record = None
+        self._tracing = False
+
+    def start(self, tipo):
+        if not self.enabled: return
+        if self.allocations and not self._tracing: _tracing_acquire(); self._tracing = True
+        self._record = {'tipo': tipo, 'inicio': datetime.datetime.now().isoformat(timespec='seconds'), 'etapas': [], 't0': time.perf_counter()}
+
+    def finish(self):
+        if not self.enabled or self._record is None: return
+        record, self._record = self._record, None
+        record['total_ms'] = (time.perf_counter() - record.pop('t0')) * 1000
+        if self._tracing: _tracing_release(); self._tracing = False
+        self.historial.append(record)
+        del self.historial[:-self.max_reruns]
+
+    def __del__(self):
+        # Un rerun cortado (st.rerun, excepción) no llega a finish: se libera el trazado igual
+        if self._tracing: _tracing_release(); self._tracing = False
+
+    @property
+    def active(self):
+        return self.enabled and self._record is not None
+
+    @contextmanager
+    def probe(self, nombre):
+        if not self.active:
+            yield Stage(nombre, activo=False)
+            return
+        stage = Stage('/'.join(self._stack + [nombre]))
+        self._stack.append(nombre)
+        with _lock:
+            epoca, sola = _traza['epoca'], _traza['sesiones'] == 1
+            alloc0 = tracemalloc.get_traced_memory()[0] if self._tracing and tracemalloc.is_tracing() else None
+            # El pico solo se reinicia en etapas de primer nivel (no pisa el de la etapa que la
+            # contiene) y si esta es la única sesión trazando
+            if alloc0 is not None and sola and len(self._stack) == 1: tracemalloc.reset_peak()
+        t = time.perf_counter()
+        try: yield stage
+        finally:
+            ms = (time.perf_counter() - t) * 1000
+            self._stack.pop()
+            fila = {'etapa': stage.nombre, 'ms': ms, 'filas': stage.filas, 'mb': stage.mb}
+            with _lock:
+                continua = alloc0 is not None and _traza['epoca'] == epoca
+                if continua: actual, pico = tracemalloc.get_traced_memory()
+            if continua:
+                fila['asign_mb'] = (actual - alloc0) / 1e6
+                if sola and not self._stack: fila['pico_mb'] = (pico - alloc0) / 1e6
+            if self._record is not None: self._record['etapas'].append(fila)
+
+    def run(self, tipo):
+        # Abre un registro propio si no hay un rerun en curso (rerun de un fragmento)
+        propio = self.enabled and self._record is None
+        if propio: self.start(tipo)
+        return propio
+
+# --- EXPORTACIÓN ---
+def history_frame(historial):
+    filas = [{'rerun': i, 'tipo': r['tipo'], 'inicio': r['inicio'], 'total_ms': r['total_ms'], **e}
+             for i, r in enumerate(historial, 1) for e in r['etapas']]
+    cols = ['rerun', 'tipo', 'inicio', 'total_ms', 'etapa', 'ms', 'filas', 'mb', 'asign_mb', 'pico_mb']
+    return pd.DataFrame(filas).reindex(columns=cols)
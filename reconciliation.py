@@ -0,0 +1,92 @@
+import hashlib
+import inspect
+import numpy as np
+import pandas as pd
+
+import data_loader
+
+# --- CONCILIACIÓN PREVENTA ↔ VENTA ↔ REBOTES ---
+# Una fila por número de preventa (índice ordenado `id_cruce`, que sirve de índice hash para
+# las búsquedas) con lo pedido en la preventa, lo entregado en la venta y lo rechazado según
+# rebotes, más vendedor, distribuidor, motivo y estado. Se guarda en .snapshots junto a la
+# generación y las filas de cada fuente y la versión del código que la arma: si las fuentes
+# solo crecieron (ingesta incremental) se suman únicamente las filas nuevas.
+FUENTES = ['venta', 'preventa', 'rebotes']
+SUMAS = ['monto_pre', 'lineas_pre', 'monto_real', 'monto_rechazo', 'monto_pre_rebote', 'monto_venta_rebote', 'rebotes']
+ATRIBUTOS = ['vendedor', 'fecha', 'vendedor_rebote', 'distribuidor', 'zona', 'cliente', 'motivo_rechazo']
+TOLERANCIA = 5  # diferencia (en $) hasta la que una preventa se considera entregada
+
+def _parts(df_v, df_p, df_r):
+    # Agregados por preventa de cada fuente (columnas disjuntas); se unen por índice
+    partes = []
+    if df_p is not None and 'id_cruce' in df_p.columns:
+        partes.append(df_p.groupby('id_cruce').agg(
+            monto_pre=('monto_pre', 'sum'), lineas_pre=('monto_pre', 'size'), vendedor=('vendedor', 'first'), fecha=('fecha', 'first')))
+    if df_v is not None and 'preventaid' in df_v.columns:
+        partes.append(df_v.groupby('preventaid')['monto_real'].sum().astype('float64').to_frame())
+    if df_r is not None and 'nro_preventa' in df_r.columns:
+        agg = {'monto_rechazo': ('monto_rechazo', 'sum'), 'rebotes': ('monto_rechazo', 'size'), 'vendedor_rebote': ('vendedor', 'first')}
+        for col, src in [('monto_pre_rebote', 'monto_preventa'), ('monto_venta_rebote', 'monto_venta')]:
+            if src in df_r.columns: agg[col] = (src, 'sum')
+        for col in ['distribuidor', 'zona', 'cliente', 'motivo_rechazo']:
+            if col in df_r.columns: agg[col] = (col, 'first')
+        partes.append(df_r.groupby('nro_preventa').agg(**agg))
+    tabla = pd.concat(partes, axis=1) if partes else pd.DataFrame()
+    for c in SUMAS: tabla[c] = pd.to_numeric(tabla[c], errors='coerce').fillna(0).astype('float64') if c in tabla.columns else 0.0
+    for c in ATRIBUTOS:
+        if c not in tabla.columns: tabla[c] = None
+    tabla.index.name = 'id_cruce'
+    return tabla[SUMAS + ATRIBUTOS]
+
+def _finish(tabla):
+    tabla = tabla.sort_index()
+    tabla['vendedor'] = tabla['vendedor'].fillna(tabla['vendedor_rebote'])
+    tabla['caida'] = tabla['monto_pre'] - tabla['monto_real']
+    tabla['st'] = np.select([tabla['lineas_pre'] == 0, tabla['caida'] <= TOLERANCIA], ['Sin Preventa', 'Entregado'], default='Rechazo')
+    return tabla
+
+def version():
+    # Cambiar el cálculo (o TOLERANCIA) invalida la conciliación guardada, como normalizer_version
+    try:
+        codigo = ''.join(inspect.getsource(f) for f in (_parts, _finish, update_reconciliation))
+        return hashlib.sha1((codigo + repr((SUMAS, ATRIBUTOS, TOLERANCIA))).encode('utf-8')).hexdigest()[:12]
+    except: return 'sin-version'
+
+def build_reconciliation(df_v, df_p, df_r):
+    return _finish(_parts(df_v, df_p, df_r))
+
+def update_reconciliation(tabla, df_v, df_p, df_r):
+    # Suma las filas nuevas de cada fuente; los atributos ya conocidos se conservan
+    delta = _parts(df_v, df_p, df_r)
+    idx = tabla.index.union(delta.index)
+    base, delta = tabla.reindex(idx), delta.reindex(idx)
+    out = base[ATRIBUTOS].combine_first(delta[ATRIBUTOS])
+    out[SUMAS] = base[SUMAS].fillna(0) + delta[SUMAS].fillna(0)
+    return _finish(out[SUMAS + ATRIBUTOS])
+
+def _tail(df, n):
+    return df.iloc[n:] if df is not None else None
+
+def load_reconciliation(df_v, df_p, df_r):
+    frames = {'venta': df_v, 'preventa': df_p, 'rebotes': df_r}
+    gens = {n: data_loader.snapshot_generation(n) for n in FUENTES}
+    rows = {n: len(frames[n]) if frames[n] is not None else 0 for n in FUENTES}
+    codigo = version()
+    tabla = None
+    meta = data_loader.read_snapshot_meta('conciliacion')
+    if meta and all(gens.values()) and meta.get('version') == codigo and meta.get('generations') == gens and all(rows[n] >= meta['rows'][n] for n in FUENTES):
+        try: prev = pd.read_parquet(data_loader.snapshot_path('conciliacion'))
+        except: prev = None
+        if prev is not None and meta['rows'] == rows: return prev
+        if prev is not None:
+            tabla = update_reconciliation(prev, *(_tail(frames[n], meta['rows'][n]) for n in FUENTES))
+    if tabla is None: tabla = build_reconciliation(df_v, df_p, df_r)
+
+    data_loader.write_snapshot('conciliacion', tabla, {'generations': gens, 'rows': rows, 'version': codigo})
+    return tabla
+
+# --- CONSULTAS ---
+def lookup(tabla, ids):
+    # Filas de la conciliación para los números de preventa dados (búsqueda por hash del índice)
+    pos = tabla.index.get_indexer(pd.unique(pd.Series(ids).dropna()))
+    return tabla.iloc[pos[pos >= 0]]
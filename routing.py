@@ -0,0 +1,81 @@
+import numpy as np
+
+# --- SECUENCIA DE VISITAS ---
+# Ordena los clientes pendientes en un recorrido corto: matriz de distancias haversine
+# (vectorizada), vecino más cercano como punto de partida y mejora 2-opt (invertir un tramo
+# si acorta el recorrido). El recorrido es abierto: empieza en `inicio` y termina en la
+# última parada, sin volver.
+RADIO_TIERRA_KM = 6371.0
+MAX_PARADAS = 500      # por encima de esto se pide filtrar (vendedor/día) antes de ordenar
+MAX_PARADAS_LINK = 10  # Google Maps acepta origen + destino + 8 intermedios por enlace
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def haversine_matrix(lat, lon):
+    lat, lon = np.asarray(lat, dtype='float64'), np.asarray(lon, dtype='float64')
+    return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :])
+
+def nearest_neighbor(D, inicio=0):
+    n = len(D)
+    visitado = np.zeros(n, dtype=bool)
+    ruta = np.empty(n, dtype='int64')
+    ruta[0] = actual = inicio
+    visitado[inicio] = True
+    for k in range(1, n):
+        d = np.where(visitado, np.inf, D[actual])
+        ruta[k] = actual = int(d.argmin())
+        visitado[actual] = True
+    return ruta
+
+def two_opt(ruta, D, max_pasadas=50):
+    # Para cada arista (a, b) se evalúan de una vez todas las aristas (c, d) posteriores:
+    # invertir b..c cambia a-b + c-d por a-c + b-d. La última parada no tiene arista de
+    # salida (recorrido abierto), así que invertir hasta el final solo cambia a-b por a-c.
+    ruta = ruta.copy()
+    n = len(ruta)
+    if n < 4: return ruta
+    for _ in range(max_pasadas):
+        mejoro = False
+        for i in range(1, n - 1):
+            a, b = ruta[i - 1], ruta[i]
+            c = ruta[i + 1:]
+            d_sig = np.append(D[c[:-1], ruta[i + 2:]], 0.0)
+            d_b = np.append(D[b, ruta[i + 2:]], 0.0)
+            delta = D[a, c] + d_b - D[a, b] - d_sig
+            j = int(delta.argmin())
+            if delta[j] < -1e-9:
+                ruta[i:i + j + 2] = ruta[i:i + j + 2][::-1]
+                mejoro = True
+        if not mejoro: break
+    return ruta
+
+def route_length(ruta, D):
+    return float(D[ruta[:-1], ruta[1:]].sum())
+
+def sequence_stops(paradas, inicio=None):
+    # `paradas`: DataFrame con latitud/longitud (un cliente por fila). Devuelve las paradas
+    # ordenadas con el número de visita y los km del tramo y acumulados
+    paradas = paradas.reset_index(drop=True)
+    if paradas.empty: return paradas.assign(orden=[], km_tramo=[], km_acum=[])
+    D = haversine_matrix(paradas['latitud'], paradas['longitud'])
+    if inicio is None:
+        # Sin punto de partida: se arranca en el extremo más alejado del centro del grupo
+        lat, lon = paradas['latitud'].to_numpy(), paradas['longitud'].to_numpy()
+        inicio = int(haversine_km(lat, lon, np.median(lat), np.median(lon)).argmax())
+    ruta = two_opt(nearest_neighbor(D, inicio), D)
+    tramo = np.append(0.0, D[ruta[:-1], ruta[1:]])
+    return paradas.iloc[ruta].assign(orden=np.arange(1, len(ruta) + 1), km_tramo=tramo, km_acum=tramo.cumsum()).reset_index(drop=True)
+
+def directions_links(ordenadas, max_paradas=MAX_PARADAS_LINK):
+    # Enlaces de Google Maps con varias paradas; tramos consecutivos comparten la parada de corte
+    coords = (ordenadas['latitud'].astype(str) + "," + ordenadas['longitud'].astype(str)).tolist()
+    links = []
+    for k in range(0, max(len(coords) - 1, 1), max_paradas - 1):
+        tramo = coords[k:k + max_paradas]
+        link = f"https://www.google.com/maps/dir/?api=1&origin={tramo[0]}&destination={tramo[-1]}&travelmode=driving"
+        if len(tramo) > 2: link += "&waypoints=" + "|".join(tramo[1:-1])
+        links.append(link)
+    return links
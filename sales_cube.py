@@ -0,0 +1,60 @@
+import operator
+from functools import reduce
+import numpy as np
+import pandas as pd
+
+# --- CUBO DE VENTAS PRE-AGREGADO ---
+# Una fila por fecha × vendedor × canal × tipopago con el monto sumado y dos bitmaps
+# (enteros de Python) con los clientes y transacciones de la celda. Los bitmaps se combinan
+# con OR, así el conteo de distintos al agrupar celdas es exacto sin volver a leer la venta.
+# - Clientes: bit = código global del cliente.
+# - Transacciones: bit = código de la transacción dentro de su día (una venta tiene una sola
+#   fecha), así los bitmaps quedan chicos y el total es la suma de los distintos por día.
+CUBE_DIMS = ['fecha', 'vendedor', 'canal', 'tipopago']
+
+def _bitmap(codes):
+    codes = codes[codes >= 0]
+    if not len(codes): return 0
+    bits = np.zeros(codes.max() + 1, dtype=bool)
+    bits[codes] = True
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+def _bitmaps_by_cell(cell, codes, n_cells):
+    pairs = pd.DataFrame({'cell': cell, 'code': codes}).drop_duplicates().sort_values('cell')
+    bounds = np.searchsorted(pairs['cell'].to_numpy(), np.arange(n_cells + 1))
+    values = pairs['code'].to_numpy()
+    return pd.Series([_bitmap(values[bounds[i]:bounds[i + 1]]) for i in range(n_cells)], dtype=object)
+
+def build_cube(df_v):
+    dims = [c for c in CUBE_DIMS if c in df_v.columns]
+    group = df_v.groupby(dims, observed=True, dropna=False, sort=False)
+    cell = group.ngroup().to_numpy()
+
+    cube = group['monto_real'].sum().astype('float64').reset_index()
+    cli_codes = pd.factorize(df_v['clienteid'])[0]
+    trx_codes = df_v.groupby('fecha', dropna=False)['id_transaccion'].rank(method='dense').fillna(0).astype('int64').to_numpy() - 1
+    cube['cli'] = _bitmaps_by_cell(cell, cli_codes, len(cube))
+    cube['trx'] = _bitmaps_by_cell(cell, trx_codes, len(cube))
+    return cube
+
+def _union_count(bitmaps):
+    return reduce(operator.or_, bitmaps, 0).bit_count()
+
+# --- CONSULTAS (ROLL-UP) ---
+def cube_select(cube, canales, vendedor="Todos"):
+    mask = cube['canal'].isin(canales)
+    if vendedor != "Todos": mask &= cube['vendedor'] == vendedor
+    return cube[mask]
+
+def cube_kpis(cells):
+    tot = cells['monto_real'].sum()
+    cob = _union_count(cells['cli'])
+    trx = sum(_union_count(g) for _, g in cells.groupby('fecha', dropna=False)['trx'])
+    return tot, cob, trx
+
+def cube_daily(cells):
+    day = cells.groupby('fecha').agg(monto_real=('monto_real', 'sum'), clienteid=('cli', _union_count))
+    return day.reset_index()
+
+def cube_sum(cells, cols):
+    return cells.groupby(cols, observed=True)['monto_real'].sum()
@@ -0,0 +1,212 @@
+import os
+import glob
+import json
+import shutil
+import pandas as pd
+
+import data_loader
+import reconciliation
+
+try: import duckdb
+except: duckdb = None
+
+# --- MOTOR SQL FUERA DE MEMORIA (DUCKDB) ---
+# Alternativa al camino en memoria para ventas más grandes que la RAM: la venta y la preventa
+# normalizadas se leen desde Parquet (el snapshot de data_loader si está al día o, si no, uno
+# armado por tramos sin tener el archivo entero en memoria) y se consultan con DuckDB. Los
+# filtros y agregaciones de las pestañas van como SQL y a pandas solo vuelven resultados
+# chicos (por vendedor, por cliente, por día). El maestro y rebotes (tablas chicas) se cargan
+# en pandas como siempre y el maestro se registra en DuckDB para el cruce de vendedor.
+# DuckDB usa varios núcleos y, pasado `LIMITE_MEMORIA`, vuelca a disco en .snapshots/duckdb_tmp.
+LIMITE_MEMORIA = os.environ.get('DASHBOARD_DUCKDB_MEMORIA', '1GB')
+HILOS = os.cpu_count() or 1
+FILAS_POR_TRAMO = 1_000_000
+UMBRAL_ARCHIVO_MB = 500  # desde este tamaño de venta se sugiere el motor SQL
+FUENTES = ['venta', 'preventa']
+DIMENSIONES = ['canal', 'vendedor', 'jerarquia1', 'categoria', 'producto', 'tipopago', 'clienteid']
+
+def available():
+    return duckdb is not None
+
+def recommended(firmas):
+    firma = firmas.get('venta')
+    return available() and firma is not None and firma[1] >= UMBRAL_ARCHIVO_MB * 1e6
+
+def _sql_text(s):
+    return "'" + str(s).replace("'", "''") + "'"
+
+# --- PARQUET POR FUENTE ---
+def _parts_dir(name):
+    return os.path.join(data_loader.SNAPSHOT_DIR, 'sql', name)
+
+def write_parts(name, file_path, chunk_rows=FILAS_POR_TRAMO):
+    # Normaliza el archivo por tramos y guarda un Parquet por tramo (memoria acotada a un tramo)
+    normalizer = data_loader.SOURCES[name][1]
+    carpeta = _parts_dir(name)
+    shutil.rmtree(carpeta, ignore_errors=True)
+    os.makedirs(carpeta)
+    for k, chunk in enumerate(data_loader.read_smart_chunks(file_path, chunk_rows)):
+        chunk = normalizer(chunk)
+        if chunk is not None: data_loader.write_parquet_atomic(chunk, os.path.join(carpeta, f'parte-{k:05d}.parquet'))
+    stat = os.stat(file_path)
+    data_loader.write_json_atomic(os.path.join(carpeta, 'meta.json'), {
+        'file': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'version': data_loader.normalizer_version(normalizer)})
+
+def source_files(name):
+    # Archivos Parquet con la fuente normalizada: el snapshot completo si corresponde al
+    # archivo actual; si no, los tramos propios (se rearman cuando el archivo cambia)
+    keywords, normalizer = data_loader.SOURCES[name]
+    file_path = data_loader.find_file_fuzzy(keywords)
+    if not file_path: return None
+    meta = data_loader.read_snapshot_meta(name)
+    if data_loader.snapshot_current(name, file_path, normalizer, meta):
+        return data_loader.snapshot_files(name, meta), False
+    try:
+        with open(os.path.join(_parts_dir(name), 'meta.json'), encoding='utf-8') as f: meta = json.load(f)
+    except: meta = None
+    stat = os.stat(file_path)
+    if meta != {'file': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'version': data_loader.normalizer_version(normalizer)}:
+        try: write_parts(name, file_path, FILAS_POR_TRAMO)
+        except: return None
+    partes = sorted(glob.glob(os.path.join(_parts_dir(name), '*.parquet')))
+    return (partes, True) if partes else None
+
+class SQLBackend:
+    def __init__(self, df_a=None):
+        tmp = os.path.join(data_loader.SNAPSHOT_DIR, 'duckdb_tmp')
+        os.makedirs(tmp, exist_ok=True)
+        self.con = duckdb.connect(config={'memory_limit': LIMITE_MEMORIA, 'threads': HILOS, 'temp_directory': tmp})
+        self.fuentes = {n: source_files(n) for n in FUENTES}
+        self.columns = set()
+
+        # Vendedor de cada cliente según el maestro (como enrich_venta) y canal por vendedor
+        if df_a is not None and 'clienteid' in df_a.columns:
+            maestro = df_a[['clienteid', 'vendedor']].drop_duplicates(subset=['clienteid']).astype(str)
+        else: maestro = pd.DataFrame({'clienteid': pd.Series(dtype=str), 'vendedor': pd.Series(dtype=str)})
+        self._table('maestro_vendedor', maestro)
+        self._table('canales', pd.DataFrame(list(data_loader.CAT_MAP.items()), columns=['vendedor', 'canal']))
+
+        if self.fuentes['venta']:
+            self.con.execute(f"""CREATE VIEW venta_base AS SELECT * FROM read_parquet({self._files('venta')}, union_by_name=true)""")
+            self.con.execute("""CREATE VIEW venta AS
+                SELECT v.* EXCLUDE (vendedor, canal, clienteid, monto_real),
+                       CAST(v.clienteid AS VARCHAR) AS clienteid, TRY_CAST(v.monto_real AS DOUBLE) AS monto_real,
+                       v.vendedor AS vendedor_venta, COALESCE(m.vendedor, v.vendedor) AS vendedor,
+                       COALESCE(c.canal, '6. RUTA TDB') AS canal
+                FROM venta_base v
+                LEFT JOIN maestro_vendedor m ON CAST(v.clienteid AS VARCHAR) = m.clienteid
+                LEFT JOIN canales c ON COALESCE(m.vendedor, v.vendedor) = c.vendedor""")
+            self.columns = set(self.query("SELECT * FROM venta LIMIT 0").columns)
+        if self.fuentes['preventa']:
+            # Los tramos se normalizaron por separado: los duplicados entre tramos se quitan acá
+            distinct = 'DISTINCT' if self.fuentes['preventa'][1] else ''
+            self.con.execute(f"CREATE VIEW preventa AS SELECT {distinct} * FROM read_parquet({self._files('preventa')}, union_by_name=true)")
+
+    def _table(self, nombre, df):
+        # Tabla propia (no un DataFrame registrado, que los cursores de otros hilos no ven)
+        self.con.register('_df', df)
+        self.con.execute(f"CREATE TABLE {nombre} AS SELECT * FROM _df")
+        self.con.unregister('_df')
+
+    def _files(self, name):
+        return '[' + ', '.join(_sql_text(p) for p in self.fuentes[name][0]) + ']'
+
+    def has(self, name):
+        return bool(self.fuentes.get(name))
+
+    def query(self, sql, params=None):
+        # Un cursor por consulta: la conexión se comparte entre sesiones (hilos)
+        return self.con.cursor().execute(sql, params or []).df()
+
+    def _where(self, desde=None, hasta=None, **filtros):
+        # Igual que FilterEngine: None = sin filtrar esa dimensión, lista vacía = ninguna fila
+        conds, params = [], []
+        for col, valores in filtros.items():
+            if col not in DIMENSIONES or col not in self.columns or valores is None: continue
+            if not len(valores): conds.append("FALSE"); continue
+            conds.append(f"{col} IN ({', '.join('?' * len(valores))})")
+            params += [str(v) for v in valores]
+        if desde is not None: conds.append("fecha >= ?"); params.append(pd.Timestamp(desde))
+        if hasta is not None: conds.append("fecha < ?"); params.append(pd.Timestamp(hasta) + pd.Timedelta(days=1))
+        return (' WHERE ' + ' AND '.join(conds)) if conds else '', params
+
+    # --- CONSULTAS ---
+    def values(self, col, **filtros):
+        if col not in DIMENSIONES or col not in self.columns: return []
+        where, params = self._where(**filtros)
+        where = f"{where} AND {col} IS NOT NULL" if where else f" WHERE {col} IS NOT NULL"
+        return self.query(f"SELECT DISTINCT {col} FROM venta{where} ORDER BY 1", params)[col].tolist()
+
+    def date_range(self):
+        r = self.query("SELECT MIN(fecha) AS desde, MAX(fecha) AS hasta FROM venta")
+        return r['desde'].iloc[0], r['hasta'].iloc[0]
+
+    def kpis(self, **filtros):
+        # Transacciones distintas por día, como el cubo
+        where, params = self._where(**filtros)
+        r = self.query(f"""SELECT COALESCE(SUM(monto_real), 0) AS tot, COUNT(DISTINCT clienteid) AS cob,
+                                  COUNT(DISTINCT (fecha, id_transaccion)) AS trx FROM venta{where}""", params)
+        return float(r['tot'].iloc[0]), int(r['cob'].iloc[0]), int(r['trx'].iloc[0])
+
+    def cells(self, **filtros):
+        # Mismas celdas que el cubo (sin bitmaps): alcanzan para Finanzas y el sunburst
+        dims = [c for c in ['fecha', 'vendedor', 'canal', 'tipopago'] if c == 'fecha' or c in self.columns]
+        where, params = self._where(**filtros)
+        return self.query(f"SELECT {', '.join(dims)}, SUM(monto_real) AS monto_real FROM venta{where} GROUP BY ALL", params)
+
+    def daily(self, **filtros):
+        where, params = self._where(**filtros)
+        return self.query(f"""SELECT fecha, SUM(monto_real) AS monto_real, COUNT(DISTINCT clienteid) AS clienteid
+                              FROM venta{where} GROUP BY fecha ORDER BY fecha""", params)
+
+    def client_cells(self, **filtros):
+        # Filas del estado por cliente (client_state) sin bitmaps
+        keys = [c for c in ['clienteid', 'cliente', 'vendedor', 'canal'] if c == 'clienteid' or c in self.columns]
+        where, params = self._where(**filtros)
+        return self.query(f"""SELECT {', '.join(keys)}, MIN(fecha) AS primera, MAX(fecha) AS ultima, SUM(monto_real) AS monto_real
+                              FROM venta{where} GROUP BY ALL""", params)
+
+    def client_summary(self, **filtros):
+        # Mismas columnas que client_state.client_summary
+        cliente = "FIRST(cliente) AS cliente, " if 'cliente' in self.columns else ""
+        where, params = self._where(**filtros)
+        res = self.query(f"""SELECT clienteid, {cliente}MIN(fecha) AS primera, MAX(fecha) AS ultima, SUM(monto_real) AS monto_real,
+                                    COUNT(DISTINCT fecha) AS frecuencia_real, COUNT(DISTINCT semana_anio) AS semanas
+                             FROM venta{where} GROUP BY clienteid""", params)
+        res['visitas_semana'] = res['frecuencia_real'] / res['semanas'].replace(0, 1)
+        return res
+
+    def top_products(self, n=10, **filtros):
+        where, params = self._where(**filtros)
+        return self.query(f"""SELECT producto, SUM(monto_real) AS monto_real FROM venta{where}
+                              GROUP BY producto ORDER BY monto_real DESC LIMIT {int(n)}""", params)
+
+    def audit(self, col_hm, **filtros):
+        # Formato largo vendedor × columna; analytics.audit_pivot lo pasa a matriz
+        if col_hm not in DIMENSIONES or col_hm not in self.columns: return None
+        where, params = self._where(**filtros)
+        return self.query(f"SELECT vendedor, {col_hm}, SUM(monto_real) AS monto_real FROM venta{where} GROUP BY ALL", params)
+
+    def drops(self, vendedores=None, desde=None, hasta=None):
+        # Conciliación agregada por vendedor × estado (lo que usan Caída y el encabezado): lo
+        # pedido por preventa contra lo entregado en toda la venta, como reconciliation. El
+        # período se aplica a la fecha de la preventa (como conc_pre en memoria)
+        if not self.has('preventa'): return pd.DataFrame(columns=['vendedor', 'st', 'monto_pre', 'caida', 'preventas'])
+        venta = "SELECT CAST(preventaid AS VARCHAR) AS id, SUM(monto_real) AS monto_real FROM venta GROUP BY 1" if 'preventaid' in self.columns \
+            else "SELECT NULL::VARCHAR AS id, 0.0 AS monto_real"
+        conds, params = [], []
+        if vendedores is not None:
+            conds.append(f"vendedor IN ({', '.join('?' * len(vendedores))})" if len(vendedores) else "FALSE")
+            params += [str(v) for v in vendedores]
+        if desde is not None: conds.append("fecha >= ?"); params.append(pd.Timestamp(desde))
+        if hasta is not None: conds.append("fecha < ?"); params.append(pd.Timestamp(hasta) + pd.Timedelta(days=1))
+        filtro = ('WHERE ' + ' AND '.join(conds)) if conds else ''
+        return self.query(f"""
+            WITH pre AS (SELECT CAST(id_cruce AS VARCHAR) AS id, SUM(monto_pre) AS monto_pre, FIRST(vendedor) AS vendedor, FIRST(fecha) AS fecha
+                         FROM preventa GROUP BY 1),
+                 ven AS ({venta}),
+                 conc AS (SELECT pre.vendedor, pre.fecha, pre.monto_pre, pre.monto_pre - COALESCE(ven.monto_real, 0) AS caida
+                          FROM pre LEFT JOIN ven USING (id))
+            SELECT vendedor, CASE WHEN caida <= {reconciliation.TOLERANCIA} THEN 'Entregado' ELSE 'Rechazo' END AS st,
+                   SUM(monto_pre) AS monto_pre, SUM(caida) AS caida, COUNT(*) AS preventas
+            FROM conc {filtro} GROUP BY ALL""", params)